@@ -37,74 +37,103 @@ def get_air_quality_level(aqi):
     else:
         return "Hazardous"
 
+# US EPA PM2.5 breakpoints: upper concentration of each band and its linear
+# segment (concentration low/high, AQI low/high); the last band is open-ended
+PM25_BAND_TOPS = np.array([12.0, 35.4, 55.4, 150.4, 250.4])
+PM25_SEGMENTS = np.array([
+    [0.0, 12.0, 0, 50],
+    [12.1, 35.4, 50, 100],
+    [35.5, 55.4, 100, 150],
+    [55.5, 150.4, 150, 200],
+    [150.5, 250.4, 200, 300],
+    [250.5, 500.4, 300, 500],
+])
+
+AQI_LEVEL_TOPS = np.array([50, 100, 150, 200, 300])
+AQI_LEVELS = np.array(["Good", "Moderate", "Unhealthy for Sensitive Groups",
+                       "Unhealthy", "Very Unhealthy", "Hazardous"], dtype=object)
+
+# Column types of an OpenAQ measurements export; repeated strings are categorical
+CSV_DTYPES = {
+    'location_id': 'int64',
+    'location_name': 'category',
+    'parameter': 'category',
+    'value': 'float64',
+    'unit': 'category',
+    'datetimeUtc': 'str',
+    'datetimeLocal': 'str',
+    'timezone': 'category',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'country_iso': 'category',
+    'isMobile': 'category',
+    'isMonitor': 'category',
+    'owner_name': 'category',
+    'provider': 'category'
+}
+# Columns the frontend data is built from; the rest are not read
+USED_COLUMNS = ['location_name', 'parameter', 'value', 'datetimeUtc', 'datetimeLocal',
+                'latitude', 'longitude', 'provider']
+
+# parameter -> (key in the output, rounding digits, unit)
+LATEST_PARAMETERS = {
+    'pm25': ('pm25', 2, 'µg/m³'),
+    'pm1': ('pm1', 2, 'µg/m³'),
+    'temperature': ('temperature', 1, '°C'),
+    'relativehumidity': ('humidity', 1, '%'),
+    'um003': ('particles', 0, 'particles/cm³')
+}
+TREND_PARAMETERS = ['pm25', 'pm1', 'temperature', 'relativehumidity']
+
+def calculate_aqi_from_pm25_array(pm25_values):
+    """
+    Vectorized calculate_aqi_from_pm25: AQI of every PM2.5 concentration in
+    an array (same truncation and cap); NaN stays NaN
+    """
+    values = np.asarray(pm25_values, dtype=np.float64)
+    band = np.searchsorted(PM25_BAND_TOPS, values, side='left')
+    c_low, c_high, i_low, i_high = PM25_SEGMENTS[np.minimum(band, len(PM25_SEGMENTS) - 1)].T
+    aqi = np.trunc(i_low + ((i_high - i_low) / (c_high - c_low)) * (values - c_low))
+    return np.where(band == len(PM25_BAND_TOPS), np.minimum(aqi, 500), aqi)
+
+def get_air_quality_levels(aqi_values):
+    """Vectorized get_air_quality_level: level description of every AQI in an array"""
+    return AQI_LEVELS[np.searchsorted(AQI_LEVEL_TOPS, np.asarray(aqi_values), side='left')]
+
+def load_measurements(csv_file_path):
+    """Read an OpenAQ measurements CSV with explicit column types and parsed timestamps"""
+    df = pd.read_csv(csv_file_path, usecols=USED_COLUMNS,
+                     dtype={col: CSV_DTYPES[col] for col in USED_COLUMNS})
+    df['datetimeUtc'] = pd.to_datetime(df['datetimeUtc'], format='ISO8601')
+    df['datetimeLocal'] = pd.to_datetime(df['datetimeLocal'], format='ISO8601')
+    return df
+
 def process_air_quality_data(csv_file_path):
     """
     Process the air quality CSV data and return formatted data for frontend
     """
-    # Read the CSV file
-    df = pd.read_csv(csv_file_path)
-    
-    # Convert datetime columns
-    df['datetimeUtc'] = pd.to_datetime(df['datetimeUtc'])
-    df['datetimeLocal'] = pd.to_datetime(df['datetimeLocal'])
-    
-    # Get the latest data for each parameter
+    df = load_measurements(csv_file_path)
+
+    # Latest row of each parameter in one groupby pass
+    latest_rows = df.loc[df.groupby('parameter', observed=True)['datetimeUtc'].idxmax()]
+    latest_rows = latest_rows.set_index('parameter')
+
     latest_data = {}
-    
-    # Process PM2.5 data
-    pm25_data = df[df['parameter'] == 'pm25'].sort_values('datetimeUtc')
-    if not pm25_data.empty:
-        latest_pm25 = pm25_data.iloc[-1]
-        pm25_value = latest_pm25['value']
-        aqi = calculate_aqi_from_pm25(pm25_value)
-        
-        latest_data['pm25'] = {
-            'value': round(pm25_value, 2),
-            'unit': 'µg/m³',
-            'timestamp': latest_pm25['datetimeLocal'],
-            'aqi': aqi,
-            'level': get_air_quality_level(aqi)
-        }
-    
-    # Process PM1 data
-    pm1_data = df[df['parameter'] == 'pm1'].sort_values('datetimeUtc')
-    if not pm1_data.empty:
-        latest_pm1 = pm1_data.iloc[-1]
-        latest_data['pm1'] = {
-            'value': round(latest_pm1['value'], 2),
-            'unit': 'µg/m³',
-            'timestamp': latest_pm1['datetimeLocal']
-        }
-    
-    # Process temperature data
-    temp_data = df[df['parameter'] == 'temperature'].sort_values('datetimeUtc')
-    if not temp_data.empty:
-        latest_temp = temp_data.iloc[-1]
-        latest_data['temperature'] = {
-            'value': round(latest_temp['value'], 1),
-            'unit': '°C',
-            'timestamp': latest_temp['datetimeLocal']
-        }
-    
-    # Process humidity data
-    humidity_data = df[df['parameter'] == 'relativehumidity'].sort_values('datetimeUtc')
-    if not humidity_data.empty:
-        latest_humidity = humidity_data.iloc[-1]
-        latest_data['humidity'] = {
-            'value': round(latest_humidity['value'], 1),
-            'unit': '%',
-            'timestamp': latest_humidity['datetimeLocal']
-        }
-    
-    # Process particle count data
-    particle_data = df[df['parameter'] == 'um003'].sort_values('datetimeUtc')
-    if not particle_data.empty:
-        latest_particles = particle_data.iloc[-1]
-        latest_data['particles'] = {
-            'value': round(latest_particles['value'], 0),
-            'unit': 'particles/cm³',
-            'timestamp': latest_particles['datetimeLocal']
+    for param, (key, digits, unit) in LATEST_PARAMETERS.items():
+        if param not in latest_rows.index:
+            continue
+        row = latest_rows.loc[param]
+        latest_data[key] = {
+            'value': round(row['value'], digits),
+            'unit': unit,
+            'timestamp': row['datetimeLocal']
         }
+
+    if 'pm25' in latest_data:
+        pm25_value = latest_rows.loc['pm25', 'value']
+        aqi = calculate_aqi_from_pm25_array([pm25_value])
+        latest_data['pm25']['aqi'] = int(aqi[0])
+        latest_data['pm25']['level'] = get_air_quality_levels(aqi)[0]
     
     # Get location info
     if not df.empty:
@@ -117,19 +146,19 @@ def process_air_quality_data(csv_file_path):
     else:
         location_info = {}
     
-    # Calculate hourly averages for the last 24 hours
-    recent_data = df[df['datetimeUtc'] >= df['datetimeUtc'].max() - pd.Timedelta(hours=24)]
-    
+    # Hourly averages over the last 24 hours, every parameter in one groupby
+    recent_data = df[(df['datetimeUtc'] >= df['datetimeUtc'].max() - pd.Timedelta(hours=24))
+                     & df['parameter'].isin(TREND_PARAMETERS)]
+    hours = recent_data['datetimeLocal'].dt.floor('h').rename('hour')
+    hourly_avg = recent_data.groupby([recent_data['parameter'], hours], observed=True)['value'].mean()
+
     hourly_trends = {}
-    for param in ['pm25', 'pm1', 'temperature', 'relativehumidity']:
-        param_data = recent_data[recent_data['parameter'] == param]
-        if not param_data.empty:
-            # Group by hour and calculate mean
-            param_data['hour'] = param_data['datetimeLocal'].dt.floor('H')
-            hourly_avg = param_data.groupby('hour')['value'].mean().reset_index()
-            hourly_avg['hour'] = hourly_avg['hour'].dt.strftime('%Y-%m-%d %H:00:00')
-            
-            hourly_trends[param] = hourly_avg.to_dict('records')
+    for param in TREND_PARAMETERS:
+        if param not in hourly_avg.index.get_level_values('parameter'):
+            continue
+        param_avg = hourly_avg.xs(param, level='parameter').reset_index()
+        param_avg['hour'] = param_avg['hour'].dt.strftime('%Y-%m-%d %H:00:00')
+        hourly_trends[param] = param_avg.to_dict('records')
     
     return {
         'current': latest_data,
@@ -0,0 +1,264 @@
+"""
+US EPA AQI over the daily district CSVs (client/public/YYYY-MM-DD.csv):
+sub-indices of pm2_5, pm10, o3, no2, so2 and co, the overall AQI and its
+dominant pollutant for every district and date, computed on whole columns.
+
+Usage (from the repository root):
+  python client/src/DataProcessing/aqi_engine.py client/public/*.csv
+Output: client/public/data/district_aqi_timeseries.json
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from CSVDATA_to_JSON import AQI_LEVELS, AQI_LEVEL_TOPS, PM25_SEGMENTS
+
+# Litres per mole of an ideal gas at 25 °C and 1 atm, for µg/m³ -> ppb
+MOLAR_VOLUME = 24.45
+
+# US EPA breakpoints per pollutant: rows of (concentration low/high, AQI
+# low/high) in the unit of the EPA table, and the factor converting the
+# district files' µg/m³ to that unit. The last band is open-ended (capped
+# at 500), and bands use the same convention as calculate_aqi_from_pm25.
+POLLUTANTS = {
+    'pm2_5': {
+        'segments': PM25_SEGMENTS,
+        'factor': 1.0  # µg/m³, 24-hour
+    },
+    'pm10': {
+        'segments': np.array([
+            [0, 54, 0, 50],
+            [55, 154, 50, 100],
+            [155, 254, 100, 150],
+            [255, 354, 150, 200],
+            [355, 424, 200, 300],
+            [425, 504, 300, 400],
+            [505, 604, 400, 500],
+        ], dtype=np.float64),
+        'factor': 1.0  # µg/m³, 24-hour
+    },
+    'o3': {
+        'segments': np.array([
+            [0, 54, 0, 50],
+            [55, 70, 50, 100],
+            [71, 85, 100, 150],
+            [86, 105, 150, 200],
+            [106, 200, 200, 300],
+        ], dtype=np.float64),
+        'factor': MOLAR_VOLUME / 48.00  # ppb, 8-hour
+    },
+    'no2': {
+        'segments': np.array([
+            [0, 53, 0, 50],
+            [54, 100, 50, 100],
+            [101, 360, 100, 150],
+            [361, 649, 150, 200],
+            [650, 1249, 200, 300],
+            [1250, 1649, 300, 400],
+            [1650, 2049, 400, 500],
+        ], dtype=np.float64),
+        'factor': MOLAR_VOLUME / 46.01  # ppb, 1-hour
+    },
+    'so2': {
+        'segments': np.array([
+            [0, 35, 0, 50],
+            [36, 75, 50, 100],
+            [76, 185, 100, 150],
+            [186, 304, 150, 200],
+            [305, 604, 200, 300],
+            [605, 804, 300, 400],
+            [805, 1004, 400, 500],
+        ], dtype=np.float64),
+        'factor': MOLAR_VOLUME / 64.07  # ppb, 1-hour
+    },
+    'co': {
+        'segments': np.array([
+            [0.0, 4.4, 0, 50],
+            [4.5, 9.4, 50, 100],
+            [9.5, 12.4, 100, 150],
+            [12.5, 15.4, 150, 200],
+            [15.5, 30.4, 200, 300],
+            [30.5, 40.4, 300, 400],
+            [40.5, 50.4, 400, 500],
+        ], dtype=np.float64),
+        'factor': MOLAR_VOLUME / 28.01 / 1000  # ppm, 8-hour
+    },
+}
+POLLUTANT_NAMES = list(POLLUTANTS)
+
+# Column types of the daily district files
+DISTRICT_DTYPES = {
+    'district': 'category',
+    'division': 'category',
+    'lat': 'float64',
+    'lon': 'float64',
+    **{name: 'float64' for name in POLLUTANT_NAMES}
+}
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'public', 'data',
+                              'district_aqi_timeseries.json')
+
+def sub_index(concentrations, segments):
+    """
+    AQI sub-index of every concentration for one pollutant's breakpoint
+    table (linear within a band, truncated, capped at 500); NaN stays NaN
+    """
+    values = np.asarray(concentrations, dtype=np.float64)
+    band = np.searchsorted(segments[:-1, 1], values, side='left')
+    c_low, c_high, i_low, i_high = segments[band].T
+    aqi = np.trunc(i_low + ((i_high - i_low) / (c_high - c_low)) * (values - c_low))
+    return np.where(band == len(segments) - 1, np.minimum(aqi, 500), aqi)
+
+def compute_aqi(df):
+    """
+    Sub-index of every pollutant, overall AQI (the largest sub-index), its
+    dominant pollutant and level for every row, as columns added to a copy
+    of df. Pollutant columns missing from df count as not measured.
+    """
+    n = len(df)
+    sub_indices = np.full((n, len(POLLUTANT_NAMES)), np.nan)
+    for i, name in enumerate(POLLUTANT_NAMES):
+        if name in df.columns:
+            spec = POLLUTANTS[name]
+            sub_indices[:, i] = sub_index(df[name].to_numpy(dtype=np.float64) * spec['factor'],
+                                          spec['segments'])
+
+    measured = ~np.isnan(sub_indices)
+    any_measured = measured.any(axis=1)
+    dominant = np.argmax(np.where(measured, sub_indices, -np.inf), axis=1)
+    overall = np.where(any_measured, sub_indices[np.arange(n), dominant], np.nan)
+
+    result = df.copy()
+    for i, name in enumerate(POLLUTANT_NAMES):
+        result[f'aqi_{name}'] = sub_indices[:, i]
+    result['aqi_us'] = overall
+    result['dominant_pollutant'] = pd.Categorical.from_codes(np.where(any_measured, dominant, -1),
+                                                             categories=POLLUTANT_NAMES)
+    levels = AQI_LEVELS[np.searchsorted(AQI_LEVEL_TOPS, np.nan_to_num(overall), side='left')]
+    result['aqi_level'] = np.where(any_measured, levels, None)
+    return result
+
+def expand_csv_paths(paths):
+    """CSV files from a list of files, directories and glob patterns, sorted and de-duplicated"""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(glob.glob(os.path.join(path, '*.csv')))
+        elif any(c in path for c in '*?['):
+            found.update(glob.glob(path))
+        else:
+            found.add(path)
+    return sorted(found)
+
+def load_district_files(csv_paths):
+    """
+    Read and concatenate daily district CSVs with explicit column types.
+    Files sharing a header are joined as text and parsed in one read_csv
+    call, since per-file parsing overhead dominates for small daily files.
+    A (district, date) pair present in several files keeps the last one.
+    """
+    bodies = {}
+    for path in csv_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = f.readline().strip()
+            body = f.read()
+        if body and not body.endswith('\n'):
+            body += '\n'
+        bodies.setdefault(header, []).append(body)
+
+    frames = []
+    for header, parts in bodies.items():
+        columns = header.split(',')
+        frames.append(pd.read_csv(io.StringIO(header + '\n' + ''.join(parts)),
+                                  dtype={k: v for k, v in DISTRICT_DTYPES.items() if k in columns},
+                                  parse_dates=['date']))
+    if not frames:
+        return pd.DataFrame(columns=['date', *DISTRICT_DTYPES])
+
+    # Union the categories so concat keeps the columns categorical
+    for col in ('district', 'division'):
+        categories = pd.api.types.union_categoricals([f[col] for f in frames if col in f]).categories
+        for frame in frames:
+            if col in frame:
+                frame[col] = frame[col].cat.set_categories(categories)
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates(['district', 'date'], keep='last')
+
+def _json_values(array, digits=None):
+    """List of an array's values for JSON (ints when digits is None), NaN as null"""
+    array = np.asarray(array, dtype=np.float64)
+    missing = np.isnan(array)
+    if digits is None:
+        values = np.where(missing, 0, array).astype(np.int64)
+    else:
+        values = np.round(array, digits)
+    return np.where(missing, None, values).tolist()
+
+def district_timeseries(df):
+    """
+    Compact per-district time series: one shared date axis and, per
+    district, aligned arrays of AQI, dominant pollutant (index into
+    "pollutants") and every pollutant concentration; gaps are null.
+    """
+    aqi = compute_aqi(df)
+    dates = np.sort(aqi['date'].unique())
+    aqi['dominant_code'] = aqi['dominant_pollutant'].cat.codes.astype(np.float64).where(
+        aqi['dominant_pollutant'].notna())
+
+    columns = ['aqi_us', 'dominant_code', *[name for name in POLLUTANT_NAMES if name in aqi.columns]]
+    grids = {col: aqi.pivot(index='district', columns='date', values=col).reindex(columns=dates)
+             for col in columns}
+    info = aqi.groupby('district', observed=True)[['division', 'lat', 'lon']].last()
+
+    districts = {}
+    for district in grids['aqi_us'].index:
+        row = info.loc[district]
+        entry = {
+            'division': row['division'],
+            'lat': round(float(row['lat']), 6),
+            'lon': round(float(row['lon']), 6),
+            'aqi': _json_values(grids['aqi_us'].loc[district]),
+            'dominant': _json_values(grids['dominant_code'].loc[district])
+        }
+        for name in POLLUTANT_NAMES:
+            if name in grids:
+                entry[name] = _json_values(grids[name].loc[district], 2)
+        districts[str(district)] = entry
+
+    return {
+        'dates': [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates],
+        'pollutants': POLLUTANT_NAMES,
+        'units': 'µg/m³',
+        'districts': districts
+    }
+
+def write_district_timeseries(csv_paths, output_path=DEFAULT_OUTPUT):
+    """Compute the AQI of every district file and write the time-series JSON"""
+    df = load_district_files(csv_paths)
+    series = district_timeseries(df)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        # dumps uses the C encoder; dump would stream through the Python one
+        f.write(json.dumps(series, separators=(',', ':'), ensure_ascii=False))
+    print(f"Saved {len(series['districts'])} districts x {len(series['dates'])} dates "
+          f"({len(df)} rows from {len(csv_paths)} files) to {output_path}")
+    return series
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EPA AQI time series of the daily district CSVs")
+    parser.add_argument("inputs", nargs="+", help="District CSV files, directories or glob patterns")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Time-series JSON to write")
+    args = parser.parse_args()
+
+    paths = expand_csv_paths(args.inputs)
+    if not paths:
+        print("Error: no CSV files found")
+    else:
+        write_district_timeseries(paths, args.output)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Geometry Metrics Benchmark
+Times area/perimeter/centroid/bbox for synthetic polygon batches through:
+  ops_transform - shapely.ops.transform with a per-ring Python callback
+                  into one fixed UTM zone (the original per-polygon code)
+  per_polygon   - compute_geometry_info one polygon at a time, each with
+                  its own Reprojector
+  vectorized    - geometry_metrics on the whole batch (UTM zone per polygon)
+  geodesic      - geometry_metrics(method="geodesic")
+and reports each path's largest relative area difference from vectorized.
+
+Usage (from the repository root):
+  python data-processing/benchmarks/bench_geometry.py --sizes 1000 10000
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyproj
+from shapely.geometry import Polygon
+from shapely.ops import transform
+
+from current_situation import compute_geometry_info
+from geometry_metrics import geometry_metrics
+
+# Roughly the Dhaka district
+EXTENT = (90.30, 23.65, 90.55, 23.95)
+
+# UTM zone 46N, which the original per-polygon code projected everything into
+FIXED_UTM_CRS = "EPSG:32646"
+
+
+def synthetic_polygons(count: int, vertices: int, seed: int = 0) -> List[Polygon]:
+    """Star-shaped polygons of 0.2-1.5 km across with the given vertex count"""
+    rng = random.Random(seed)
+    west, south, east, north = EXTENT
+    polygons = []
+    for _ in range(count):
+        radius = rng.uniform(0.001, 0.0075)
+        cx, cy = rng.uniform(west, east), rng.uniform(south, north)
+        polygons.append(Polygon([
+            (cx + math.cos(2 * math.pi * k / vertices) * radius * rng.uniform(0.6, 1.0),
+             cy + math.sin(2 * math.pi * k / vertices) * radius * rng.uniform(0.6, 1.0))
+            for k in range(vertices)
+        ]))
+    return polygons
+
+
+def ops_transform_metrics(geoms) -> List[Dict[str, Any]]:
+    project = pyproj.Transformer.from_crs("EPSG:4326", FIXED_UTM_CRS, always_xy=True).transform
+    results = []
+    for geom in geoms:
+        utm = transform(project, geom)
+        centroid = list(geom.centroid.coords)[0]
+        results.append({"area_m2": utm.area, "perimeter_m": utm.length,
+                        "centroid": {"lon": centroid[0], "lat": centroid[1]}, "bounds": geom.bounds})
+    return results
+
+
+PATHS: Dict[str, Callable] = {
+    "ops_transform": ops_transform_metrics,
+    "per_polygon": lambda geoms: [compute_geometry_info(g) for g in geoms],
+    "vectorized": lambda geoms: geometry_metrics(geoms),
+    "geodesic": lambda geoms: geometry_metrics(geoms, method="geodesic"),
+}
+
+
+def time_path(func: Callable, geoms, repeat: int):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(geoms)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-polygon vs vectorized geometry metrics")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--vertices", type=int, default=32)
+    parser.add_argument("--paths", nargs="+", choices=sorted(PATHS), default=list(PATHS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the fastest is kept")
+    parser.add_argument("--output", help="Write the measurements as JSON")
+    args = parser.parse_args()
+
+    runs = []
+    print(f"{'polygons':>8} {'path':>14} {'seconds':>9} {'poly/s':>10} {'max area diff':>14}")
+    for size in args.sizes:
+        geoms = synthetic_polygons(size, args.vertices)
+        reference = geometry_metrics(geoms)
+        for name in args.paths:
+            seconds, result = time_path(PATHS[name], geoms, args.repeat)
+            diff = max(abs(r["area_m2"] - ref["area_m2"]) / ref["area_m2"]
+                       for r, ref in zip(result, reference))
+            runs.append({"polygons": size, "path": name, "seconds": seconds,
+                         "polygons_per_second": size / seconds, "max_relative_area_diff": diff})
+            print(f"{size:>8} {name:>14} {seconds:>9.4f} {size / seconds:>10.0f} {diff:>14.2e}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"vertices": args.vertices, "runs": runs}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
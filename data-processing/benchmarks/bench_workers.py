@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Worker Scaling Benchmark
+Times analyze_polygons on a synthetic batch of random rectangles and
+irregular polygons over the Dhaka rasters for several --workers counts,
+and reports throughput and speed-up against one worker.
+
+The result cache and thana index are disabled so every polygon hits the
+rasters. Results are checked to match the single-worker run.
+
+Usage (from the repository root):
+  python data-processing/benchmarks/bench_workers.py --polygons 5000 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rasterio
+from rasterio.warp import transform_bounds
+
+import current_situation
+
+
+def raster_extent():
+    """(west, south, east, north) shared by the available analysis rasters, in EPSG:4326"""
+    extents = []
+    for path in current_situation.RASTER_LAYERS.values():
+        if os.path.exists(path):
+            with rasterio.open(path) as src:
+                extents.append(transform_bounds(src.crs, "EPSG:4326", *src.bounds))
+    if not extents:
+        raise SystemExit("No analysis rasters found in data-processing/processed")
+    return (max(e[0] for e in extents), max(e[1] for e in extents),
+            min(e[2] for e in extents), min(e[3] for e in extents))
+
+
+def synthetic_polygons(count: int, extent, seed: int = 0) -> List[Dict[str, Any]]:
+    """Rectangles and star-shaped polygons of 0.2-1.5 km across inside extent"""
+    rng = random.Random(seed)
+    west, south, east, north = extent
+    polygons = []
+    for i in range(count):
+        size = rng.uniform(0.002, 0.015)
+        x = rng.uniform(west, east - size)
+        y = rng.uniform(south, north - size)
+        if i % 2:
+            ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size]]
+        else:
+            cx, cy, n = x + size / 2, y + size / 2, rng.randint(6, 24)
+            ring = [[cx + math.cos(2 * math.pi * k / n) * size / 2 * rng.uniform(0.5, 1.0),
+                     cy + math.sin(2 * math.pi * k / n) * size / 2 * rng.uniform(0.5, 1.0)]
+                    for k in range(n)]
+        polygons.append({"geometry": {"type": "Polygon", "coordinates": [ring + [ring[0]]]}})
+    return polygons
+
+
+def run(polygons: List[Dict[str, Any]], workers: int, batch) -> Dict[str, Any]:
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    result = current_situation.analyze_polygons(polygons, timings, batch=batch, workers=workers)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "stages_ms": timings, "results": result["analysis_results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of analyze_polygons against worker count")
+    parser.add_argument("--polygons", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--chunk", type=int, help="Polygons per worker task (default: automatic)")
+    parser.add_argument("--batch", choices=("auto", "on", "off"), default="auto")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per worker count; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the measurements as JSON")
+    args = parser.parse_args()
+
+    current_situation.THANA_INDEX_FILE = None
+    current_situation.WORKER_CHUNK = args.chunk
+    current_situation.configure_result_cache(enabled=False)
+    batch = {"auto": None, "on": True, "off": False}[args.batch]
+
+    polygons = synthetic_polygons(args.polygons, raster_extent(), args.seed)
+    # Write the shared .npy copies up front so no run pays for them
+    current_situation.share_rasters(current_situation.RASTER_STORE.cache_dir)
+
+    # The per-raster progress lines would swamp the table
+    stderr, sys.stderr = sys.stderr, open(os.devnull, "w")
+    rows = []
+    reference = None
+    try:
+        for workers in sorted(set(args.workers)):
+            best = min((run(polygons, workers, batch) for _ in range(args.repeat)),
+                       key=lambda r: r["seconds"])
+            if reference is None:
+                reference = best["results"]
+            rows.append({
+                "workers": workers,
+                "seconds": round(best["seconds"], 3),
+                "polygons_per_second": round(len(polygons) / best["seconds"], 1),
+                "matches_first_run": best["results"] == reference,
+                "stages_ms": {k: round(v, 1) for k, v in best["stages_ms"].items()},
+            })
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    base = rows[0]["seconds"]
+    print(f"{len(polygons)} polygons, {os.cpu_count()} CPUs, batch={args.batch}")
+    print(f"{'workers':>7} {'seconds':>9} {'poly/s':>9} {'speed-up':>8}  same")
+    for row in rows:
+        row["speedup"] = round(base / row["seconds"], 2)
+        print(f"{row['workers']:>7} {row['seconds']:>9.2f} {row['polygons_per_second']:>9.0f} "
+              f"{row['speedup']:>7.2f}x  {'yes' if row['matches_first_run'] else 'NO'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"polygons": len(polygons), "cpus": os.cpu_count(), "batch": args.batch,
+                       "runs": rows}, f, indent=2)
+    return 0 if all(row["matches_first_run"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
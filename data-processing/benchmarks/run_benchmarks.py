@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Times the main processing stages on synthetic inputs (see synthetic.py),
+so it runs offline and on any machine:
+
+  summarize_raster          one AOI clipped from a raster of N x N pixels
+  analyze_polygons          a batch of AOIs against three rasters
+  read_hgt_file             SRTM3/SRTM1 tiles, one or four
+  hgt_mosaic_clip           build_hgt_mosaic + clip_mosaic over 2-4 tiles
+  merge_and_clip            process_lst.merge_and_clip over 2-4 overlapping
+                            UTM LST scenes (mosaic in memory)
+  merge_and_clip_streaming  the same scenes through merge_and_clip_streaming
+  create_lst_overlay        LST GeoTIFF -> overlay PNG
+  create_boundary_image     boundary GeoJSON -> PNG (distance mode)
+
+Every (stage, size) case runs in its own process. The first call is the
+cold run: fresh process (no raster store, transformers or LUTs yet) with
+the input files dropped from the OS page cache where posix_fadvise
+allows. The following calls are warm runs. Peak RSS is the case
+process's high-water mark.
+
+Results are written as JSON. With --baseline, each case is compared to
+the stored run and a stage whose warm time, cold time or peak RSS grew by
+more than --threshold (and by more than the noise floor) is a
+regression; the exit code is then 1. --save-baseline stores this run.
+
+Usage (from the repository root):
+  python data-processing/benchmarks/run_benchmarks.py --sizes small medium --save-baseline bench_baseline.json
+  python data-processing/benchmarks/run_benchmarks.py --sizes small medium --baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SCRIPT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import numpy as np
+from rasterio.warp import transform_bounds
+
+import synthetic
+
+RESULTS_FORMAT = 1
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "urbanome-bench")
+
+# CRS of the synthetic LST scenes (the ECOSTRESS tiles over Dhaka are UTM 45N/46N)
+LST_SCENE_CRS = "EPSG:32646"
+
+# Stage -> size name -> parameters
+CASES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "summarize_raster": {
+        "small": {"pixels": 1024},
+        "medium": {"pixels": 4096},
+        "large": {"pixels": 8192},
+    },
+    "analyze_polygons": {
+        "small": {"polygons": 10, "pixels": 2048},
+        "medium": {"polygons": 100, "pixels": 2048},
+        "large": {"polygons": 1000, "pixels": 2048},
+    },
+    "read_hgt_file": {
+        "small": {"samples": 1201},
+        "medium": {"samples": 3601},
+        "large": {"samples": 3601, "tiles": 4},
+    },
+    "hgt_mosaic_clip": {
+        "small": {"samples": 1201, "tiles": 2},
+        "medium": {"samples": 1201, "tiles": 4},
+        "large": {"samples": 3601, "tiles": 4},
+    },
+    "merge_and_clip": {
+        "small": {"pixels": 1024, "scenes": 2},
+        "medium": {"pixels": 2048, "scenes": 4},
+        "large": {"pixels": 4096, "scenes": 4},
+    },
+    "merge_and_clip_streaming": {
+        "small": {"pixels": 1024, "scenes": 2},
+        "medium": {"pixels": 2048, "scenes": 4},
+        "large": {"pixels": 4096, "scenes": 4},
+    },
+    "create_lst_overlay": {
+        "small": {"pixels": 1024},
+        "medium": {"pixels": 4096},
+        "large": {"pixels": 8192},
+    },
+    "create_boundary_image": {
+        "small": {"degrees": 0.1, "vertices": 2000},
+        "medium": {"degrees": 0.3, "vertices": 5000},
+        "large": {"degrees": 0.6, "vertices": 20000},
+    },
+}
+
+# Timing differences below this many seconds (or MB of RSS) are noise
+MIN_DELTA_S = 0.005
+MIN_DELTA_MB = 8.0
+
+
+def case_dir(workdir: str, stage: str, size: str) -> str:
+    return os.path.join(workdir, stage, size)
+
+
+def hgt_tiles(directory: str, params: Dict[str, Any]) -> List[str]:
+    """Synthetic tiles N23E090, N24E090, N23E091, N24E091 (as many as params asks for)"""
+    origins = [(23, 90), (24, 90), (23, 91), (24, 91)][:params.get("tiles", 1)]
+    paths = []
+    for i, (lat, lon) in enumerate(origins):
+        name = f"N{lat:02d}E{lon:03d}.hgt"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            synthetic.write_hgt_tile(directory, lat, lon, params["samples"], seed=i)
+        paths.append(path)
+    return paths
+
+
+def lst_scenes(directory: str, params: Dict[str, Any]) -> List[str]:
+    """
+    Overlapping square LST scenes in UTM 46N like the ECOSTRESS tiles, in a
+    row across the Dhaka extent, each a quarter covered by the next
+    """
+    west, south, east, north = transform_bounds("EPSG:4326", LST_SCENE_CRS, *synthetic.DHAKA_BOUNDS)
+    count = params["scenes"]
+    side = max(east - west, north - south) / (1 + 0.75 * (count - 1))
+    res = side / params["pixels"]
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"lst_scene_{i}.tif")
+        if not os.path.exists(path):
+            left = west + i * 0.75 * side
+            synthetic.write_lst_scene(path, (left, north - side, left + side, north), res,
+                                      LST_SCENE_CRS, nodata=np.nan, seed=i)
+        paths.append(path)
+    return paths
+
+
+def tile_bounds(params: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """Clip region inside the synthetic tiles, spanning all of them"""
+    if params.get("tiles", 1) > 2:
+        return (90.3, 23.3, 91.7, 24.7)
+    return (90.3, 23.3, 90.7, 24.7)
+
+
+def prepare(workdir: str, stage: str, size: str) -> Dict[str, Any]:
+    """Generate the inputs of one case (once; reused across runs) and return their paths"""
+    params = CASES[stage][size]
+    directory = case_dir(workdir, stage, size)
+    os.makedirs(directory, exist_ok=True)
+
+    def raster(name, kind, pixels, crs="EPSG:4326", seed=0):
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            synthetic.write_raster(path, pixels, pixels, kind, crs, seed=seed)
+        return path
+
+    if stage == "summarize_raster":
+        return {"raster": raster("lst.tif", "lst", params["pixels"])}
+    if stage == "analyze_polygons":
+        return {
+            "elevation": raster("elevation.tif", "elevation", params["pixels"], seed=1),
+            "vegetation": raster("ndvi_utm.tif", "ndvi", params["pixels"], "EPSG:32646", seed=2),
+            "temperature": raster("lst.tif", "lst", params["pixels"], seed=3),
+        }
+    if stage in ("read_hgt_file", "hgt_mosaic_clip"):
+        inputs = {"tiles": hgt_tiles(os.path.join(directory, "hgt"), params)}
+        if stage == "hgt_mosaic_clip":
+            boundary = os.path.join(directory, "boundary.geojson")
+            if not os.path.exists(boundary):
+                synthetic.write_boundary_geojson(boundary, tile_bounds(params), vertices=2000)
+            inputs["boundary"] = boundary
+        return inputs
+    if stage in ("merge_and_clip", "merge_and_clip_streaming"):
+        # Both variants read the same scenes
+        shared = case_dir(workdir, "lst_scenes", size)
+        os.makedirs(shared, exist_ok=True)
+        boundary = os.path.join(shared, "boundary.geojson")
+        if not os.path.exists(boundary):
+            synthetic.write_boundary_geojson(boundary, synthetic.DHAKA_BOUNDS, vertices=2000)
+        return {"scenes": lst_scenes(shared, params), "boundary": boundary}
+    if stage == "create_lst_overlay":
+        # The script reads and writes paths relative to the repository root
+        return {"raster": raster(os.path.join("data-processing", "processed", "dhaka_LST_map.tif"),
+                                 "lst", params["pixels"])}
+    if stage == "create_boundary_image":
+        path = os.path.join(directory, "dhaka_boundary.geojson")
+        if not os.path.exists(path):
+            west, south = 90.30, 23.65
+            synthetic.write_boundary_geojson(
+                path, (west, south, west + params["degrees"], south + params["degrees"]),
+                vertices=params["vertices"])
+        return {"boundary": path}
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def setup_case(workdir: str, stage: str, size: str) -> Tuple[Callable[[], Any], List[str]]:
+    """Import the stage's code and return (the call to time, its input files)"""
+    import current_situation as cs
+
+    params = CASES[stage][size]
+    inputs = prepare(workdir, stage, size)
+    directory = case_dir(workdir, stage, size)
+
+    if stage == "summarize_raster":
+        from shapely.geometry import box
+        west, south, east, north = synthetic.DHAKA_BOUNDS
+        # An AOI over a quarter of the raster
+        dx, dy = (east - west) / 4, (north - south) / 4
+        geom = box(west + dx, south + dy, east - dx, north - dy)
+        return (lambda: cs.summarize_raster(inputs["raster"], geom)), [inputs["raster"]]
+
+    if stage == "analyze_polygons":
+        cs.RASTER_LAYERS.update(inputs)
+        cs.THANA_INDEX_FILE = None
+        cs.configure_result_cache(enabled=False)
+        polygons = synthetic.random_polygons(params["polygons"], seed=7)
+        return (lambda: cs.analyze_polygons(polygons)), list(inputs.values())
+
+    if stage == "read_hgt_file":
+        from process_elevation import read_hgt_file
+        tiles = inputs["tiles"]
+        return (lambda: [read_hgt_file(t) for t in tiles]), tiles
+
+    if stage == "hgt_mosaic_clip":
+        from process_elevation import build_hgt_mosaic, clip_mosaic, geoms_bounds
+        with open(inputs["boundary"]) as f:
+            geoms = [feature["geometry"] for feature in json.load(f)["features"]]
+
+        def hgt_mosaic_clip():
+            mosaic, transform = build_hgt_mosaic(inputs["tiles"], geoms_bounds(geoms))
+            return clip_mosaic(mosaic, transform, geoms)
+        return hgt_mosaic_clip, inputs["tiles"]
+
+    if stage in ("merge_and_clip", "merge_and_clip_streaming"):
+        import process_lst
+        merge = getattr(process_lst, stage)
+        output_dir = os.path.join(directory, "processed")
+        return (lambda: merge(inputs["scenes"], inputs["boundary"], output_dir)), \
+            inputs["scenes"] + [inputs["boundary"]]
+
+    if stage == "create_lst_overlay":
+        from convert_lst_to_map import create_lst_overlay
+        os.chdir(directory)
+        return create_lst_overlay, [inputs["raster"]]
+
+    if stage == "create_boundary_image":
+        import create_boundary_image as cbi
+        cbi.input_geojson_path = inputs["boundary"]
+        cbi.output_raster_path = os.path.join(directory, "dhaka_boundary.png")
+        return cbi.create_boundary_image_distance, [inputs["boundary"]]
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def drop_page_cache(paths: List[str]) -> bool:
+    """Ask the OS to evict paths from the page cache; False where that is unsupported"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def peak_rss_mb() -> float:
+    """High-water RSS of this process in MB"""
+    # Linux keeps ru_maxrss across fork and exec, so a case process would
+    # report the runner's peak; VmHWM belongs to the process image itself
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(workdir: str, stage: str, size: str, repeat: int) -> Dict[str, Any]:
+    """Cold run plus repeat warm runs of one case in this process"""
+    # The stages print progress; keep it out of the measurements' output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        func, inputs = setup_case(workdir, stage, size)
+        setup_rss = peak_rss_mb()
+        cold_cache = drop_page_cache(inputs)
+
+        start = time.perf_counter()
+        func()
+        cold = time.perf_counter() - start
+
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            warm.append(time.perf_counter() - start)
+
+    return {
+        "stage": stage,
+        "size": size,
+        "params": CASES[stage][size],
+        "cold_s": round(cold, 6),
+        "page_cache_dropped": cold_cache,
+        "warm_s": round(statistics.median(warm), 6) if warm else None,
+        "warm_min_s": round(min(warm), 6) if warm else None,
+        "warm_runs": len(warm),
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-case ratios against baseline; a metric over threshold (and the noise floor) regresses"""
+    base_cases = {(c["stage"], c["size"]): c for c in baseline["cases"]}
+    rows = []
+    for case in results:
+        base = base_cases.get((case["stage"], case["size"]))
+        if base is None or "error" in case or "error" in base:
+            continue
+        for metric, floor in (("warm_s", MIN_DELTA_S), ("cold_s", MIN_DELTA_S), ("peak_rss_mb", MIN_DELTA_MB)):
+            old, new = base.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            rows.append({
+                "stage": case["stage"],
+                "size": case["size"],
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + threshold and new - old > floor,
+            })
+    return rows
+
+
+def run_suite(stages: List[str], sizes: List[str], workdir: str, repeat: int,
+              timeout: float) -> List[Dict[str, Any]]:
+    """Prepare every case's inputs, then run each case in a fresh process"""
+    results = []
+    for stage in stages:
+        for size in sizes:
+            if size not in CASES[stage]:
+                continue
+            prepare(workdir, stage, size)
+            cmd = [sys.executable, os.path.abspath(__file__), "--run-case", stage, size,
+                   "--workdir", workdir, "--repeat", str(repeat)]
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+                if proc.returncode != 0:
+                    raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip()
+                                       else f"exit {proc.returncode}")
+                case = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (RuntimeError, subprocess.TimeoutExpired, ValueError) as e:
+                case = {"stage": stage, "size": size, "params": CASES[stage][size], "error": str(e)}
+            results.append(case)
+
+            if "error" in case:
+                print(f"{stage:>24} {size:>7}  ERROR: {case['error']}")
+            else:
+                print(f"{stage:>24} {size:>7} {case['cold_s']:>9.4f} {case['warm_s']:>9.4f} "
+                      f"{case['peak_rss_mb']:>9.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the processing stages on synthetic data")
+    parser.add_argument("--stages", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", choices=("small", "medium", "large"), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per case")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="Where synthetic inputs are generated and kept")
+    parser.add_argument("--output", help="Results JSON (default: <workdir>/results.json)")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown/growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="Also write this run's results to this path")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per case")
+    parser.add_argument("--run-case", nargs=2, metavar=("STAGE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        stage, size = args.run_case
+        print(json.dumps(run_case(args.workdir, stage, size, args.repeat)))
+        return 0
+
+    print(f"{'stage':>24} {'size':>7} {'cold s':>9} {'warm s':>9} {'peak MB':>9}")
+    results = run_suite(args.stages, args.sizes, args.workdir, args.repeat, args.timeout)
+    report = {"format": RESULTS_FORMAT, "environment": environment(), "repeat": args.repeat,
+              "cases": results}
+
+    status = 1 if any("error" in case for case in results) else 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.threshold)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": comparison}
+        regressions = [row for row in comparison if row["regression"]]
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        for row in comparison:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['stage']:>24} {row['size']:>7} {row['metric']:>12} {row['baseline']:>10} -> "
+                  f"{row['current']:>10} ({row['ratio']:.2f}x) {flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            status = 1
+
+    output = args.output or os.path.join(args.workdir, "results.json")
+    for path in filter(None, (output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
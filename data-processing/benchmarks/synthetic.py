@@ -0,0 +1,160 @@
+"""
+Synthetic Inputs
+Offline stand-ins for the pipeline's data: smooth GeoTIFFs shaped like the
+LST, NDVI and elevation rasters, raw LST scenes, SRTM HGT tiles, random
+AOI polygons and a boundary GeoJSON, all over the Dhaka extent and
+reproducible from a seed.
+"""
+
+import json
+import math
+import os
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_bounds, from_origin
+from rasterio.warp import transform_bounds
+
+# (west, south, east, north) of roughly the Dhaka district
+DHAKA_BOUNDS = (90.30, 23.65, 90.55, 23.95)
+
+# Value model per raster kind: (offset, amplitude, noise, dtype)
+RASTER_KINDS = {
+    "lst": (300.0, 6.0, 0.8, "float32"),       # Kelvin
+    "ndvi": (0.35, 0.45, 0.08, "float32"),
+    "elevation": (8.0, 6.0, 1.5, "float32"),   # metres
+}
+
+
+def field(height: int, width: int, kind: str, seed: int = 0) -> np.ndarray:
+    """Smooth 2-D field (a few sine waves plus noise) with a NaN border like a clipped raster"""
+    offset, amplitude, noise, dtype = RASTER_KINDS[kind]
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    data = np.zeros((height, width), dtype=np.float32)
+    for _ in range(4):
+        fx, fy, phase = rng.uniform(1, 6), rng.uniform(1, 6), rng.uniform(0, 2 * np.pi)
+        data += np.sin(2 * np.pi * (fx * x + fy * y) + phase)
+    data *= amplitude / 4
+    data += offset
+    data += rng.normal(0, noise, size=(height, width)).astype(np.float32)
+
+    # An elliptical footprint, NaN outside, as in the district clips
+    inside = ((x - 0.5) / 0.5) ** 2 + ((y - 0.5) / 0.5) ** 2 <= 1.0
+    data[~inside] = np.nan
+    return data.astype(dtype)
+
+
+def write_raster(path: str, width: int, height: int, kind: str = "lst", crs: str = "EPSG:4326",
+                 bounds: Tuple[float, float, float, float] = DHAKA_BOUNDS, seed: int = 0) -> str:
+    """Tiled single-band GeoTIFF of a synthetic field over bounds (given in EPSG:4326)"""
+    if crs != "EPSG:4326":
+        bounds = transform_bounds("EPSG:4326", crs, *bounds)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    profile = {
+        "driver": "GTiff",
+        "dtype": RASTER_KINDS[kind][3],
+        "nodata": np.nan,
+        "width": width,
+        "height": height,
+        "count": 1,
+        "crs": crs,
+        "transform": from_bounds(*bounds, width, height),
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+        "compress": "deflate",
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(field(height, width, kind, seed), 1)
+    return path
+
+
+def write_lst_scene(path: str, bounds: Tuple[float, float, float, float], res: float,
+                    crs: str = "EPSG:4326", nodata: Optional[float] = None, seed: int = 0) -> str:
+    """
+    Untiled float32 LST scene covering bounds (in crs) at res, valid
+    everywhere, with the given nodata value (none by default, like some
+    exported scenes)
+    """
+    west, south, east, north = bounds
+    width = int(round((east - west) / res))
+    height = int(round((north - south) / res))
+    offset = RASTER_KINDS["lst"][0]
+    data = np.nan_to_num(field(height, width, "lst", seed), nan=offset)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    profile = {
+        "driver": "GTiff",
+        "dtype": "float32",
+        "nodata": nodata,
+        "width": width,
+        "height": height,
+        "count": 1,
+        "crs": crs,
+        "transform": from_origin(west, north, res, res),
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return path
+
+
+def write_hgt_tile(directory: str, lat: int, lon: int, samples: int = 1201, seed: int = 0) -> str:
+    """Big-endian int16 SRTM tile named like N23E090.hgt, with a few voids (-32768)"""
+    name = f"{'N' if lat >= 0 else 'S'}{abs(lat):02d}{'E' if lon >= 0 else 'W'}{abs(lon):03d}.hgt"
+    path = os.path.join(directory, name)
+    os.makedirs(directory, exist_ok=True)
+    data = np.nan_to_num(field(samples, samples, "elevation", seed), nan=2.0)
+    tile = np.round(data).astype(">i2")
+    rng = np.random.default_rng(seed + 1)
+    tile.flat[rng.choice(tile.size, size=tile.size // 1000, replace=False)] = -32768
+    tile.tofile(path)
+    return path
+
+
+def random_polygons(count: int, bounds: Tuple[float, float, float, float] = DHAKA_BOUNDS,
+                    seed: int = 0, max_radius: float = 0.0075) -> List[Dict[str, Any]]:
+    """Polygon AOIs as current_situation takes them: half rectangles, half star-shaped"""
+    rng = random.Random(seed)
+    west, south, east, north = bounds
+    polygons = []
+    for i in range(count):
+        radius = rng.uniform(0.001, max_radius)
+        cx = rng.uniform(west + radius, east - radius)
+        cy = rng.uniform(south + radius, north - radius)
+        if i % 2:
+            ring = [[cx - radius, cy - radius], [cx + radius, cy - radius],
+                    [cx + radius, cy + radius], [cx - radius, cy + radius]]
+        else:
+            n = rng.randint(6, 32)
+            ring = [[cx + math.cos(2 * math.pi * k / n) * radius * rng.uniform(0.5, 1.0),
+                     cy + math.sin(2 * math.pi * k / n) * radius * rng.uniform(0.5, 1.0)]
+                    for k in range(n)]
+        polygons.append({"geometry": {"type": "Polygon", "coordinates": [ring + [ring[0]]]}})
+    return polygons
+
+
+def write_boundary_geojson(path: str, bounds: Tuple[float, float, float, float] = DHAKA_BOUNDS,
+                           vertices: int = 2000, seed: int = 0) -> str:
+    """FeatureCollection holding one wiggly district-like polygon inscribed in bounds"""
+    rng = np.random.default_rng(seed)
+    west, south, east, north = bounds
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    # Low-frequency wobble so the outline looks like a river-bounded district
+    wobble = sum(rng.uniform(0.02, 0.06) * np.sin(k * angles + rng.uniform(0, 2 * np.pi))
+                 for k in range(2, 9))
+    radius = 0.85 + wobble + rng.normal(0, 0.004, vertices)
+    x = (west + east) / 2 + np.cos(angles) * radius * (east - west) / 2
+    y = (south + north) / 2 + np.sin(angles) * radius * (north - south) / 2
+    ring = np.column_stack((x, y)).tolist()
+    feature = {
+        "type": "Feature",
+        "properties": {"shapeName": "Dhaka"},
+        "geometry": {"type": "Polygon", "coordinates": [ring + [ring[0]]]},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": [feature]}, f)
+    return path
@@ -0,0 +1,73 @@
+"""
+Cloud-Optimized GeoTIFF writer shared by the processing scripts.
+
+Outputs are internally tiled, DEFLATE-compressed and carry internal
+overviews, so current_situation.py can read just the tiles under an AOI
+and fall back to an overview level for very large AOIs.
+"""
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.env import GDALVersion
+from rasterio.io import MemoryFile
+from rasterio.shutil import copy as copy_dataset
+
+COG_BLOCKSIZE = 512
+OVERVIEW_FACTORS = [2, 4, 8, 16, 32]
+
+
+def overview_factors(height, width, blocksize=COG_BLOCKSIZE):
+    """Overview decimations down to roughly one block"""
+    return [f for f in OVERVIEW_FACTORS if max(height, width) / f >= blocksize / 2] or [2]
+
+
+def copy_as_cog(src, path, overview_resampling="average", blocksize=COG_BLOCKSIZE):
+    """Copy an open dataset to path as a COG; GDAL streams the copy tile by tile"""
+    dtype = np.dtype(src.dtypes[0])
+    predictor = 3 if np.issubdtype(dtype, np.floating) else 2
+
+    if GDALVersion.runtime().at_least("3.1"):
+        copy_dataset(src, path, driver="COG", blocksize=blocksize, compress="DEFLATE",
+                     predictor=predictor, overview_resampling=overview_resampling.upper(),
+                     bigtiff="IF_SAFER")
+        return path
+
+    # Older GDAL: tiled GeoTIFF with overviews built first, copied in COG order
+    # (src must be writable: an in-memory dataset or a file opened in r+ mode)
+    src.build_overviews(overview_factors(src.height, src.width, blocksize),
+                        Resampling[overview_resampling])
+    copy_dataset(src, path, driver="GTiff", tiled=True, blockxsize=blocksize,
+                 blockysize=blocksize, compress="DEFLATE", predictor=predictor,
+                 copy_src_overviews=True)
+    return path
+
+
+def write_cog(path, data, profile, overview_resampling="average", blocksize=COG_BLOCKSIZE):
+    """Write a (bands, rows, cols) or (rows, cols) array as a COG using profile's georeferencing"""
+    if data.ndim == 2:
+        data = data[np.newaxis, :, :]
+
+    profile = profile.copy()
+    profile.update({
+        "driver": "GTiff",
+        "count": data.shape[0],
+        "height": data.shape[1],
+        "width": data.shape[2],
+        "dtype": data.dtype.name
+    })
+    for key in ("blockxsize", "blockysize", "tiled", "compress", "interleave", "photometric"):
+        profile.pop(key, None)
+
+    with MemoryFile() as memfile:
+        with memfile.open(**profile) as mem:
+            mem.write(data)
+            copy_as_cog(mem, path, overview_resampling, blocksize)
+    return path
+
+
+def convert_to_cog(src_path, path, overview_resampling="average", blocksize=COG_BLOCKSIZE):
+    """Rewrite a GeoTIFF on disk (e.g. one written block by block) as a COG"""
+    with rasterio.open(src_path, "r+") as src:
+        copy_as_cog(src, path, overview_resampling, blocksize)
+    return path
@@ -3,8 +3,8 @@ import glob
 import json
 import numpy as np
 import rasterio
-import matplotlib.pyplot as plt
-from matplotlib.colors import Normalize
+
+from overlay_render import colorize, colormap_lut, write_png
 
 def create_lst_overlay():
     # candidate paths (preferred names first)
@@ -54,30 +54,10 @@ def create_lst_overlay():
                 if p_high == p_low:
                     p_high = p_low + 1.0
 
-            norm = Normalize(vmin=p_low, vmax=p_high, clip=True)
-            cmap = plt.get_cmap("inferno")
-
-            # prepare normalized RGBA image
-            normed = np.zeros_like(arr, dtype=np.float32)
-            normed[valid_mask] = norm(arr[valid_mask])
-            rgba = cmap(normed)  # returns MxNx4 float RGBA in 0..1
-
-            # set alpha: transparent where invalid
-            alpha = np.zeros_like(normed, dtype=np.float32)
-            alpha[valid_mask] = 0.75  # 75% opacity on valid pixels
-            rgba[..., 3] = alpha
-
-            # Plot and save with geographic extent
-            fig, ax = plt.subplots(figsize=(10, 8), dpi=150)
-            im = ax.imshow(rgba,
-                           extent=[bounds.left, bounds.right, bounds.bottom, bounds.top],
-                           origin="upper",
-                           interpolation="bilinear",
-                           aspect="auto")
-            ax.axis("off")
-            plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-            plt.savefig(output_png, bbox_inches="tight", pad_inches=0, transparent=True)
-            plt.close()
+            # inferno LUT straight to RGBA, one PNG pixel per raster pixel;
+            # 75% opacity on valid pixels, transparent elsewhere
+            rgba = colorize(arr, valid_mask, colormap_lut("inferno"), p_low, p_high)
+            write_png(output_png, rgba)
 
             bounds_dict = {
                 "north": float(bounds.top),
@@ -1,27 +1,9 @@
 import rasterio
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
 import json
 import os
 
-def create_flood_risk_colormap():
-    """Create a colormap for flood risk visualization"""
-    colors = [
-        '#8B0000',  # Dark red - Very high flood risk
-        '#DC143C',  # Crimson - High flood risk
-        '#FF4500',  # Orange red - Moderate-high flood risk
-        '#FF6347',  # Tomato - Moderate flood risk
-        '#FFA500',  # Orange - Moderate flood risk
-        '#FFD700',  # Gold - Lower moderate flood risk
-        '#FFFF00',  # Yellow - Transitional
-        '#ADFF2F',  # Green yellow - Lower flood risk
-        '#32CD32',  # Lime green - Low flood risk
-        '#228B22',  # Forest green - Very low flood risk
-        '#006400'   # Dark green - Minimal flood risk
-    ]
-    
-    return LinearSegmentedColormap.from_list('flood_risk', colors, N=256)
+from overlay_render import colorize, colormap_lut, write_png
 
 def create_elevation_overlay():
     # File paths
@@ -64,50 +46,15 @@ def create_elevation_overlay():
                 print("no data found")
                 return bounds_dict
             
-            # color mapping
-            cmap = create_flood_risk_colormap()
-            
-            # Normalize data for better color mapping
-            norm_data = np.zeros_like(elevation_data, dtype=np.float32)
-            valid_mask = ~np.isnan(elevation_data)
-            
             # Use percentile-based normalization
             p5, p95 = np.percentile(valid_data, [5, 95])
-            clipped_data = np.clip(elevation_data, p5, p95)
-            norm_data[valid_mask] = (clipped_data[valid_mask] - p5) / (p95 - p5)
-            
-            # Apply colormap
-            colored_data = cmap(norm_data)
-            
-            # Set transparency
-            alpha_channel = np.zeros_like(norm_data, dtype=np.float32)
-            alpha_channel[valid_mask] = 0.75  # 75% opacity for valid data
-            colored_data[:, :, 3] = alpha_channel
-            
-            # Create the plot
-            fig, ax = plt.subplots(figsize=(10, 8), dpi=150)
-            
-            # Display the image with correct geographic coordinates
-            im = ax.imshow(colored_data, 
-                          extent=[bounds.left, bounds.right, bounds.bottom, bounds.top],
-                          aspect='auto',
-                          origin='upper',
-                          interpolation='bilinear')
-            
-            # Remove axis and borders
-            ax.axis('off')
-            plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-            
-            # Save the image
-            plt.savefig(output_png, 
-                       bbox_inches='tight', 
-                       pad_inches=0, 
-                       transparent=True, 
-                       dpi=150,
-                       facecolor='none',
-                       format='png')
-            plt.close()
-            
+
+            # Color through the flood risk LUT, one PNG pixel per raster pixel;
+            # 75% opacity for valid data, transparent elsewhere
+            valid_mask = ~np.isnan(elevation_data)
+            colored_data = colorize(elevation_data, valid_mask, colormap_lut("flood_risk"), p5, p95)
+            write_png(output_png, colored_data)
+
             # Save bounds information
             with open(output_bounds, 'w') as f:
                 json.dump(bounds_dict, f, indent=2)
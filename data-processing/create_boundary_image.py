@@ -1,9 +1,16 @@
+import argparse
 import geopandas as gpd
 import rasterio
+from rasterio.errors import NotGeoreferencedWarning
 from rasterio.features import rasterize
 from affine import Affine
 import numpy as np
 import os
+import shapely
+import time
+import warnings
+
+from overlay_render import write_png_bands
 
 # Try to import scipy for enhanced effects
 try:
@@ -22,6 +29,20 @@ output_raster_path = os.path.join(output_dir, 'dhaka_boundary.png')
 # Create output directory if it doesn't exist
 os.makedirs(output_dir, exist_ok=True)
 
+# Canvas resolution and line widths, in degrees
+PIXEL_SIZE = 0.00005
+STROKE_BUFFER = 0.001
+GLOW_BUFFER = 0.0015
+# Width (pixels) of the lighter band along both edges of the stroke
+HIGHLIGHT_WIDTH = 2
+
+MAIN_BOUNDARY_RGBA = [220, 20, 60, 255]  # Crimson red, opaque
+HIGHLIGHT_RGBA = [255, 100, 100, 255]    # Lighter red highlight
+GLOW_RGBA = [255, 182, 193, 80]          # Light pink glow, semi-transparent
+
+# Side (pixels) of the canvas blocks processed in distance mode
+DEFAULT_BLOCK_SIZE = 256
+
 # --- Main script ---
 def create_boundary_image():
     """
@@ -48,7 +69,7 @@ def create_boundary_image():
     
     # A smaller pixel size means higher resolution and a thicker line when buffered.
     # Adjust this value to control line thickness. Smaller value = thicker line.
-    pixel_size = 0.00005 # Adjusted for a thicker line
+    pixel_size = PIXEL_SIZE # Adjusted for a thicker line
 
     width = int((xmax - xmin) / pixel_size)
     height = int((ymax - ymin) / pixel_size)
@@ -57,7 +78,7 @@ def create_boundary_image():
     # 4. Extract the boundary lines and apply a buffer to make them thicker
     # The buffer distance is in degrees, so a small value is needed.
     # Adjust this value to change the line thickness.
-    buffered_boundary_polygons = gdf.boundary.buffer(0.001)
+    buffered_boundary_polygons = gdf.boundary.buffer(STROKE_BUFFER)
 
     # 5. Create a generator of (geometry, value) pairs for rasterization
     shapes_for_raster = ((geom, 1) for geom in buffered_boundary_polygons)
@@ -80,13 +101,13 @@ def create_boundary_image():
     raster_rgba = np.zeros((4, height, width), dtype=np.uint8)
 
     # Define colors for the boundary with highlight effect
-    main_boundary_color = [220, 20, 60]  # RGB for crimson red
-    highlight_color = [255, 100, 100]     # RGB for lighter red highlight
-    glow_color = [255, 182, 193]          # RGB for light pink glow
+    main_boundary_color = MAIN_BOUNDARY_RGBA[:3]  # RGB for crimson red
+    highlight_color = HIGHLIGHT_RGBA[:3]          # RGB for lighter red highlight
+    glow_color = GLOW_RGBA[:3]                    # RGB for light pink glow
 
     # Create different layers for highlight effect
     # First, create a slightly larger buffer for the glow effect
-    glow_buffered_boundary = gdf.boundary.buffer(0.0015)  # Slightly larger buffer for glow
+    glow_buffered_boundary = gdf.boundary.buffer(GLOW_BUFFER)  # Slightly larger buffer for glow
     shapes_for_glow = ((geom, 1) for geom in glow_buffered_boundary)
     
     try:
@@ -151,5 +172,154 @@ def create_boundary_image():
     except Exception as e:
         print(f"Error saving PNG file: {e}")
 
+def bounded_distance(line, radius):
+    """
+    Euclidean distance (pixels) from every pixel to the nearest set pixel of
+    line, exact up to radius; farther pixels get a value above radius.
+    Separable two-pass transform: distance to the nearest line pixel in the
+    same column, then the minimum over horizontal offsets of dy^2 + dx^2.
+    """
+    rows = np.arange(line.shape[0], dtype=np.float32)[:, np.newaxis]
+    above = np.maximum.accumulate(np.where(line, rows, -np.inf).astype(np.float32), axis=0)
+    below = np.minimum.accumulate(np.where(line, rows, np.inf).astype(np.float32)[::-1], axis=0)[::-1]
+    vertical = np.minimum(rows - above, below - rows)
+    np.minimum(vertical, radius + 1, out=vertical)
+
+    vertical *= vertical
+    squared = vertical.copy()
+    for k in range(1, radius + 1):
+        np.minimum(squared[:, k:], vertical[:, :-k] + k * k, out=squared[:, k:])
+        np.minimum(squared[:, :-k], vertical[:, k:] + k * k, out=squared[:, :-k])
+    return np.sqrt(squared, out=squared)
+
+
+def boundary_bands(lines, transform, width, height, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield the RGBA canvas one row of blocks at a time. Only blocks within
+    the glow radius of the line are rasterized: each gets the line (clipped
+    to the block plus a glow-radius halo) burnt in once, one distance
+    transform over the part of the block within the halo of the burnt
+    line, and the glow, stroke and highlight written in place by
+    thresholding the distance. Rows of blocks the line does not reach
+    share one transparent band.
+    """
+    stroke_px = STROKE_BUFFER / PIXEL_SIZE
+    glow_px = GLOW_BUFFER / PIXEL_SIZE
+    halo = int(np.ceil(glow_px))
+    line = shapely.union_all(lines)
+    shapely.prepare(line)
+    empty = np.zeros((block_size, width, 4), dtype=np.uint8)
+
+    n_rows = -(-height // block_size)
+    n_cols = -(-width // block_size)
+    for block_row in range(n_rows):
+        row0 = block_row * block_size
+        row1 = min(row0 + block_size, height)
+        band = None
+
+        # Block windows grown by the halo, so line pixels just outside still reach the block
+        col0s = np.arange(n_cols) * block_size
+        col1s = np.minimum(col0s + block_size, width)
+        top, bottom = max(row0 - halo, 0), min(row1 + halo, height)
+        lefts, rights = np.maximum(col0s - halo, 0), np.minimum(col1s + halo, width)
+        west, north = transform * (lefts, top)
+        east, south = transform * (rights, bottom)
+        boxes = shapely.box(west, south, east, north)
+
+        for block_col in np.flatnonzero(shapely.intersects(boxes, line)):
+            col0, col1, left = col0s[block_col], col1s[block_col], lefts[block_col]
+            window_line = shapely.clip_by_rect(line, *boxes[block_col].bounds)
+            burnt = rasterize([(window_line, 1)], out_shape=(bottom - top, rights[block_col] - left),
+                              transform=transform * Affine.translation(left, top),
+                              fill=0, all_touched=True, dtype=rasterio.uint8).astype(bool)
+            rows = np.flatnonzero(burnt.any(axis=1))
+            cols = np.flatnonzero(burnt.any(axis=0))
+            if rows.size == 0:
+                continue
+
+            # Block pixels within the halo of the line's bounding box, and
+            # the burnt window their distances depend on (all in burnt pixels)
+            r0, r1 = max(row0 - top, rows[0] - halo), min(row1 - top, rows[-1] + 1 + halo)
+            c0, c1 = max(col0 - left, cols[0] - halo), min(col1 - left, cols[-1] + 1 + halo)
+            if r0 >= r1 or c0 >= c1:
+                continue
+            s0, s1 = max(r0 - halo, 0), min(r1 + halo, burnt.shape[0])
+            t0, t1 = max(c0 - halo, 0), min(c1 + halo, burnt.shape[1])
+            distance = bounded_distance(burnt[s0:s1, t0:t1], halo)[r0 - s0:r1 - s0, c0 - t0:c1 - t0]
+
+            if band is None:
+                band = np.zeros((row1 - row0, width, 4), dtype=np.uint8)
+            block = band[top + r0 - row0:top + r1 - row0, left + c0:left + c1]
+            main = distance <= stroke_px
+            block[distance <= glow_px] = GLOW_RGBA
+            block[main] = MAIN_BOUNDARY_RGBA
+            block[main & (distance > stroke_px - HIGHLIGHT_WIDTH)] = HIGHLIGHT_RGBA
+
+        yield empty[:row1 - row0] if band is None else band
+
+
+def write_georeference(path, crs, transform):
+    """Write the PNG's .aux.xml sidecar with crs and transform, replacing any stale one"""
+    sidecar = path + ".aux.xml"
+    if os.path.exists(sidecar):
+        os.remove(sidecar)
+    with warnings.catch_warnings():
+        # The freshly written PNG has no georeferencing until this sets it
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with rasterio.open(path, "r+") as dst:
+            dst.crs = crs
+            dst.transform = transform
+
+
+def create_boundary_image_distance(block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Same image as create_boundary_image, from one rasterization of the
+    boundary line and a distance transform per block near it. Memory and
+    time follow the boundary length rather than the canvas area; the PNG
+    is streamed out one row of blocks at a time.
+    """
+    print("Starting boundary image creation (distance mode)...")
+    if not os.path.exists(input_geojson_path):
+        print(f"Error: GeoJSON file not found at {input_geojson_path}")
+        return
+
+    try:
+        gdf = gpd.read_file(input_geojson_path)
+    except Exception as e:
+        print(f"Error reading GeoJSON file: {e}")
+        return
+
+    start = time.perf_counter()
+    xmin, ymin, xmax, ymax = gdf.total_bounds
+    width = int((xmax - xmin) / PIXEL_SIZE)
+    height = int((ymax - ymin) / PIXEL_SIZE)
+    transform = Affine(PIXEL_SIZE, 0, xmin, 0, -PIXEL_SIZE, ymax)
+    lines = [geom for geom in gdf.boundary if geom is not None and not geom.is_empty]
+
+    try:
+        write_png_bands(output_raster_path, width, height,
+                        boundary_bands(lines, transform, width, height, block_size))
+        write_georeference(output_raster_path, gdf.crs, transform)
+        print(f"Successfully created a {width}x{height} transparent PNG boundary image in "
+              f"{time.perf_counter() - start:.1f}s at:\n{output_raster_path}")
+    except Exception as e:
+        print(f"Error saving PNG file: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the Dhaka boundary as a transparent PNG")
+    parser.add_argument("--mode", choices=("distance", "mask"), default="distance",
+                        help="distance: one line rasterization and a distance transform near the line; "
+                             "mask: full-canvas buffered masks (the original method)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="Block size (pixels) in distance mode")
+    args = parser.parse_args()
+
+    if args.mode == "distance":
+        create_boundary_image_distance(args.block_size)
+    else:
+        create_boundary_image()
+
+
 if __name__ == "__main__":
-    create_boundary_image()
\ No newline at end of file
+    main()
@@ -2,22 +2,49 @@
 """
 Current Situation Analysis Script
 Analyzes polygon AOI and generates environmental baseline statistics
+
+Besides the one-shot CLI, the script can run as a long-lived worker
+(--worker) that keeps rasters and CRS transformers loaded and answers
+line-delimited JSON requests on stdin/stdout or on a local Unix socket.
+With --stream it reads NDJSON or a GeoJSON FeatureCollection incrementally
+and writes one JSON line per polygon as soon as it is analyzed.
+
+Progress logging goes to stderr only with --verbose (warnings and errors
+always do). --timings adds per-stage timers and pixel/byte counters (see
+instrumentation.py) to the JSON result, --metrics-file streams them as
+JSON lines, and --profile writes a cProfile dump.
 """
 
+import io
 import json
+import logging
+import math
 import sys
+import time
+import socket
 import argparse
-import numpy as np
-import rasterio
-import rasterio.mask
+import socketserver
+import cProfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from shapely.geometry import shape
-from shapely.ops import transform
-from typing import List, Dict, Any
-import pyproj
+from typing import List, Dict, Any, Optional
 
 
 import os
 
+from raster_store import RasterStore
+from zonal_stats import polygon_stats, batch_polygon_stats, batch_polygon_records
+from thana_index import ThanaIndex, DEFAULT_INDEX_FILE
+from result_cache import ResultCache, cache_key
+from reprojection import Reprojector, get_transformer
+from geometry_metrics import METHODS as GEOMETRY_METHODS, geometry_metrics, utm_epsg
+from json_stream import iter_polygons
+from instrumentation import Metrics, MetricsWriter, collect, timer
+import instrumentation
+
+logger = logging.getLogger("current_situation")
+
 # Get the directory of this script and construct paths dynamically
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(SCRIPT_DIR, "processed")
@@ -25,212 +52,880 @@ ELEVATION_FILE = os.path.join(DATA_PATH, "dhaka_elevation.tif")
 GREEN_FILE = os.path.join(DATA_PATH, "dhaka_green_space.tif")
 LST_FILE = os.path.join(DATA_PATH, "dhaka_LST_map.tif")  # Fixed typo: LSR -> LST
 
+# Result section name -> raster file
+RASTER_LAYERS = {
+    "elevation": ELEVATION_FILE,
+    "vegetation": GREEN_FILE,
+    "temperature": LST_FILE,
+}
+
+# NDVI above this value counts as green area
+GREEN_NDVI_THRESHOLD = 0.4
+LAYER_THRESHOLDS = {"vegetation": GREEN_NDVI_THRESHOLD}
+
+# Area and perimeter: "utm" (each polygon's own UTM zone) or "geodesic" (WGS84 ellipsoid)
+GEOMETRY_METHOD = "utm"
+
+# Polygon count from which analyze_polygons switches to the batch engine
+BATCH_MIN_POLYGONS = 16
+
+# Rasters are opened once per process; small ones are clipped in memory, large
+# ones are read one AOI window at a time
+RASTER_STORE = RasterStore(backend="auto")
+
+
+def configure_raster_store(backend: str = "auto", cache_dir: Optional[str] = None,
+                           resident_max_mb: float = 512) -> RasterStore:
+    """Replace the process-wide raster store, e.g. to switch to the memmap backend"""
+    global RASTER_STORE
+    RASTER_STORE.close()
+    RASTER_STORE = RasterStore(backend=backend, cache_dir=cache_dir,
+                               resident_max_bytes=int(resident_max_mb * 1024 * 1024))
+    return RASTER_STORE
+
+
+# AOI windows above this many pixels are read from a raster overview and give
+# approximate stats (marked "overview_factor"); None always reads full resolution
+APPROX_MAX_PIXELS: Optional[int] = None
+
+# Polygons per task of the --workers pool; None gives about four tasks per worker
+WORKER_CHUNK: Optional[int] = None
+
+# Per-polygon results keyed on geometry + raster versions; None disables caching
+RESULT_CACHE: Optional[ResultCache] = ResultCache()
+
+
+def configure_result_cache(max_entries: int = 256, db_path: Optional[str] = None,
+                           db_max_mb: float = 256, enabled: bool = True) -> Optional[ResultCache]:
+    """Replace the process-wide result cache (memory LRU plus optional SQLite tier)"""
+    global RESULT_CACHE
+    if RESULT_CACHE is not None:
+        RESULT_CACHE.close()
+    RESULT_CACHE = ResultCache(max_entries, db_path, int(db_max_mb * 1024 * 1024)) if enabled else None
+    return RESULT_CACHE
+
+
+# Precomputed thana statistics (see thana_index.py); None path disables lookups
+THANA_INDEX_FILE: Optional[str] = DEFAULT_INDEX_FILE
+_thana_index_cache: Dict[str, Any] = {}
+
+
+def get_thana_index() -> Optional[ThanaIndex]:
+    """The thana index, if one exists and matches the current rasters"""
+    if not THANA_INDEX_FILE or not os.path.exists(THANA_INDEX_FILE):
+        return None
+    mtime = os.path.getmtime(THANA_INDEX_FILE)
+    if _thana_index_cache.get("mtime") != mtime:
+        try:
+            _thana_index_cache["index"] = ThanaIndex.load(THANA_INDEX_FILE)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable thana index {THANA_INDEX_FILE}: {e}")
+            _thana_index_cache["index"] = None
+        _thana_index_cache["mtime"] = mtime
+
+    index = _thana_index_cache["index"]
+    if index is None or not index.is_current(RASTER_LAYERS, LAYER_THRESHOLDS):
+        return None
+    return index
+
+
+def stats_from_index(index: ThanaIndex, geom, to_crs: Reprojector,
+                     allow_remainder: bool = True) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Layer stats of an AOI that contains whole thanas, merged from their
+    stored records. The uncovered remainder, if any, is computed from the
+    rasters (only when allow_remainder). None means the index cannot help.
+    """
+    zones = index.covered_zones(geom)
+    if not zones:
+        return None
+
+    remainder_records = None
+    remainder = index.remainder(geom, zones)
+    if remainder is not None:
+        if not allow_remainder:
+            return None
+        layers, errors = load_layers()
+        records = batch_polygon_records([remainder], layers, to_crs, LAYER_THRESHOLDS)[0]
+        remainder_records = {**errors, **records}
+
+    logger.info(f"Answering from {len(zones)} indexed thanas")
+    return index.combine(geom, zones, to_crs, remainder_records)
+
+
+@contextmanager
+def stage_timer(timings: Optional[Dict[str, float]], stage: str):
+    """
+    Add the wall time of the enclosed block to timings[stage] in
+    milliseconds, and to the active instrumentation collector
+    """
+    with timer(stage):
+        if timings is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000.0
+
 
 def summarize_raster(raster_path: str, polygon_geom) -> Dict[str, Any]:
     """Clip raster to polygon and return summary statistics"""
     try:
         if not os.path.exists(raster_path):
-            print(f"Raster file not found: {raster_path}", file=sys.stderr)
+            logger.info(f"Raster file not found: {raster_path}")
             return {"error": f"File not found: {raster_path}"}
-            
-        print(f"Analyzing raster: {raster_path}", file=sys.stderr)
-        
-        with rasterio.open(raster_path) as src:
-            print(f"Raster info - CRS: {src.crs}, bounds: {src.bounds}", file=sys.stderr)
-            print(f"Original polygon bounds: {polygon_geom.bounds}", file=sys.stderr)
-            
-            # Transform polygon to match raster CRS if needed
-            polygon_for_analysis = polygon_geom
-            if str(src.crs) != 'EPSG:4326':
-                print(f"Transforming polygon from EPSG:4326 to {src.crs}", file=sys.stderr)
-                # Create transformer from WGS84 to raster CRS
-                transformer = pyproj.Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
-                polygon_for_analysis = transform(transformer.transform, polygon_geom)
-                print(f"Transformed polygon bounds: {polygon_for_analysis.bounds}", file=sys.stderr)
-            
-            # Check if polygon overlaps with raster
-            raster_bounds = src.bounds
-            poly_bounds = polygon_for_analysis.bounds
-            
-            print(f"Checking overlap - Raster: {raster_bounds}, Polygon: {poly_bounds}", file=sys.stderr)
-            
-            if (poly_bounds[2] < raster_bounds[0] or poly_bounds[0] > raster_bounds[2] or
-                poly_bounds[3] < raster_bounds[1] or poly_bounds[1] > raster_bounds[3]):
-                return {"error": "Polygon does not overlap with raster data"}
-            
-            out_image, out_transform = rasterio.mask.mask(src, [polygon_for_analysis], crop=True)
-            out_data = out_image[0].astype(float)
-            out_data[out_data == src.nodata] = np.nan
-
-            values = out_data[~np.isnan(out_data)]
-            if len(values) == 0:
-                return {"mean": None, "min": None, "max": None, "valid_pixels": 0}
-
-            result = {
-                "mean": float(np.nanmean(values)),
-                "min": float(np.nanmin(values)),
-                "max": float(np.nanmax(values)),
-                "valid_pixels": int(values.size),
-                "total_pixels": int(out_data.size),
-                "raster_crs": str(src.crs)
-            }
-            
-            print(f"Raster analysis complete - Mean: {result['mean']:.2f}, Valid pixels: {result['valid_pixels']}", file=sys.stderr)
-            return result
-            
+
+        logger.info(f"Analyzing raster: {raster_path}")
+        layer = RASTER_STORE.get(raster_path)
+        result = polygon_stats(polygon_geom, {"raster": layer}, Reprojector(),
+                               max_pixels=APPROX_MAX_PIXELS)["raster"]
+        if result.get("mean") is not None:
+            logger.info(f"Raster analysis complete - Mean: {result['mean']:.2f}, Valid pixels: {result['valid_pixels']}")
+        return result
+
     except Exception as e:
-        print(f"Error analyzing raster {raster_path}: {e}", file=sys.stderr)
+        logger.error(f"Error analyzing raster {raster_path}: {e}")
         return {"error": str(e)}
 
 
-def compute_geometry_info(polygon_geom) -> Dict[str, Any]:
+def compute_geometry_info(polygon_geom, to_crs: Optional[Reprojector] = None) -> Dict[str, Any]:
     """Compute area, perimeter, centroid, bounding box of polygon"""
+    return geometry_metrics([polygon_geom], to_crs, GEOMETRY_METHOD)[0]
+
+
+def load_layers():
+    """Return ({name: RasterLayer}, {name: error stats}) for the analysis rasters"""
+    layers = {}
+    errors: Dict[str, Dict[str, Any]] = {}
+    for name, raster_path in RASTER_LAYERS.items():
+        if not os.path.exists(raster_path):
+            logger.info(f"Raster file not found: {raster_path}")
+            errors[name] = {"error": f"File not found: {raster_path}"}
+            continue
+        try:
+            layers[name] = RASTER_STORE.get(raster_path)
+        except Exception as e:
+            logger.error(f"Error loading raster {raster_path}: {e}")
+            errors[name] = {"error": str(e)}
+    return layers, errors
 
-    # Reproject to UTM for accurate area/perimeter (Dhaka ~ UTM zone 46N EPSG:32646)
-    project_to_utm = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:32646", always_xy=True).transform
-    polygon_utm = transform(project_to_utm, polygon_geom)
 
-    area_m2 = polygon_utm.area
-    perimeter_m = polygon_utm.length
-    centroid = list(polygon_geom.centroid.coords)[0]
-    bounds = polygon_geom.bounds  # (minx, miny, maxx, maxy)
+def build_analysis(geom_info: Dict[str, Any], stats: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble the per-polygon analysis block from geometry info and layer stats"""
+    green_stats = dict(stats["vegetation"])
+    green_area_percent = green_stats.pop("percent_above", None)
 
     return {
-        "area_m2": float(area_m2),
-        "area_km2": float(area_m2 / 1e6),
-        "perimeter_m": float(perimeter_m),
-        "centroid": {"lon": centroid[0], "lat": centroid[1]},
-        "bounding_box": {
-            "min_lon": bounds[0],
-            "min_lat": bounds[1],
-            "max_lon": bounds[2],
-            "max_lat": bounds[3],
-        }
+        "geometry_info": geom_info,
+        "elevation": stats["elevation"],
+        "vegetation": {
+            **green_stats,
+            "green_area_percent": green_area_percent
+        },
+        "temperature": stats["temperature"]
     }
 
 
-def analyze_polygon(polygon: Dict) -> Dict[str, Any]:
+def analysis_cache_key(geom) -> Optional[str]:
+    return cache_key(geom, RASTER_LAYERS, {"thresholds": LAYER_THRESHOLDS, "max_pixels": APPROX_MAX_PIXELS,
+                                           "geometry": GEOMETRY_METHOD})
+
+
+def analyze_polygon(polygon: Dict, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
     """Perform full analysis for one polygon"""
     geom = shape(polygon["geometry"])
 
-    # Geometry info
-    geom_info = compute_geometry_info(geom)
-
-    # Elevation stats
-    elevation_stats = summarize_raster(ELEVATION_FILE, geom)
+    # Repeat submissions of the same shape come from the result cache
+    key = None
+    if RESULT_CACHE is not None:
+        with stage_timer(timings, "cache"):
+            key = analysis_cache_key(geom)
+            cached = RESULT_CACHE.get(key) if key is not None else None
+        if cached is not None:
+            logger.info("Answered from result cache")
+            return cached
+
+    analysis = analyze_geometry(geom, timings)
+    if key is not None:
+        RESULT_CACHE.put(key, analysis)
+    return analysis
+
+
+def analyze_geometry(geom, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Analysis of one EPSG:4326 geometry, from the thana index or the rasters"""
+    # Each target CRS is projected once and shared by index, metrics and rasters
+    to_crs = Reprojector()
+
+    # Whole thanas are answered from the precomputed index
+    with stage_timer(timings, "index"):
+        index = get_thana_index()
+        indexed_stats = None
+        if index is not None:
+            analysis = index.exact(geom)
+            if analysis is not None:
+                logger.info("Answered from thana index (exact match)")
+                return analysis
+            indexed_stats = stats_from_index(index, geom, to_crs)
 
-    # Green space stats (NDVI)
-    green_stats = summarize_raster(GREEN_FILE, geom)
-    green_area_percent = None
-    if green_stats.get("mean") is not None and os.path.exists(GREEN_FILE):
+    # Geometry info
+    with stage_timer(timings, "geometry"):
+        geom_info = compute_geometry_info(geom, to_crs)
+
+    if indexed_stats is not None:
+        return build_analysis(geom_info, indexed_stats)
+
+    # Every layer in one pass: the polygon mask is built once per raster grid
+    with stage_timer(timings, "rasters"):
+        layers, stats = load_layers()
+        stats.update(polygon_stats(geom, layers, to_crs, thresholds=LAYER_THRESHOLDS,
+                                   max_pixels=APPROX_MAX_PIXELS))
+
+    return build_analysis(geom_info, stats)
+
+
+def quick_analysis(geom, index: Optional[ThanaIndex], timings: Optional[Dict[str, float]] = None):
+    """
+    (analysis, cache key) for a geometry that needs no raster pass: a
+    cached result, an indexed thana or a union of whole thanas. analysis
+    is None when the rasters are needed.
+    """
+    key = None
+    if RESULT_CACHE is not None:
+        with stage_timer(timings, "cache"):
+            key = analysis_cache_key(geom)
+            cached = RESULT_CACHE.get(key) if key is not None else None
+        if cached is not None:
+            return cached, key
+
+    if index is not None:
+        to_crs = Reprojector()
+        with stage_timer(timings, "index"):
+            analysis = index.exact(geom)
+            indexed_stats = None if analysis is not None else \
+                stats_from_index(index, geom, to_crs, allow_remainder=False)
+        if indexed_stats is not None:
+            analysis = build_analysis(compute_geometry_info(geom, to_crs), indexed_stats)
+        if analysis is not None:
+            if key is not None:
+                RESULT_CACHE.put(key, analysis)
+            return analysis, key
+
+    return None, key
+
+
+def analyze_polygons_batch(polygons_data: List[Dict], timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Analyze many polygons with one label image per raster grid; same entries as the serial loop"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(polygons_data)
+    geoms = []
+    indices = []
+    keys = []
+
+    index = get_thana_index()
+    for i, poly in enumerate(polygons_data):
         try:
-            with rasterio.open(GREEN_FILE) as src:
-                # Transform polygon to match raster CRS if needed
-                polygon_for_analysis = geom
-                if str(src.crs) != 'EPSG:4326':
-                    transformer = pyproj.Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
-                    polygon_for_analysis = transform(transformer.transform, geom)
-                
-                out_image, _ = rasterio.mask.mask(src, [polygon_for_analysis], crop=True)
-                data = out_image[0].astype(float)
-                data[data == src.nodata] = np.nan
-                valid = data[~np.isnan(data)]
-                if len(valid) > 0:
-                    green_area_percent = float(np.sum(valid > 0.4) / valid.size * 100)
+            geom = shape(poly["geometry"])
+            analysis, key = quick_analysis(geom, index, timings)
+            if analysis is not None:
+                results[i] = {
+                    "polygon_index": i + 1,
+                    "geometry_type": poly.get("geometry", {}).get("type", "Unknown"),
+                    "analysis": analysis
+                }
+                continue
+
+            geoms.append(geom)
+            indices.append(i)
+            keys.append(key)
         except Exception as e:
-            print(f"Error calculating green area percentage: {e}", file=sys.stderr)
+            logger.error(f"Error processing polygon {i+1}: {e}")
+            results[i] = {"polygon_index": i + 1, "error": str(e)}
+
+    # All polygons go through each transformer in one vectorized call
+    to_crs = Reprojector()
+    with stage_timer(timings, "geometry"):
+        geom_infos = geometry_metrics(geoms, to_crs, GEOMETRY_METHOD)
+
+    with stage_timer(timings, "rasters"):
+        layers, errors = load_layers()
+        batch_stats = batch_polygon_stats(geoms, layers, to_crs, thresholds=LAYER_THRESHOLDS,
+                                          max_pixels=APPROX_MAX_PIXELS)
+
+    for i, key, geom_info, stats in zip(indices, keys, geom_infos, batch_stats):
+        analysis = build_analysis(geom_info, {**errors, **stats})
+        if key is not None:
+            RESULT_CACHE.put(key, analysis)
+        results[i] = {
+            "polygon_index": i + 1,
+            "geometry_type": polygons_data[i].get("geometry", {}).get("type", "Unknown"),
+            "analysis": analysis
+        }
+    return results
+
+
+def analyze_polygons(polygons_data: List[Dict], timings: Optional[Dict[str, float]] = None,
+                     batch: Optional[bool] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Analyze all polygons and return JSON result
+
+    batch=None picks the label-image batch engine for lists of at least
+    BATCH_MIN_POLYGONS polygons and the per-polygon loop otherwise.
+    workers > 1 splits the list across a process pool (see
+    analyze_polygons_parallel).
+    """
+
+    available_files = check_data_files()
+    instrumentation.count("polygons", len(polygons_data))
+
+    if workers is not None and workers > 1 and len(polygons_data) > 1:
+        logger.info(f"Parallel analysis of {len(polygons_data)} polygons on {workers} workers")
+        return {
+            "total_polygons": len(polygons_data),
+            "analysis_results": analyze_polygons_parallel(polygons_data, workers, timings, batch),
+            "metadata": result_metadata(available_files)
+        }
+
+    if batch is None:
+        batch = len(polygons_data) >= BATCH_MIN_POLYGONS
 
-    # Heat stats (LST)
-    lst_stats = summarize_raster(LST_FILE, geom)
+    if batch:
+        logger.info(f"Batch analysis of {len(polygons_data)} polygons")
+        results = analyze_polygons_batch(polygons_data, timings)
+    else:
+        results = analyze_polygons_serial(polygons_data, timings)
 
     return {
-        "geometry_info": geom_info,
-        "elevation": elevation_stats,
-        "vegetation": {
-            **green_stats,
-            "green_area_percent": green_area_percent
-        },
-        "temperature": lst_stats
+        "total_polygons": len(polygons_data),
+        "analysis_results": results,
+        "metadata": result_metadata(available_files)
     }
 
 
-def analyze_polygons(polygons_data: List[Dict]) -> Dict[str, Any]:
-    """Analyze all polygons and return JSON result"""
-    
-    # Check file availability
+def check_data_files() -> Dict[str, Optional[str]]:
+    """Layer name -> raster path, or None if missing; logged to stderr"""
     available_files = {
-        'elevation': ELEVATION_FILE if os.path.exists(ELEVATION_FILE) else None,
-        'vegetation': GREEN_FILE if os.path.exists(GREEN_FILE) else None,
-        'temperature': LST_FILE if os.path.exists(LST_FILE) else None
+        data_type: file_path if os.path.exists(file_path) else None
+        for data_type, file_path in RASTER_LAYERS.items()
     }
-    
-    print(f"=== File Status ===", file=sys.stderr)
+
+    logger.info("=== File Status ===")
     for data_type, file_path in available_files.items():
         if file_path:
-            print(f"✓ Found {data_type}: {file_path}", file=sys.stderr)
+            logger.info(f"✓ Found {data_type}: {file_path}")
         else:
-            print(f"✗ Missing {data_type} data", file=sys.stderr)
-    print("==================", file=sys.stderr)
-    
+            logger.info(f"✗ Missing {data_type} data")
+    logger.info("==================")
+    return available_files
+
+
+def result_metadata(available_files: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    return {
+        "script_version": "4.0",
+        "analysis_type": "environmental_baseline_plus_geometry",
+        "available_data_files": [k for k, v in available_files.items() if v is not None]
+    }
+
+
+def analyze_polygon_stream(polygons, outfile, chunk_size: int = 1, batch: Optional[bool] = None,
+                           metrics_writer: Optional[MetricsWriter] = None,
+                           include_timings: bool = False) -> Dict[str, Any]:
+    """
+    Analyze polygons from an iterable as they arrive and write one compact
+    JSON line per polygon ({"type": "polygon", ...} with the same fields as
+    an analysis_results entry) as soon as it is done, then a
+    {"type": "summary", "total_polygons": ..., "metadata": ...} line.
+
+    Polygons are analyzed chunk_size at a time (a chunk of at least
+    BATCH_MIN_POLYGONS uses the batch engine unless batch is False), so
+    memory stays bounded by one chunk. Returns the summary.
+
+    metrics_writer gets one {"type": "chunk", ...} metrics record per
+    chunk; include_timings adds the totals to the summary as "timings".
+    """
+    available_files = check_data_files()
+    total = 0
+    failed = 0
+    totals = Metrics()
+
+    def emit(record: Dict[str, Any]):
+        outfile.write(json.dumps(record, separators=(",", ":")) + "\n")
+        outfile.flush()
+
+    def flush(chunk: List[Dict]):
+        nonlocal failed
+        with collect() as metrics:
+            instrumentation.count("polygons", len(chunk))
+            for result in analyze_chunk(chunk, batch):
+                # Numbered across the whole stream, not within the chunk
+                result["polygon_index"] += total - len(chunk)
+                failed += "error" in result
+                with timer("serialize"):
+                    emit({"type": "polygon", **result})
+        chunk_metrics = metrics.to_dict()
+        totals.merge(chunk_metrics)
+        if metrics_writer is not None:
+            metrics_writer.write({"type": "chunk", "mode": "stream", "first_polygon": total - len(chunk) + 1,
+                                  "polygons": len(chunk), **chunk_metrics})
+
+    chunk: List[Dict] = []
+    for polygon in polygons:
+        chunk.append(polygon)
+        total += 1
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    summary = {
+        "type": "summary",
+        "total_polygons": total,
+        "failed_polygons": failed,
+        "metadata": result_metadata(available_files)
+    }
+    if include_timings:
+        summary["timings"] = totals.to_dict()
+    emit(summary)
+    return summary
+
+
+def analyze_polygons_serial(polygons_data: List[Dict], timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Analyze polygons one at a time"""
     results = []
     for i, poly in enumerate(polygons_data):
         try:
-            print(f"\n--- Processing Polygon {i+1} ---", file=sys.stderr)
-            poly_result = analyze_polygon(poly)
+            logger.info(f"--- Processing Polygon {i+1} ---")
+            poly_result = analyze_polygon(poly, timings)
             results.append({
                 "polygon_index": i + 1,
                 "geometry_type": poly.get("geometry", {}).get("type", "Unknown"),
                 "analysis": poly_result
             })
         except Exception as e:
-            print(f"Error processing polygon {i+1}: {e}", file=sys.stderr)
+            logger.error(f"Error processing polygon {i+1}: {e}")
             results.append({
                 "polygon_index": i + 1,
                 "error": str(e)
             })
+    return results
 
-    return {
-        "total_polygons": len(polygons_data),
-        "analysis_results": results,
-        "metadata": {
-            "script_version": "4.0",
-            "analysis_type": "environmental_baseline_plus_geometry",
-            "available_data_files": [k for k, v in available_files.items() if v is not None]
-        }
+
+def analyze_chunk(polygons_data: List[Dict], batch: Optional[bool] = None,
+                  timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Result entries of one polygon list (numbered from 1), by the batch engine if it is large"""
+    use_batch = len(polygons_data) >= BATCH_MIN_POLYGONS if batch is None else batch
+    if use_batch:
+        return analyze_polygons_batch(polygons_data, timings)
+    return analyze_polygons_serial(polygons_data, timings)
+
+
+def share_rasters(cache_dir: Optional[str] = None):
+    """Write the memmap backend's .npy copy of every raster once, before workers map it"""
+    store = RasterStore(backend="memmap", cache_dir=cache_dir)
+    try:
+        for raster_path in RASTER_LAYERS.values():
+            if os.path.exists(raster_path):
+                store.get(raster_path)
+    finally:
+        store.close()
+
+
+def init_pool_worker(settings: Dict[str, Any]):
+    """Give a pool process the parent's settings and a memmap raster store"""
+    global THANA_INDEX_FILE, APPROX_MAX_PIXELS, GEOMETRY_METHOD
+    THANA_INDEX_FILE = settings["index_file"]
+    APPROX_MAX_PIXELS = settings["approx_max_pixels"]
+    GEOMETRY_METHOD = settings["geometry_method"]
+    # Every worker maps the same .npy files, so the raster pages are shared
+    # through the OS page cache instead of being read once per process
+    configure_raster_store("memmap", settings["raster_cache_dir"])
+    configure_result_cache(**settings["result_cache"])
+
+
+def analyze_pool_chunk(job):
+    """Analyze one chunk in a pool process; returns its entries, stage timings and metrics"""
+    offset, polygons_data, batch = job
+    timings: Dict[str, float] = {}
+    with collect() as metrics:
+        results = analyze_chunk(polygons_data, batch, timings)
+    for result in results:
+        result["polygon_index"] += offset
+    return results, timings, metrics.to_dict()
+
+
+def analyze_polygons_parallel(polygons_data: List[Dict], workers: int,
+                              timings: Optional[Dict[str, float]] = None,
+                              batch: Optional[bool] = None,
+                              chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Analyze polygons in a pool of worker processes, chunk_size polygons per
+    task (default: WORKER_CHUNK, else about four per worker), and return the entries in
+    input order. Workers attach to the rasters through the memmap backend;
+    the .npy copies are written here first. Stage timings and metrics are
+    summed over the workers.
+    """
+    chunk_size = chunk_size or WORKER_CHUNK
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(polygons_data) / (workers * 4)))
+    jobs = [(start, polygons_data[start:start + chunk_size], batch)
+            for start in range(0, len(polygons_data), chunk_size)]
+
+    share_rasters(RASTER_STORE.cache_dir)
+    cache = RESULT_CACHE
+    settings = {
+        "index_file": THANA_INDEX_FILE,
+        "approx_max_pixels": APPROX_MAX_PIXELS,
+        "geometry_method": GEOMETRY_METHOD,
+        "raster_cache_dir": RASTER_STORE.cache_dir,
+        "result_cache": {
+            "max_entries": cache.max_entries if cache else 0,
+            "db_path": cache.db_path if cache else None,
+            "db_max_mb": cache.db_max_bytes / (1024 * 1024) if cache else 0,
+            "enabled": cache is not None,
+        },
     }
 
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_pool_worker, initargs=(settings,)) as pool:
+        # map yields in submission order, so entries stay in input order
+        for chunk_results, chunk_timings, chunk_metrics in pool.map(analyze_pool_chunk, jobs):
+            results.extend(chunk_results)
+            instrumentation.merge(chunk_metrics)
+            if timings is not None:
+                for stage, ms in chunk_timings.items():
+                    timings[stage] = timings.get(stage, 0.0) + ms
+    return results
+
+
+class AnalysisWorker:
+    """
+    Serves analysis requests from a warm process.
+
+    Each request is one JSON line, either a bare polygon list or an object
+    {"id": ..., "polygons": [...], "batch": true|false|null}. Control messages use "command":
+    "ping", "stats" or "shutdown". Every request produces exactly one
+    JSON response line carrying the same "id".
+
+    With include_metrics, analysis responses also carry the request's
+    instrumentation ("metrics"); metrics_writer gets one record per
+    analysis request.
+    """
+
+    def __init__(self, include_metrics: bool = False, metrics_writer: Optional[MetricsWriter] = None):
+        self.include_metrics = include_metrics
+        self.metrics_writer = metrics_writer
+        self.started_at = time.time()
+        self.requests = 0
+        self.failed_requests = 0
+        self.polygons = 0
+        self.stage_totals_ms: Dict[str, float] = {}
+        self.last_timings_ms: Dict[str, float] = {}
+        self.shutdown_requested = False
+
+    def warm_up(self):
+        """Open the rasters and build their transformers before the first request"""
+        for raster_path in RASTER_LAYERS.values():
+            if not os.path.exists(raster_path):
+                continue
+            layer = RASTER_STORE.get(raster_path)
+            crs = str(layer.crs)
+            if crs == 'EPSG:4326':
+                continue
+            get_transformer('EPSG:4326', crs)
+            # geometry_metrics projects each polygon into its centroid's UTM zone
+            minx, miny, maxx, maxy = layer.bounds
+            lon, lat = get_transformer(crs, 'EPSG:4326').transform((minx + maxx) / 2, (miny + maxy) / 2)
+            get_transformer('EPSG:4326', f"EPSG:{int(utm_epsg(lon, lat))}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "polygons": self.polygons,
+            "cache": RESULT_CACHE.stats() if RESULT_CACHE is not None else None,
+            "raster_backend": RASTER_STORE.backend,
+            "loaded_rasters": RASTER_STORE.paths,
+            "layer_backends": RASTER_STORE.layer_backends,
+            "stage_totals_ms": {k: round(v, 3) for k, v in self.stage_totals_ms.items()},
+            "last_timings_ms": self.last_timings_ms,
+        }
+
+    def handle_line(self, line: str) -> str:
+        """Process one request line and return one response line"""
+        with collect() as metrics:
+            return self._handle_line(line, metrics)
+
+    def _handle_line(self, line: str, metrics: Metrics) -> str:
+        timings: Dict[str, float] = {}
+        request_id = None
+        polygons_data = None
+        try:
+            with stage_timer(timings, "parse"):
+                message = json.loads(line)
+            if isinstance(message, dict):
+                request_id = message.get("id")
+                command = message.get("command")
+                if command == "ping":
+                    return json.dumps({"id": request_id, "success": True, "pong": True})
+                if command == "stats":
+                    return json.dumps({"id": request_id, "success": True, "stats": self.stats()})
+                if command == "shutdown":
+                    self.shutdown_requested = True
+                    return json.dumps({"id": request_id, "success": True, "shutdown": True})
+                if command is not None:
+                    raise ValueError(f"Unknown command: {command}")
+                polygons_data = message.get("polygons")
+                batch = message.get("batch")
+            else:
+                polygons_data = message
+                batch = None
+
+            if not isinstance(polygons_data, list):
+                raise ValueError("Input must be a list of polygon objects")
+
+            self.requests += 1
+            self.polygons += len(polygons_data)
+            with stage_timer(timings, "analyze"):
+                result = analyze_polygons(polygons_data, timings, batch=batch)
+            response = {"id": request_id, "success": True, "timings_ms": self._record(timings)}
+            if self.include_metrics:
+                response["metrics"] = metrics.to_dict()
+            response["result"] = result
+            # Encoded after the timings snapshot, so serialize shows up in the
+            # worker totals and the metrics stream only
+            with stage_timer(self.stage_totals_ms, "serialize"):
+                body = json.dumps(response)
+            self._write_metrics(request_id, True, len(polygons_data), metrics)
+            return body
+
+        except Exception as e:
+            self.failed_requests += 1
+            response = {
+                "id": request_id,
+                "success": False,
+                "error": str(e),
+                "message": "Failed to analyze polygon AOI",
+                "timings_ms": self._record(timings)
+            }
+            polygons = len(polygons_data) if isinstance(polygons_data, list) else 0
+            if self.include_metrics:
+                response["metrics"] = metrics.to_dict()
+            self._write_metrics(request_id, False, polygons, metrics)
+            return json.dumps(response)
+
+    def _write_metrics(self, request_id, success: bool, polygons: int, metrics: Metrics):
+        """Write the request's record to the metrics stream, if one is open"""
+        if self.metrics_writer is not None:
+            self.metrics_writer.write({"type": "request", "mode": "worker", "id": request_id,
+                                       "success": success, "polygons": polygons,
+                                       **metrics.to_dict()})
+
+    def _record(self, timings: Dict[str, float]) -> Dict[str, float]:
+        rounded = {k: round(v, 3) for k, v in timings.items()}
+        for stage, ms in timings.items():
+            self.stage_totals_ms[stage] = self.stage_totals_ms.get(stage, 0.0) + ms
+        self.last_timings_ms = rounded
+        return rounded
+
+    def serve_stream(self, infile, outfile):
+        """Answer requests line by line until EOF or a shutdown command"""
+        for line in infile:
+            if not line.strip():
+                continue
+            outfile.write(self.handle_line(line) + "\n")
+            outfile.flush()
+            if self.shutdown_requested:
+                break
+
+
+def run_stdio_worker(worker: AnalysisWorker):
+    # Debug output goes to stderr, stdout carries only response lines
+    worker.serve_stream(sys.stdin, sys.stdout)
+
+
+def run_socket_worker(worker: AnalysisWorker, socket_path: str):
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("Unix sockets are not supported on this platform, use the stdio worker")
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8")
+                if not line.strip():
+                    continue
+                self.wfile.write((worker.handle_line(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if worker.shutdown_requested:
+                    break
+
+    # Requests are served one at a time, the worker state is not shared across threads
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        logger.info(f"Analysis worker listening on {socket_path}")
+        try:
+            while not worker.shutdown_requested:
+                server.handle_request()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Analyze polygon AOI against environmental rasters")
     parser.add_argument("--input", type=str, help="JSON string containing polygon data")
     parser.add_argument("--file", type=str, help="Path to JSON file containing polygon data")
+    parser.add_argument("--worker", action="store_true",
+                        help="Run as a persistent worker serving line-delimited JSON requests")
+    parser.add_argument("--socket", type=str,
+                        help="With --worker, listen on this Unix socket path instead of stdin/stdout")
+    parser.add_argument("--raster-backend", choices=RasterStore.BACKENDS, default="auto",
+                        help="Keep rasters resident in memory, memory-map them from an .npy cache, "
+                             "read only the AOI window from disk (best with COG rasters), "
+                             "or auto: resident up to --resident-max-mb, windowed beyond")
+    parser.add_argument("--resident-max-mb", type=float, default=512,
+                        help="Largest raster the auto backend keeps resident in memory")
+    parser.add_argument("--raster-cache-dir", type=str,
+                        help="Directory for the memmap backend's .npy cache files")
+    parser.add_argument("--approx-max-pixels", type=int,
+                        help="Read AOI windows larger than this from a raster overview (approximate stats)")
+    parser.add_argument("--geometry-metrics", choices=GEOMETRY_METHODS, default="utm",
+                        help="Area/perimeter in each polygon's UTM zone or geodesic on the WGS84 ellipsoid")
+    parser.add_argument("--batch", choices=("auto", "on", "off"), default="auto",
+                        help="Label-image batch engine: on, off, or auto for large polygon lists")
+    parser.add_argument("--index-file", type=str, default=DEFAULT_INDEX_FILE,
+                        help="Precomputed thana statistics index (built by thana_index.py)")
+    parser.add_argument("--no-index", action="store_true", help="Always compute from the rasters")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the per-polygon result cache")
+    parser.add_argument("--cache-entries", type=int, default=256,
+                        help="Results kept in the in-process LRU tier")
+    parser.add_argument("--cache-db", type=str,
+                        help="SQLite file for a persistent result cache tier shared across processes")
+    parser.add_argument("--cache-db-max-mb", type=float, default=256,
+                        help="Size limit of the SQLite tier; least recently used entries are evicted")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Analyze polygon chunks in this many processes sharing memory-mapped rasters")
+    parser.add_argument("--worker-chunk", type=int,
+                        help="Polygons per --workers task (default: about four tasks per worker)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read polygons incrementally (NDJSON, JSON array or GeoJSON FeatureCollection) "
+                             "and write one JSON line per polygon as it finishes, then a summary line")
+    parser.add_argument("--stream-format", choices=("auto", "ndjson", "json"), default="auto",
+                        help="Input format in --stream mode")
+    parser.add_argument("--stream-chunk", type=int, default=1,
+                        help="Polygons analyzed together in --stream mode (larger chunks use the batch engine)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Add per-stage timers and raster byte/pixel counters to the JSON result")
+    parser.add_argument("--metrics-file", type=str,
+                        help="Append the same metrics as JSON lines (one per request or stream chunk); - for stderr")
+    parser.add_argument("--profile", type=str,
+                        help="Write a cProfile dump (pstats format) of this process to this path")
+    parser.add_argument("--verbose", action="store_true", help="Log progress to stderr")
     args = parser.parse_args()
 
-    try:
-        if args.input:
-            polygons_data = json.loads(args.input)
-        elif args.file:
-            with open(args.file, "r") as f:
-                polygons_data = json.load(f)
-        else:
-            polygons_data = json.load(sys.stdin)
-
-        if not isinstance(polygons_data, list):
-            raise ValueError("Input must be a list of polygon objects")
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(message)s", stream=sys.stderr)
 
-        result = analyze_polygons(polygons_data)
-        print(json.dumps(result, indent=2))
+    profiler = cProfile.Profile() if args.profile else None
+    metrics_file = None
+    if args.metrics_file:
+        metrics_file = sys.stderr if args.metrics_file == "-" else open(args.metrics_file, "a")
+    try:
+        if profiler is not None:
+            profiler.enable()
+        run(args, MetricsWriter(metrics_file) if metrics_file else None)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            logger.info(f"Profile written to {args.profile}")
+        if metrics_file is not None and metrics_file is not sys.stderr:
+            metrics_file.close()
+
+
+def run(args, metrics_writer: Optional[MetricsWriter] = None):
+    """Configure the process from the parsed arguments and serve the selected mode"""
+    global THANA_INDEX_FILE, APPROX_MAX_PIXELS, WORKER_CHUNK, GEOMETRY_METHOD
+    THANA_INDEX_FILE = None if args.no_index else args.index_file
+    APPROX_MAX_PIXELS = args.approx_max_pixels
+    WORKER_CHUNK = args.worker_chunk
+    GEOMETRY_METHOD = args.geometry_metrics
+    configure_raster_store(args.raster_backend, args.raster_cache_dir, args.resident_max_mb)
+    configure_result_cache(args.cache_entries, args.cache_db, args.cache_db_max_mb,
+                           enabled=not args.no_cache)
+
+    if args.worker:
+        worker = AnalysisWorker(include_metrics=args.timings, metrics_writer=metrics_writer)
+        worker.warm_up()
+        try:
+            if args.socket:
+                run_socket_worker(worker, args.socket)
+            else:
+                run_stdio_worker(worker)
+        finally:
+            RASTER_STORE.close()
+        return
+
+    batch = {"auto": None, "on": True, "off": False}[args.batch]
+    if args.stream:
+        infile = sys.stdin
+        try:
+            if args.input:
+                infile = io.StringIO(args.input)
+            elif args.file:
+                infile = open(args.file, "r")
+            analyze_polygon_stream(iter_polygons(infile, args.stream_format), sys.stdout,
+                                   max(1, args.stream_chunk), batch, metrics_writer, args.timings)
+        except Exception as e:
+            # Lines already written stay valid; the error is the last line
+            print(json.dumps({"type": "error", "success": False, "error": str(e),
+                              "message": "Failed to analyze polygon AOI"}, separators=(",", ":")))
+            sys.exit(1)
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+        return
+
+    with collect() as metrics:
+        try:
+            with timer("parse"):
+                if args.input:
+                    polygons_data = json.loads(args.input)
+                elif args.file:
+                    with open(args.file, "r") as f:
+                        polygons_data = json.load(f)
+                else:
+                    polygons_data = json.load(sys.stdin)
+
+            if not isinstance(polygons_data, list):
+                raise ValueError("Input must be a list of polygon objects")
+
+            result = analyze_polygons(polygons_data, batch=batch, workers=args.workers)
+            if args.timings:
+                # Taken before encoding, so serialize shows up only in the metrics stream
+                result["timings"] = metrics.to_dict()
+            with timer("serialize"):
+                body = json.dumps(result, indent=2)
+            if metrics_writer is not None:
+                metrics_writer.write({"type": "request", "mode": "cli", "success": True,
+                                      "polygons": len(polygons_data), **metrics.to_dict()})
+            print(body)
 
-    except Exception as e:
-        error_result = {
-            "success": False,
-            "error": str(e),
-            "message": "Failed to analyze polygon AOI"
-        }
-        print(json.dumps(error_result, indent=2))
-        sys.exit(1)
+        except Exception as e:
+            error_result = {
+                "success": False,
+                "error": str(e),
+                "message": "Failed to analyze polygon AOI"
+            }
+            if metrics_writer is not None:
+                metrics_writer.write({"type": "request", "mode": "cli", "success": False,
+                                      **metrics.to_dict()})
+            print(json.dumps(error_result, indent=2))
+            sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-
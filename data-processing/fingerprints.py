@@ -0,0 +1,65 @@
+"""
+Fingerprints
+Content checksums for rasters and canonical hashes for geometries, used to
+version precomputed results against the data they were derived from.
+"""
+
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+import shapely
+from shapely import wkb
+
+# Coordinates are snapped to this grid (degrees, ~1 cm) before hashing
+GEOMETRY_HASH_PRECISION = 1e-7
+
+_checksum_memo: Dict[str, Tuple[int, int, str]] = {}
+
+
+def raster_checksum(path: str) -> Optional[str]:
+    """SHA-256 of a file's content, memoized on (size, mtime); None if missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    memo = _checksum_memo.get(path)
+    if memo is not None and memo[:2] == (stat.st_size, stat.st_mtime_ns):
+        return memo[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    checksum = digest.hexdigest()
+    _checksum_memo[path] = (stat.st_size, stat.st_mtime_ns, checksum)
+    return checksum
+
+
+def raster_checksums(paths: Dict[str, str]) -> Dict[str, Optional[str]]:
+    return {name: raster_checksum(path) for name, path in paths.items()}
+
+
+def normalize_geometry(geom, precision: float = GEOMETRY_HASH_PRECISION):
+    """Snap to a coordinate grid and put rings/parts in canonical order and orientation"""
+    return shapely.normalize(shapely.set_precision(geom, precision))
+
+
+def geometry_hash(geom, precision: float = GEOMETRY_HASH_PRECISION) -> Optional[str]:
+    """
+    Hash that is equal for geometries differing only in vertex order,
+    starting vertex, ring orientation or sub-precision coordinate noise.
+
+    Invalid geometries (e.g. self-intersecting rings), which set_precision
+    rejects, are hashed after make_valid. Never raises: returns None if
+    the geometry cannot be canonicalized at all.
+    """
+    try:
+        try:
+            canonical = normalize_geometry(geom, precision)
+        except shapely.errors.GEOSException:
+            canonical = normalize_geometry(shapely.make_valid(geom), precision)
+        return hashlib.sha256(wkb.dumps(canonical)).hexdigest()
+    except shapely.errors.GEOSException:
+        return None
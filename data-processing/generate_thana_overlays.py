@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Thana Overlay Generator
+Clips the processed rasters to every thana and renders each clip as a
+transparent PNG plus the <name>_bounds.json the frontend positions it with.
+
+Each layer is drawn as in its tiles (see generate_tiles.LAYERS): the
+colormap and percentile stretch of its full-extent overlay, from the whole
+raster so colours compare across thanas, or one colour per class for the
+land cover layer. Thanas are rendered in a process pool whose workers open
+every raster once and read only the window under each thana (rasters not
+in EPSG:4326 through one nearest-neighbour WarpedVRT, so the PNG is
+lat/lon aligned). Only the layers of a thana whose outputs are missing or
+older than the raster or the boundary file are rendered; thanas a layer
+has no data for are remembered in <layer>/_empty.json, so they are not
+re-read on every run.
+
+Usage (from the repository root):
+  python data-processing/generate_thana_overlays.py --boundaries data-processing/raw/geoBoundaries-BGD-ADM3.geojson
+Output: client/public/data/thana_pngs/<layer>/<name>.png and <name>_bounds.json
+(the land cover PNGs DigitalTwin.js loads from thana_pngs/ itself are left
+untouched)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.features import geometry_mask
+from rasterio.vrt import WarpedVRT
+from shapely import wkb
+
+from generate_tiles import LAYERS, describe, layer_lut, layer_spec, render_values
+from overlay_render import write_png
+from raster_store import window_for_bounds
+from thana_index import DEFAULT_BOUNDARIES, THANA_OVERLAY_DIR, overlay_thana_names, read_zones
+
+WGS84 = CRS.from_epsg(4326)
+
+# Per-layer list of thanas without data, next to the layer's PNGs
+EMPTY_FILE = "_empty.json"
+
+
+def output_paths(output_dir: str, layer: str, name: str):
+    """PNG and bounds JSON paths of one thana overlay"""
+    stem = os.path.join(output_dir, layer, name.replace("/", "_"))
+    return stem + ".png", stem + "_bounds.json"
+
+
+def read_empty(output_dir: str, layer: str) -> List[str]:
+    path = os.path.join(output_dir, layer, EMPTY_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_empty(output_dir: str, layer: str, names: List[str]):
+    os.makedirs(os.path.join(output_dir, layer), exist_ok=True)
+    with open(os.path.join(output_dir, layer, EMPTY_FILE), "w") as f:
+        json.dump(sorted(names), f, indent=2)
+
+
+def is_up_to_date(paths, inputs: List[str]) -> bool:
+    """True if every output exists and is newer than every input"""
+    if not all(os.path.exists(p) for p in paths):
+        return False
+    newest_input = max(os.path.getmtime(p) for p in inputs)
+    return min(os.path.getmtime(p) for p in paths) >= newest_input
+
+
+# Per-process state for the thana workers
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(layer_specs: Dict[str, Dict[str, Any]]):
+    """Open every layer's raster once per worker process, warped to EPSG:4326 if needed"""
+    layers = {}
+    for name, spec in layer_specs.items():
+        src = rasterio.open(spec["path"])
+        # The background value doubles as the warp's nodata, so the VRT fills with it too
+        nodata = {"src_nodata": spec["background"], "nodata": spec["background"]} \
+            if src.nodata is None and spec["background"] is not None else {}
+        dataset = src if src.crs == WGS84 else WarpedVRT(src, crs=WGS84, resampling=Resampling.nearest, **nodata)
+        layers[name] = {**spec, "dataset": dataset, "lut": layer_lut(spec)}
+    _worker["layers"] = layers
+
+
+def render_thana(job) -> Dict[str, Any]:
+    """Clip and render the given layers of one thana; returns per-layer status"""
+    name, geom_wkb, output_dir, layer_names = job
+    geom = wkb.loads(geom_wkb)
+    start = time.perf_counter()
+    status = {}
+
+    for layer_name in layer_names:
+        layer = _worker["layers"][layer_name]
+        dataset = layer["dataset"]
+        window = window_for_bounds(dataset.transform, dataset.width, dataset.height, geom.bounds)
+        if window is None:
+            status[layer_name] = "no overlap"
+            continue
+
+        values = dataset.read(1, window=window).astype(np.float32)
+        if dataset.nodata is not None and not np.isnan(dataset.nodata):
+            values[values == dataset.nodata] = np.nan
+        if layer["background"] is not None:
+            values[values == layer["background"]] = np.nan
+        transform = rasterio.windows.transform(window, dataset.transform)
+        valid = geometry_mask([geom], out_shape=values.shape, transform=transform,
+                              invert=True, all_touched=True) & ~np.isnan(values)
+        if not valid.any():
+            status[layer_name] = "no data"
+            continue
+
+        png_path, bounds_path = output_paths(output_dir, layer_name, name)
+        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+        write_png(png_path, render_values(values, valid, layer))
+
+        height, width = values.shape
+        west, north = transform * (0, 0)
+        east, south = transform * (width, height)
+        with open(bounds_path, "w") as f:
+            json.dump({"SW": [south, west], "NE": [north, east], "crs": "EPSG:4326"}, f, indent=4)
+        status[layer_name] = "rendered"
+
+    return {"name": name, "status": status, "seconds": time.perf_counter() - start}
+
+
+def generate_thana_overlays(boundaries_path: str, layer_names: List[str],
+                            output_dir: str = THANA_OVERLAY_DIR, name_field: str = "shapeName",
+                            names: Optional[List[str]] = None, force: bool = False,
+                            workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Render every thana's overlays that are missing or stale; returns the per-thana results"""
+    zones = read_zones(boundaries_path, name_field, names)
+    if not zones:
+        raise ValueError(f"No matching features with '{name_field}' in {boundaries_path}")
+
+    specs: Dict[str, Dict[str, Any]] = {}
+    empty: Dict[str, set] = {}
+    for layer_name in layer_names:
+        if not os.path.exists(LAYERS[layer_name]["path"]):
+            print(f"Skipping {layer_name}: raster not found at {LAYERS[layer_name]['path']}")
+            continue
+        specs[layer_name] = layer_spec(layer_name)
+        # An empty list older than its inputs says nothing about the current rasters
+        inputs = [specs[layer_name]["path"], boundaries_path]
+        empty_path = os.path.join(output_dir, layer_name, EMPTY_FILE)
+        empty[layer_name] = set(read_empty(output_dir, layer_name)) \
+            if not force and is_up_to_date([empty_path], inputs) else set()
+        print(f"{layer_name}: {describe(specs[layer_name])}")
+    if not specs:
+        print("No layers to render")
+        return []
+
+    jobs = []
+    skipped = 0
+    for name, geom in zones:
+        stale = [layer_name for layer_name, spec in specs.items()
+                 if name not in empty[layer_name]
+                 and (force or not is_up_to_date(output_paths(output_dir, layer_name, name),
+                                                 [spec["path"], boundaries_path]))]
+        if stale:
+            jobs.append((name, geom.wkb, output_dir, stale))
+        else:
+            skipped += 1
+    print(f"{len(zones)} thanas: {len(jobs)} to render, {skipped} up to date")
+    if not jobs:
+        return []
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(specs,)) as pool:
+        for future in as_completed([pool.submit(render_thana, job) for job in jobs]):
+            result = future.result()
+            results.append(result)
+            for layer_name, layer_status in result["status"].items():
+                if layer_status == "rendered":
+                    empty[layer_name].discard(result["name"])
+                else:
+                    empty[layer_name].add(result["name"])
+            layers = ", ".join(f"{k}: {v}" for k, v in result["status"].items())
+            print(f"  {result['name']}: {result['seconds'] * 1000:.0f} ms ({layers})")
+    elapsed = time.perf_counter() - start
+    for layer_name, names in empty.items():
+        write_empty(output_dir, layer_name, list(names))
+
+    print(f"Rendered {len(results)} thanas in {elapsed:.1f}s ({len(results) / elapsed:.1f} thanas/s, "
+          f"{elapsed / len(results) * 1000:.0f} ms/thana) into {output_dir}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render per-thana overlays of the processed rasters")
+    parser.add_argument("--boundaries", default=DEFAULT_BOUNDARIES,
+                        help="GeoJSON FeatureCollection of thana polygons (EPSG:4326)")
+    parser.add_argument("--name-field", default="shapeName", help="Feature property holding the thana name")
+    parser.add_argument("--layers", nargs="+", choices=sorted(LAYERS), default=sorted(LAYERS),
+                        help="Layers to render")
+    parser.add_argument("--output-dir", default=THANA_OVERLAY_DIR)
+    parser.add_argument("--all", action="store_true",
+                        help="Render every feature instead of only thanas with a frontend overlay")
+    parser.add_argument("--force", action="store_true", help="Render even if the outputs are up to date")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.boundaries):
+        print(f"Boundary file not found: {args.boundaries}")
+        return 2
+
+    names = None if args.all else (overlay_thana_names() or None)
+    generate_thana_overlays(args.boundaries, args.layers, args.output_dir, args.name_field,
+                            names, args.force, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
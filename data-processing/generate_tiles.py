@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+XYZ Tile Generator
+Renders the processed rasters as a Web Mercator z/x/y tile pyramid so map
+clients fetch only the visible tiles at the resolution they display.
+
+Each layer keeps the colormap and percentile stretch of its full-extent
+overlay (flood-risk for elevation, inferno for LST). The stretch is
+computed once from the whole raster, so tiles agree at their seams. The
+land cover layer is categorical: it is warped nearest-neighbour and drawn
+with one colour per class. Tiles
+are rendered in a process pool; every worker opens the rasters once and
+reprojects only the window under each tile. Fully transparent tiles are
+not written.
+
+Usage (from the repository root):
+  python data-processing/generate_tiles.py --layers elevation lst --max-zoom 15
+Output: client/public/data/tiles/<layer>/<z>/<x>/<y>.png plus tiles.json
+(WebP output needs Pillow)
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_bounds
+from rasterio.warp import reproject, transform_bounds
+
+from overlay_render import LAND_COVER_COLORS, class_lut, colorize, colorize_classes, colormap_lut, write_png
+from raster_store import background_value
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_DIR = os.path.join(SCRIPT_DIR, "processed")
+DEFAULT_OUTPUT_DIR = os.path.join(SCRIPT_DIR, "..", "client", "public", "data", "tiles")
+
+TILE_SIZE = 256
+WEB_MERCATOR = "EPSG:3857"
+# Half the Web Mercator world width in metres
+ORIGIN_SHIFT = 20037508.342789244
+
+# Layer name -> raster, warp resampling and either a colormap with the
+# percentile stretch of its overlay or, for categorical rasters, the colour
+# of each class. Background fill values come from raster_store.
+LAYERS: Dict[str, Dict[str, Any]] = {
+    "elevation": {
+        "path": os.path.join(PROCESSED_DIR, "dhaka_elevation.tif"),
+        "resampling": Resampling.bilinear,
+        "colormap": "flood_risk",
+        "percentiles": (5, 95),
+    },
+    "lst": {
+        "path": os.path.join(PROCESSED_DIR, "dhaka_LST_map.tif"),
+        "resampling": Resampling.bilinear,
+        "colormap": "inferno",
+        "percentiles": (2, 98),
+    },
+    "green": {
+        "path": os.path.join(PROCESSED_DIR, "dhaka_green_space.tif"),
+        "resampling": Resampling.nearest,
+        "classes": LAND_COVER_COLORS,
+    },
+}
+
+
+def valid_values(src, background: Optional[float] = None) -> np.ndarray:
+    """Band 1 pixels holding data (not nodata, not the background value, not NaN)"""
+    data = src.read(1)
+    valid = np.ones(data.shape, dtype=bool)
+    if src.nodata is not None and not np.isnan(src.nodata):
+        valid &= data != src.nodata
+    if background is not None:
+        valid &= data != background
+    if np.issubdtype(data.dtype, np.floating):
+        valid &= ~np.isnan(data)
+    return data[valid]
+
+
+def value_range(values: np.ndarray, percentiles: Tuple[float, float]) -> Tuple[float, float]:
+    """Percentile stretch, widened when the data is (nearly) constant"""
+    low, high = (float(v) for v in np.percentile(values, percentiles))
+    if high == low:
+        low, high = float(values.min()), float(values.max())
+        if high == low:
+            high = low + 1.0
+    return low, high
+
+
+def layer_spec(name: str) -> Dict[str, Any]:
+    """Rendering settings of one layer: stretch from the whole raster, or its classes"""
+    layer = LAYERS[name]
+    spec = {"path": layer["path"], "resampling": layer["resampling"],
+            "background": background_value(layer["path"])}
+    if "classes" in layer:
+        spec["classes"] = layer["classes"]
+    else:
+        with rasterio.open(layer["path"]) as src:
+            low, high = value_range(valid_values(src, spec["background"]), layer["percentiles"])
+        spec.update(colormap=layer["colormap"], low=low, high=high)
+    return spec
+
+
+def layer_lut(spec: Dict[str, Any]) -> np.ndarray:
+    return class_lut(spec["classes"]) if "classes" in spec else colormap_lut(spec["colormap"])
+
+
+def render_values(values: np.ndarray, valid: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+    """RGBA image of a layer's values (layer_spec plus its "lut")"""
+    if "classes" in layer:
+        return colorize_classes(values, valid, layer["lut"])
+    return colorize(values, valid, layer["lut"], layer["low"], layer["high"])
+
+
+def describe(spec: Dict[str, Any]) -> str:
+    if "classes" in spec:
+        return f"classes {sorted(spec['classes'])}"
+    return f"stretch {spec['low']:.2f}..{spec['high']:.2f}"
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(left, bottom, right, top) of an XYZ tile in Web Mercator metres"""
+    size = 2 * ORIGIN_SHIFT / (1 << z)
+    left = -ORIGIN_SHIFT + x * size
+    top = ORIGIN_SHIFT - y * size
+    return left, top - size, left + size, top
+
+
+def tile_range(bounds: Tuple[float, float, float, float], z: int) -> Tuple[range, range]:
+    """x and y tile index ranges covering Web Mercator bounds at zoom z"""
+    left, bottom, right, top = bounds
+    n = 1 << z
+    size = 2 * ORIGIN_SHIFT / n
+    x0 = max(int(math.floor((left + ORIGIN_SHIFT) / size)), 0)
+    x1 = min(int(math.ceil((right + ORIGIN_SHIFT) / size)), n)
+    y0 = max(int(math.floor((ORIGIN_SHIFT - top) / size)), 0)
+    y1 = min(int(math.ceil((ORIGIN_SHIFT - bottom) / size)), n)
+    return range(x0, x1), range(y0, y1)
+
+
+def native_zoom(src) -> int:
+    """Smallest zoom whose tile pixels are at least as fine as the raster's pixels"""
+    left, bottom, right, top = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+    mercator_res = max((right - left) / src.width, (top - bottom) / src.height)
+    return max(0, int(math.ceil(math.log2(2 * ORIGIN_SHIFT / TILE_SIZE / mercator_res))))
+
+
+# Per-process state for the tile workers
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(layer_specs: Dict[str, Dict[str, Any]]):
+    """Open every layer's raster once per worker process"""
+    _worker["layers"] = {
+        name: {**spec, "dataset": rasterio.open(spec["path"]), "lut": layer_lut(spec)}
+        for name, spec in layer_specs.items()
+    }
+
+
+def render_tile(job: Tuple[str, int, int, int, str, str]) -> Optional[str]:
+    """Render and write one tile; returns its path, or None if it holds no data"""
+    name, z, x, y, output_dir, fmt = job
+    layer = _worker["layers"][name]
+    src = layer["dataset"]
+
+    values = np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32)
+    # A background value stands in for nodata, so resampling does not blend it in
+    src_nodata = src.nodata if src.nodata is not None else layer["background"]
+    if src_nodata is None and np.issubdtype(np.dtype(src.dtypes[0]), np.floating):
+        src_nodata = np.nan
+    reproject(
+        source=rasterio.band(src, 1),
+        destination=values,
+        src_nodata=src_nodata,
+        dst_transform=from_bounds(*tile_bounds(z, x, y), TILE_SIZE, TILE_SIZE),
+        dst_crs=WEB_MERCATOR,
+        dst_nodata=np.nan,
+        resampling=layer["resampling"]
+    )
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return None
+
+    rgba = render_values(values, valid, layer)
+    tile_dir = os.path.join(output_dir, name, str(z), str(x))
+    os.makedirs(tile_dir, exist_ok=True)
+    path = os.path.join(tile_dir, f"{y}.{fmt}")
+    if fmt == "webp":
+        from PIL import Image
+        Image.fromarray(rgba, "RGBA").save(path, format="WEBP", lossless=True)
+    else:
+        write_png(path, rgba)
+    return path
+
+
+def generate_tiles(layer_names: List[str], output_dir: str = DEFAULT_OUTPUT_DIR,
+                   min_zoom: int = 10, max_zoom: Optional[int] = None, fmt: str = "png",
+                   workers: Optional[int] = None) -> Dict[str, Any]:
+    """Build the pyramid of every named layer and write tiles.json; returns that index"""
+    specs: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    index: Dict[str, Any] = {"format": fmt, "tile_size": TILE_SIZE, "layers": {}}
+
+    for name in layer_names:
+        layer = LAYERS[name]
+        if not os.path.exists(layer["path"]):
+            print(f"Skipping {name}: raster not found at {layer['path']}")
+            continue
+
+        spec = specs[name] = layer_spec(name)
+        with rasterio.open(layer["path"]) as src:
+            top_zoom = max_zoom if max_zoom is not None else native_zoom(src)
+            mercator_bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+            lonlat_bounds = transform_bounds(src.crs, "EPSG:4326", *src.bounds)
+
+        for z in range(min_zoom, top_zoom + 1):
+            xs, ys = tile_range(mercator_bounds, z)
+            jobs.extend((name, z, x, y, output_dir, fmt) for x in xs for y in ys)
+
+        index["layers"][name] = {
+            "url": f"{name}/{{z}}/{{x}}/{{y}}.{fmt}",
+            "minzoom": min_zoom,
+            "maxzoom": top_zoom,
+            "bounds": [float(v) for v in lonlat_bounds],
+        }
+        if "classes" in spec:
+            index["layers"][name]["classes"] = {str(k): v for k, v in sorted(spec["classes"].items())}
+        else:
+            index["layers"][name].update(colormap=spec["colormap"], value_range=[spec["low"], spec["high"]])
+        print(f"{name}: zoom {min_zoom}-{top_zoom}, {describe(spec)}")
+
+    if not jobs:
+        print("No tiles to render")
+        return index
+
+    start = time.perf_counter()
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(specs,)) as pool:
+        for path in pool.map(render_tile, jobs, chunksize=16):
+            if path is not None:
+                written += 1
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "tiles.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    print(f"Rendered {len(jobs)} tiles ({written} with data) in {elapsed:.1f}s "
+          f"({len(jobs) / elapsed:.0f} tiles/s) into {output_dir}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render processed rasters as XYZ Web Mercator tiles")
+    parser.add_argument("--layers", nargs="+", choices=sorted(LAYERS), default=sorted(LAYERS),
+                        help="Layers to render")
+    parser.add_argument("--min-zoom", type=int, default=10)
+    parser.add_argument("--max-zoom", type=int, help="Default: the zoom matching each raster's resolution")
+    parser.add_argument("--format", choices=("png", "webp"), default="png")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    generate_tiles(args.layers, args.output_dir, args.min_zoom, args.max_zoom, args.format, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Instrumentation
+Per-request stage timers and counters for the analysis path.
+
+Code on the hot path calls timer(stage) and count(name, n). Both do
+nothing unless a Metrics collector is active (see collect()), so an
+uninstrumented run pays one global lookup per call. Stages may nest and
+each accumulates its own wall time, so stage totals can exceed total_ms.
+
+Stages: reproject, raster_open, raster_read, mask, stats, plus the
+request-level stages of current_situation (geometry, cache, index,
+rasters, serialize, ...).
+Counters: raster_bytes_read, pixels_masked, pixels_valid,
+vertices_reprojected, rasters_opened, polygons.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, TextIO
+
+
+class Metrics:
+    """Wall time per stage (ms) and counters of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages_ms: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add_time(self, stage: str, ms: float):
+        self.stages_ms[stage] = self.stages_ms.get(stage, 0.0) + ms
+
+    def add(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def merge(self, other: Dict[str, Any]):
+        """Fold in the to_dict() of another collector (e.g. from a pool worker)"""
+        for stage, ms in other.get("stages_ms", {}).items():
+            self.add_time(stage, ms)
+        for name, n in other.get("counters", {}).items():
+            self.add(name, n)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000.0, 3),
+            "stages_ms": {k: round(v, 3) for k, v in sorted(self.stages_ms.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+# Collector of the request being processed; None when not instrumenting
+_active: Optional[Metrics] = None
+
+
+def active() -> Optional[Metrics]:
+    return _active
+
+
+@contextmanager
+def collect(metrics: Optional[Metrics] = None):
+    """Make metrics (a new Metrics by default) the active collector for the enclosed block"""
+    global _active
+    previous = _active
+    _active = metrics if metrics is not None else Metrics()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+@contextmanager
+def timer(stage: str):
+    """Add the enclosed block's wall time to stage on the active collector"""
+    metrics = _active
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(stage, (time.perf_counter() - start) * 1000.0)
+
+
+def count(name: str, n: int = 1):
+    metrics = _active
+    if metrics is not None:
+        metrics.add(name, n)
+
+
+def merge(other: Dict[str, Any]):
+    """Fold another collector's to_dict() into the active collector"""
+    metrics = _active
+    if metrics is not None:
+        metrics.merge(other)
+
+
+class MetricsWriter:
+    """JSON-lines metrics stream: one compact record per write, flushed immediately"""
+
+    def __init__(self, outfile: TextIO):
+        self.outfile = outfile
+
+    def write(self, record: Dict[str, Any]):
+        self.outfile.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.outfile.flush()
@@ -0,0 +1,197 @@
+"""
+JSON Stream
+Incremental readers for polygon inputs too large to json.load at once.
+
+iter_polygons yields the items of NDJSON (one object per line), of a
+top-level JSON array, or of the "features" array of a GeoJSON
+FeatureCollection, one at a time. Only the current item and a read buffer
+are held in memory; the other members of a FeatureCollection are decoded
+and dropped.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+
+# Input read ahead to tell the formats apart; a first line longer than this is NDJSON
+DETECT_SIZE = 1 << 20
+FEATURE_COLLECTION = re.compile(r'"type"\s*:\s*"FeatureCollection"')
+
+
+class JSONStreamReader:
+    """Buffered reader decoding one JSON value at a time with raw_decode"""
+
+    def __init__(self, infile: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.infile = infile
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        # Pipes (stdin) are read with read1, which returns what has arrived
+        # instead of blocking until a whole chunk is available
+        raw = getattr(infile, "buffer", None)
+        if raw is not None and hasattr(raw, "read1"):
+            self._raw = raw
+            self._decoder = codecs.getincrementaldecoder(infile.encoding or "utf-8")()
+        else:
+            self._raw = None
+
+    def _read(self, size: int) -> str:
+        if self._raw is None:
+            return self.infile.read(size)
+        while True:
+            data = self._raw.read1(size)
+            text = self._decoder.decode(data, final=not data)
+            # A chunk ending mid-character decodes to nothing; read on
+            if text or not data:
+                return text
+
+    def _fill(self) -> bool:
+        """Append one chunk to the buffer; False at end of input"""
+        if self.eof:
+            return False
+        # Read at least as much as is pending, so a large item takes O(log n) retries
+        chunk = self._read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays one item long
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Next non-whitespace character (not consumed), None at end of input"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def prefix(self, size: int) -> str:
+        """Up to size characters from the current position, without consuming them"""
+        while len(self.buffer) - self.pos < size and self._fill():
+            pass
+        return self.buffer[self.pos:self.pos + size]
+
+    def expect(self, chars: str) -> str:
+        """Consume the next non-whitespace character, which must be one of chars"""
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON input, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """Items of the array starting at the current position, one at a time"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+    def object_members(self) -> Iterator[str]:
+        """
+        Keys of the object starting at the current position. After each key
+        the caller must consume its value (value() or array_items()).
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+
+def iter_feature_collection(reader: JSONStreamReader) -> Iterator[Dict[str, Any]]:
+    """Features of a FeatureCollection object, streamed from its "features" array"""
+    for key in reader.object_members():
+        if key == "features":
+            yield from reader.array_items()
+        else:
+            reader.value()
+
+
+def is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+def iter_polygons(infile: TextIO, fmt: str = "auto") -> Iterator[Dict[str, Any]]:
+    """
+    Polygon objects (anything with a "geometry") from NDJSON, a JSON array
+    or a GeoJSON FeatureCollection. fmt is "ndjson", "json" or "auto": an
+    array, a multi-line object or a FeatureCollection on a line longer than
+    DETECT_SIZE (its "type" within that read-ahead) is JSON, anything else
+    NDJSON. Detection reads at most DETECT_SIZE characters ahead, so a
+    large compact FeatureCollection is streamed, not buffered whole.
+    """
+    reader = JSONStreamReader(infile)
+    first = reader.peek()
+    if first is None:
+        return
+
+    if fmt == "auto":
+        head = reader.prefix(DETECT_SIZE)
+        newline = head.find("\n")
+        if first == "[":
+            fmt = "json"
+        elif newline >= 0 and is_json(head[:newline]):
+            # The first line holds a complete object
+            fmt = "ndjson"
+        elif newline >= 0 or FEATURE_COLLECTION.search(head):
+            # A multi-line object, or a FeatureCollection on a line longer than the read-ahead
+            fmt = "json"
+        else:
+            # One object longer than the read-ahead
+            fmt = "ndjson"
+
+    if fmt == "json":
+        if reader.peek() == "[":
+            yield from reader.array_items()
+        else:
+            yield from iter_feature_collection(reader)
+        if reader.peek() is not None:
+            raise ValueError("Unexpected data after the JSON value")
+        return
+
+    # NDJSON; a line may also be a whole FeatureCollection
+    while reader.peek() is not None:
+        item = reader.value()
+        if isinstance(item, dict) and item.get("type") == "FeatureCollection":
+            yield from item.get("features", [])
+        else:
+            yield item
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+LST Composite
+Multi-temporal compositing of ECOSTRESS LST scenes on one common grid.
+
+merge() keeps the first valid pixel, so one day silently overrides the
+others. A composite instead keeps, per pixel, every scene's value and
+reports mean, median, max, valid-scene count and a chosen percentile as a
+multi-band COG.
+
+State lives in a directory and is updated incrementally: adding a scene
+warps it onto the grid once, writes the next generation of the running
+sum/count/max and stores its layer for the order statistics (median,
+percentile), which are the only bands that read the per-scene layers
+again. state.json names the current aggregate files, so replacing it
+commits the new aggregates and the scene list together; a crash midway
+leaves the previous generation in force. Scenes already in the state are
+skipped. Everything runs in row chunks, so memory is bounded by
+chunk_rows x width x scenes.
+
+Usage (from the repository root):
+  python data-processing/lst_composite.py --boundary data-processing/raw/geoBoundaries-BGD-ADM2.geojson \
+      data-processing/raw/LST/*.tif
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.features import geometry_mask
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+from shapely import wkt
+
+from cog_writer import convert_to_cog
+
+STATE_FORMAT = 1
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATE_DIR = os.path.join(SCRIPT_DIR, "processed", "lst_composite")
+DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "processed", "dhaka_LST_composite.tif")
+
+DEFAULT_PERCENTILE = 90.0
+DEFAULT_CHUNK_ROWS = 256
+
+# Running aggregate -> (dtype, initial value)
+AGGREGATES = {
+    "sum": (np.float64, 0),
+    "count": (np.uint16, 0),
+    "max": (np.float32, -np.inf),
+}
+
+
+def nan_percentiles(stack: np.ndarray, percentiles: List[float], count: np.ndarray) -> List[np.ndarray]:
+    """
+    Per-pixel percentiles over axis 0 ignoring NaN, with numpy's linear
+    interpolation. A single sort replaces np.nanpercentile, which falls
+    back to a Python-level loop over pixels when NaNs are present. count
+    is the number of valid values per pixel; pixels with none get NaN.
+    """
+    ordered = np.sort(stack, axis=0)  # NaN sorts last
+    last = np.maximum(count.astype(np.int64) - 1, 0)
+    results = []
+    for q in percentiles:
+        position = last * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        low = np.take_along_axis(ordered, lower[np.newaxis], axis=0)[0]
+        high = np.take_along_axis(ordered, upper[np.newaxis], axis=0)[0]
+        value = low + (high - low) * (position - lower)
+        results.append(np.where(count > 0, value, np.nan))
+    return results
+
+
+def aggregate_names(generation: int) -> Dict[str, str]:
+    """File names of the running aggregates after generation scenes"""
+    return {key: f"{key}_{generation:04d}.npy" for key in AGGREGATES}
+
+
+def scene_signature(path: str) -> List:
+    """[basename, size, mtime_ns] identifying one version of a scene file"""
+    stat = os.stat(path)
+    return [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+
+
+class LSTComposite:
+    """Running per-pixel aggregates of LST scenes on a fixed grid"""
+
+    def __init__(self, state_dir: str):
+        self.state_dir = state_dir
+        with open(self._path("state.json"), "r") as f:
+            self.state: Dict[str, Any] = json.load(f)
+        if self.state.get("format") != STATE_FORMAT:
+            raise ValueError(f"Unsupported composite state in {state_dir}")
+        grid = self.state["grid"]
+        self.crs = grid["crs"]
+        self.transform = Affine(*grid["transform"])
+        self.width = grid["width"]
+        self.height = grid["height"]
+        self.boundary = wkt.loads(self.state["boundary_wkt"]) if self.state.get("boundary_wkt") else None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.state_dir, name)
+
+    @classmethod
+    def create(cls, state_dir: str, crs, transform, width: int, height: int,
+               boundary=None) -> "LSTComposite":
+        """Start an empty composite on the given grid (boundary in the grid CRS masks the output)"""
+        os.makedirs(state_dir, exist_ok=True)
+        names = aggregate_names(0)
+        state = {
+            "format": STATE_FORMAT,
+            "grid": {"crs": str(crs), "transform": list(transform)[:6], "width": width, "height": height},
+            "boundary_wkt": boundary.wkt if boundary is not None else None,
+            "scenes": [],
+            "aggregates": names
+        }
+        for key, (dtype, initial) in AGGREGATES.items():
+            np.save(os.path.join(state_dir, names[key]), np.full((height, width), initial, dtype=dtype))
+        with open(os.path.join(state_dir, "state.json"), "w") as f:
+            json.dump(state, f, indent=2)
+        return cls(state_dir)
+
+    @property
+    def scenes(self) -> List[List]:
+        return self.state["scenes"]
+
+    def has_scene(self, path: str) -> bool:
+        return scene_signature(path) in self.scenes
+
+    def _aggregate_paths(self) -> Dict[str, str]:
+        # States written before aggregates were versioned use fixed names
+        names = self.state.get("aggregates") or {key: f"{key}.npy" for key in AGGREGATES}
+        return {key: self._path(name) for key, name in names.items()}
+
+    def _save_state(self):
+        tmp_path = self._path("state.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self._path("state.json"))
+
+    def add_scene(self, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> bool:
+        """Fold one scene into the running aggregates; False if it is already included"""
+        if self.has_scene(path):
+            return False
+
+        # The current aggregates are only read; the next generation goes to new files
+        # that take effect when state.json is replaced
+        previous = self._aggregate_paths()
+        names = aggregate_names(len(self.scenes) + 1)
+        shape = (self.height, self.width)
+        old = {key: np.load(previous[key], mmap_mode="r") for key in AGGREGATES}
+        new = {key: np.lib.format.open_memmap(self._path(names[key]), mode="w+", dtype=dtype, shape=shape)
+               for key, (dtype, _) in AGGREGATES.items()}
+        layer_name = f"scene_{len(self.scenes):04d}.npy"
+        layer = np.lib.format.open_memmap(self._path(layer_name + ".tmp"), mode="w+",
+                                          dtype=np.float32, shape=shape)
+
+        # A scene without nodata gets an alpha band, so the VRT's 0 fill outside it is not data
+        with rasterio.open(path) as src, WarpedVRT(src, crs=self.crs, transform=self.transform,
+                                                   width=self.width, height=self.height,
+                                                   resampling=Resampling.nearest,
+                                                   add_alpha=src.nodata is None) as vrt:
+            for row_off in range(0, self.height, chunk_rows):
+                rows = slice(row_off, min(row_off + chunk_rows, self.height))
+                window = Window(0, row_off, self.width, rows.stop - row_off)
+                values = vrt.read(1, window=window).astype(np.float32)
+                if src.nodata is None:
+                    values[vrt.read(vrt.count, window=window) == 0] = np.nan
+                elif not np.isnan(vrt.nodata):
+                    values[values == vrt.nodata] = np.nan
+
+                valid = ~np.isnan(values)
+                new["sum"][rows] = old["sum"][rows] + np.where(valid, values, 0.0)
+                new["count"][rows] = old["count"][rows] + valid
+                new["max"][rows] = np.fmax(old["max"][rows], values)
+                layer[rows] = values
+
+        for array in (*new.values(), layer):
+            array.flush()
+        del old, new, layer
+        os.replace(self._path(layer_name + ".tmp"), self._path(layer_name))
+
+        self.scenes.append(scene_signature(path))
+        self.state.setdefault("layers", []).append(layer_name)
+        self.state["aggregates"] = names
+        self._save_state()
+
+        for key, old_path in previous.items():
+            if old_path != self._path(names[key]) and os.path.exists(old_path):
+                os.remove(old_path)
+        return True
+
+    def write(self, output_path: str, percentile: float = DEFAULT_PERCENTILE,
+              chunk_rows: int = DEFAULT_CHUNK_ROWS) -> str:
+        """Write mean, median, max, count and the percentile as a 5-band float32 COG"""
+        if not self.scenes:
+            raise ValueError("Composite has no scenes")
+
+        paths = self._aggregate_paths()
+        total = np.load(paths["sum"], mmap_mode="r")
+        count = np.load(paths["count"], mmap_mode="r")
+        maximum = np.load(paths["max"], mmap_mode="r")
+        layers = [np.load(self._path(name), mmap_mode="r") for name in self.state["layers"]]
+
+        descriptions = ["mean", "median", "max", "count", f"p{percentile:g}"]
+        profile = {
+            "driver": "GTiff", "dtype": "float32", "nodata": np.nan, "count": len(descriptions),
+            "width": self.width, "height": self.height, "crs": self.crs, "transform": self.transform,
+            "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate",
+            "bigtiff": "if_safer"
+        }
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        blocks_tif = output_path + ".blocks.tif"
+        try:
+            with rasterio.open(blocks_tif, "w", **profile) as dst:
+                for band, description in enumerate(descriptions, start=1):
+                    dst.set_band_description(band, description)
+
+                for row_off in range(0, self.height, chunk_rows):
+                    rows = slice(row_off, min(row_off + chunk_rows, self.height))
+                    window = Window(0, row_off, self.width, rows.stop - row_off)
+                    n = count[rows].astype(np.float32)
+                    has_data = n > 0
+                    if self.boundary is not None:
+                        has_data &= geometry_mask([self.boundary], out_shape=n.shape, invert=True,
+                                                  transform=rasterio.windows.transform(window, self.transform))
+
+                    stack = np.stack([layer[rows] for layer in layers])
+                    median, upper = nan_percentiles(stack, [50.0, percentile], count[rows])
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        mean = total[rows] / n
+
+                    # Pixels outside the boundary or never observed are nodata, with a count of 0
+                    bands = [(mean, np.nan), (median, np.nan), (maximum[rows], np.nan),
+                             (n, 0.0), (upper, np.nan)]
+                    for band, (values, fill) in enumerate(bands, start=1):
+                        dst.write(np.where(has_data, values, fill).astype(np.float32), band, window=window)
+
+            convert_to_cog(blocks_tif, output_path)
+        finally:
+            if os.path.exists(blocks_tif):
+                os.remove(blocks_tif)
+        return output_path
+
+
+def update_composite(tif_files: List[str], geojson_path: Optional[str] = None,
+                     state_dir: str = DEFAULT_STATE_DIR, output_path: str = DEFAULT_OUTPUT,
+                     percentile: float = DEFAULT_PERCENTILE,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> str:
+    """Add any new scenes to the composite in state_dir (creating it on first use) and write it"""
+    if os.path.exists(os.path.join(state_dir, "state.json")):
+        composite = LSTComposite(state_dir)
+    else:
+        # Imported here: process_lst pulls in geopandas for the boundary
+        from process_lst import clip_grid, load_boundary
+
+        if geojson_path is None:
+            raise ValueError("A boundary GeoJSON is needed to create a new composite")
+        with rasterio.open(tif_files[0]) as src0:
+            boundary = load_boundary(geojson_path, src0.crs)
+        crs, transform, width, height = clip_grid(tif_files, boundary)
+        composite = LSTComposite.create(state_dir, crs, transform, width, height, boundary)
+        print(f"Created composite grid {width}x{height} ({crs}) in {state_dir}")
+
+    for path in tif_files:
+        if composite.add_scene(path, chunk_rows):
+            print(f"Added scene {os.path.basename(path)}")
+        else:
+            print(f"Skipped scene already in composite: {os.path.basename(path)}")
+
+    composite.write(output_path, percentile, chunk_rows)
+    print(f"Saved composite ({len(composite.scenes)} scenes): {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pixel multi-temporal composite of LST scenes")
+    parser.add_argument("scenes", nargs="+", help="LST GeoTIFFs to add to the composite")
+    parser.add_argument("--boundary", help="GeoJSON boundary; required when the state is created")
+    parser.add_argument("--state-dir", default=DEFAULT_STATE_DIR, help="Directory of the running aggregates")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Multi-band composite GeoTIFF to write")
+    parser.add_argument("--percentile", type=float, default=DEFAULT_PERCENTILE,
+                        help="Percentile written as the last band")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows processed per chunk")
+    args = parser.parse_args()
+
+    missing = [p for p in args.scenes if not os.path.exists(p)]
+    if missing:
+        print('Missing files:', missing)
+        return 2
+
+    update_composite(args.scenes, args.boundary, args.state_dir, args.output,
+                     args.percentile, args.chunk_rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Overlay renderer shared by the overlay and tile scripts.
+
+Values are mapped through a 256-entry RGBA lookup table straight to a
+uint8 image, one image pixel per raster pixel, and encoded as PNG with
+zlib. Matplotlib is not needed: the flood-risk and YlGn colormaps are
+rebuilt from their colour stops exactly as LinearSegmentedColormap does,
+and inferno is stored as its 256 entries. Colours match
+cmap(x, bytes=True) of the matplotlib colormaps.
+"""
+
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+LUT_SIZE = 256
+# Overlay opacity (0.75) on valid pixels
+OVERLAY_ALPHA = 191
+
+FLOOD_RISK_COLORS = [
+    "#8B0000",  # Dark red - Very high flood risk
+    "#DC143C",  # Crimson - High flood risk
+    "#FF4500",  # Orange red - Moderate-high flood risk
+    "#FF6347",  # Tomato - Moderate flood risk
+    "#FFA500",  # Orange - Moderate flood risk
+    "#FFD700",  # Gold - Lower moderate flood risk
+    "#FFFF00",  # Yellow - Transitional
+    "#ADFF2F",  # Green yellow - Lower flood risk
+    "#32CD32",  # Lime green - Low flood risk
+    "#228B22",  # Forest green - Very low flood risk
+    "#006400"   # Dark green - Minimal flood risk
+]
+
+# Land cover class -> colour of the classified land cover raster, as in
+# VegetationLegend.jsx and the thana PNGs
+LAND_COVER_COLORS = {
+    0: "#87CEEB",  # Sky blue - Water/River
+    1: "#DC143C",  # Crimson - Built-up
+    2: "#00BF00",  # Green - Vegetation
+}
+
+# ColorBrewer YlGn, the stops of matplotlib's "YlGn"
+YLGN_COLORS = ["#ffffe5", "#f7fcb9", "#d9f0a3", "#addd8e", "#78c679",
+               "#41ab5d", "#238443", "#006837", "#004529"]
+
+# matplotlib's "inferno", all 256 entries as RGB hex
+INFERNO_LUT = [
+    "000003", "000004", "000006", "010007", "010109", "01010b", "02010e", "020210",
+    "030212", "040314", "040316", "050418", "06041b", "07051d", "08061f", "090621",
+    "0a0723", "0b0726", "0d0828", "0e082a", "0f092d", "10092f", "120a32", "130a34",
+    "140b36", "160b39", "170b3b", "190b3e", "1a0b40", "1c0c43", "1d0c45", "1f0c47",
+    "200c4a", "220b4c", "240b4e", "260b50", "270b52", "290b54", "2b0a56", "2d0a58",
+    "2e0a5a", "300a5c", "32095d", "34095f", "350960", "370961", "390962", "3b0964",
+    "3c0965", "3e0966", "400966", "410967", "430a68", "450a69", "460a69", "480b6a",
+    "4a0b6a", "4b0c6b", "4d0c6b", "4f0d6c", "500d6c", "520e6c", "530e6d", "550f6d",
+    "570f6d", "58106d", "5a116d", "5b116e", "5d126e", "5f126e", "60136e", "62146e",
+    "63146e", "65156e", "66156e", "68166e", "6a176e", "6b176e", "6d186e", "6e186e",
+    "70196e", "72196d", "731a6d", "751b6d", "761b6d", "781c6d", "7a1c6d", "7b1d6c",
+    "7d1d6c", "7e1e6c", "801f6b", "811f6b", "83206b", "85206a", "86216a", "88216a",
+    "892269", "8b2269", "8d2369", "8e2468", "902468", "912567", "932567", "952666",
+    "962666", "982765", "992864", "9b2864", "9c2963", "9e2963", "a02a62", "a12b61",
+    "a32b61", "a42c60", "a62c5f", "a72d5f", "a92e5e", "ab2e5d", "ac2f5c", "ae305b",
+    "af315b", "b1315a", "b23259", "b43358", "b53357", "b73456", "b83556", "ba3655",
+    "bb3754", "bd3753", "be3852", "bf3951", "c13a50", "c23b4f", "c43c4e", "c53d4d",
+    "c73e4c", "c83e4b", "c93f4a", "cb4049", "cc4148", "cd4247", "cf4446", "d04544",
+    "d14643", "d24742", "d44841", "d54940", "d64a3f", "d74b3e", "d94d3d", "da4e3b",
+    "db4f3a", "dc5039", "dd5238", "de5337", "df5436", "e05634", "e25733", "e35832",
+    "e45a31", "e55b30", "e65c2e", "e65e2d", "e75f2c", "e8612b", "e9622a", "ea6428",
+    "eb6527", "ec6726", "ed6825", "ed6a23", "ee6c22", "ef6d21", "f06f1f", "f0701e",
+    "f1721d", "f2741c", "f2751a", "f37719", "f37918", "f47a16", "f57c15", "f57e14",
+    "f68012", "f68111", "f78310", "f7850e", "f8870d", "f8880c", "f88a0b", "f98c09",
+    "f98e08", "f99008", "fa9107", "fa9306", "fa9506", "fa9706", "fb9906", "fb9b06",
+    "fb9d06", "fb9e07", "fba007", "fba208", "fba40a", "fba60b", "fba80d", "fbaa0e",
+    "fbac10", "fbae12", "fbb014", "fbb116", "fbb318", "fbb51a", "fbb71c", "fbb91e",
+    "fabb21", "fabd23", "fabf25", "fac128", "f9c32a", "f9c52c", "f9c72f", "f8c931",
+    "f8cb34", "f8cd37", "f7cf3a", "f7d13c", "f6d33f", "f6d542", "f5d745", "f5d948",
+    "f4db4b", "f4dc4f", "f3de52", "f3e056", "f3e259", "f2e45d", "f2e660", "f1e864",
+    "f1e968", "f1eb6c", "f1ed70", "f1ee74", "f1f079", "f1f27d", "f2f381", "f2f485",
+    "f3f689", "f4f78d", "f5f891", "f6fa95", "f7fb99", "f9fc9d", "fafda0", "fcfea4"
+]
+
+_luts: Dict[str, np.ndarray] = {}
+
+
+def hex_to_rgb(color: str) -> List[float]:
+    color = color.lstrip("#")
+    return [int(color[i:i + 2], 16) / 255 for i in (0, 2, 4)]
+
+
+def segmented_lut(colors: List[str], n: int = LUT_SIZE) -> np.ndarray:
+    """n x 4 uint8 LUT of evenly spaced colour stops (LinearSegmentedColormap.from_list)"""
+    stops = np.array([hex_to_rgb(c) + [1.0] for c in colors])
+    x = np.linspace(0.0, 1.0, len(colors)) * (n - 1)
+    xind = (n - 1) * np.linspace(0.0, 1.0, n)
+    # Same arithmetic as matplotlib's _create_lookup_table, so bytes agree exactly
+    ind = np.searchsorted(x, xind)[1:-1]
+    distance = ((xind[1:-1] - x[ind - 1]) / (x[ind] - x[ind - 1]))[:, np.newaxis]
+    inner = distance * (stops[ind] - stops[ind - 1]) + stops[ind - 1]
+    lut = np.clip(np.concatenate([stops[:1], inner, stops[-1:]]), 0.0, 1.0)
+    return (lut * 255).astype(np.uint8)
+
+
+def listed_lut(hex_colors: List[str]) -> np.ndarray:
+    """n x 4 uint8 LUT of opaque RGB hex entries"""
+    rgb = np.array([[int(c[i:i + 2], 16) for i in (0, 2, 4)] for c in hex_colors], dtype=np.uint8)
+    return np.concatenate([rgb, np.full((len(rgb), 1), 255, dtype=np.uint8)], axis=1)
+
+
+def colormap_lut(name: str) -> np.ndarray:
+    """256 x 4 uint8 RGBA LUT of flood_risk, inferno or YlGn"""
+    if name not in _luts:
+        if name == "flood_risk":
+            _luts[name] = segmented_lut(FLOOD_RISK_COLORS)
+        elif name == "YlGn":
+            _luts[name] = segmented_lut(YLGN_COLORS)
+        elif name == "inferno":
+            _luts[name] = listed_lut(INFERNO_LUT)
+        else:
+            raise ValueError(f"Unknown colormap: {name}")
+    return _luts[name]
+
+
+def class_lut(classes: Dict[int, str]) -> np.ndarray:
+    """256 x 4 uint8 LUT of integer class -> opaque colour; other values are transparent"""
+    lut = np.zeros((LUT_SIZE, 4), dtype=np.uint8)
+    for value, color in classes.items():
+        lut[value, :3] = [round(c * 255) for c in hex_to_rgb(color)]
+        lut[value, 3] = 255
+    return lut
+
+
+def colorize_classes(values: np.ndarray, valid: np.ndarray, lut: np.ndarray,
+                     alpha: int = OVERLAY_ALPHA) -> np.ndarray:
+    """
+    RGBA uint8 image of integer class values through a class_lut. Valid
+    pixels of a known class get the given alpha, the rest are fully
+    transparent.
+    """
+    index = np.clip(np.where(valid, values, 0), 0, LUT_SIZE - 1).astype(np.intp)
+    rgba = lut[index]
+    shown = valid & (rgba[..., 3] > 0)
+    rgba[..., 3] = alpha
+    rgba[~shown] = 0
+    return rgba
+
+
+def colorize(values: np.ndarray, valid: np.ndarray, lut: np.ndarray, low: float, high: float,
+             alpha: int = OVERLAY_ALPHA) -> np.ndarray:
+    """
+    RGBA uint8 image of values stretched linearly from low..high (clipped)
+    through lut. Valid pixels get the given alpha, the rest are fully
+    transparent.
+    """
+    scaled = (np.clip(values, low, high) - low) / (high - low)
+    # Index as Colormap.__call__ does: floor(x * N), with x == 1 in the last entry
+    index = np.minimum(np.where(valid, scaled, 0.0) * len(lut), len(lut) - 1).astype(np.intp)
+    rgba = lut[index]
+    rgba[..., 3] = alpha
+    rgba[~valid] = 0
+    return rgba
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _png_header(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+
+def _scanlines(rgba: np.ndarray, above: Optional[np.ndarray] = None) -> bytes:
+    """Filtered PNG scanlines of RGBA rows; above is the row preceding them, if any"""
+    height, width = rgba.shape[:2]
+    rows = np.ascontiguousarray(rgba, dtype=np.uint8).reshape(height, width * 4)
+    # "Up" filter on every row: the difference to the row above compresses well
+    scanlines = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 0] = 2
+    scanlines[:, 1:] = rows
+    scanlines[1:, 1:] -= rows[:-1]
+    if above is not None:
+        scanlines[0, 1:] -= above.reshape(-1)
+    return scanlines.tobytes()
+
+
+def encode_png(rgba: np.ndarray, level: int = 6) -> bytes:
+    """8-bit RGBA PNG of an (rows, cols, 4) uint8 array"""
+    height, width = rgba.shape[:2]
+    return (_png_header(width, height) + _chunk(b"IDAT", zlib.compress(_scanlines(rgba), level))
+            + _chunk(b"IEND", b""))
+
+
+def write_png(path: str, rgba: np.ndarray, level: int = 6) -> str:
+    with open(path, "wb") as f:
+        f.write(encode_png(rgba, level))
+    return path
+
+
+def write_png_bands(path: str, width: int, height: int, bands: Iterable[np.ndarray],
+                    level: int = 6) -> str:
+    """
+    Stream an RGBA PNG from consecutive (rows, width, 4) bands, so only one
+    band is in memory at a time. The bands must add up to height rows.
+    """
+    compressor = zlib.compressobj(level)
+    above = None
+    rows = 0
+    with open(path, "wb") as f:
+        f.write(_png_header(width, height))
+        for band in bands:
+            data = compressor.compress(_scanlines(band, above))
+            if data:
+                f.write(_chunk(b"IDAT", data))
+            above = band[-1]
+            rows += band.shape[0]
+        f.write(_chunk(b"IDAT", compressor.flush()) + _chunk(b"IEND", b""))
+    if rows != height:
+        raise ValueError(f"PNG bands hold {rows} rows, expected {height}")
+    return path
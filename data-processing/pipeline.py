@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Processing Pipeline
+Runs the data-processing scripts as stages and rebuilds only what changed.
+
+Each stage lists its data inputs, its parameters and its outputs; the
+data-processing modules its script imports (directly or through other
+modules) are added as inputs by following the imports. After a successful run the
+manifest records the content hash of every input and output; the next run
+skips a stage whose inputs, parameters and outputs are unchanged. Hashes
+are cached on (size, mtime) in the manifest, so a no-change rebuild only
+stats files. Downstream stages see an upstream rebuild through the hashes
+of their inputs.
+
+Independent stages (elevation, LST, boundary) run in parallel processes.
+
+Usage (from anywhere):
+  python data-processing/pipeline.py            # build what changed
+  python data-processing/pipeline.py --dry-run  # show what would run
+  python data-processing/pipeline.py --force elevation
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from fingerprints import raster_checksum
+
+MANIFEST_FORMAT = 1
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, "processed", "pipeline_manifest.json")
+
+# Paths are relative to the repository root, where the scripts expect to run
+STAGES: List[Dict[str, Any]] = [
+    {
+        "name": "elevation",
+        "script": "data-processing/process_elevation.py",
+        "args": [],
+        "inputs": [
+            "data-processing/raw/N23E090.hgt",
+            "data-processing/raw/N24E090.hgt",
+            "data-processing/raw/geoBoundaries-BGD-ADM2.geojson",
+        ],
+        "outputs": [
+            "data-processing/processed/dhaka_elevation.tif",
+            "data-processing/processed/dhaka_elevation_map.png",
+        ],
+        "after": [],
+    },
+    {
+        "name": "lst",
+        "script": "data-processing/process_lst.py",
+        "args": [],
+        "inputs": [
+            "data-processing/raw/LST/ECO_L2T_LSTE*.tif",
+            "data-processing/raw/geoBoundaries-BGD-ADM2.geojson",
+        ],
+        "outputs": [
+            "data-processing/processed/dhaka_LST_map.tif",
+            "data-processing/processed/dhaka_LST_map.png",
+        ],
+        "after": [],
+    },
+    {
+        "name": "elevation_overlay",
+        "script": "data-processing/convert_tif_to_map.py",
+        "args": [],
+        "inputs": ["data-processing/processed/dhaka_elevation.tif"],
+        "outputs": [
+            "client/public/data/dhaka_elevation_overlay.png",
+            "client/public/data/dhaka_elevation_bounds.json",
+        ],
+        "after": ["elevation"],
+    },
+    {
+        "name": "lst_overlay",
+        "script": "data-processing/convert_lst_to_map.py",
+        "args": [],
+        "inputs": ["data-processing/processed/dhaka_LST_map.tif"],
+        "outputs": [
+            "client/public/data/dhaka_lst_overlay.png",
+            "client/public/data/dhaka_lst_bounds.json",
+        ],
+        "after": ["lst"],
+    },
+    {
+        "name": "boundary",
+        "script": "data-processing/create_boundary_image.py",
+        "args": [],
+        "inputs": ["data-processing/raw/dhaka_boundary.geojson"],
+        "outputs": ["client/public/data/dhaka_boundary.png"],
+        "after": [],
+    },
+]
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Input paths with glob patterns expanded; a pattern matching nothing is kept as missing"""
+    paths = []
+    for pattern in patterns:
+        if any(c in pattern for c in "*?["):
+            matches = sorted(os.path.relpath(p, REPO_ROOT) for p in glob.glob(os.path.join(REPO_ROOT, pattern)))
+            paths.extend(matches or [pattern])
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def module_inputs(script: str) -> List[str]:
+    """
+    data-processing modules a script imports, directly or through other
+    modules (function-level imports included), as repository paths
+    """
+    modules_dir = os.path.relpath(SCRIPT_DIR, REPO_ROOT)
+    found: List[str] = []
+    queue = [script]
+    while queue:
+        path = os.path.join(REPO_ROOT, queue.pop())
+        try:
+            with open(path, "r") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = os.path.join(modules_dir, name.split(".")[0] + ".py")
+                if module != script and module not in found and \
+                        os.path.exists(os.path.join(REPO_ROOT, module)):
+                    found.append(module)
+                    queue.append(module)
+    return sorted(found)
+
+
+class Manifest:
+    """Per-stage record of the input/output hashes of the last successful run"""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        self.path = path
+        self.data: Dict[str, Any] = {"format": MANIFEST_FORMAT, "files": {}, "stages": {}}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT:
+                self.data = data
+
+    def file_hash(self, rel_path: str) -> Optional[str]:
+        """SHA-256 of a repository file, reusing the recorded hash while size and mtime match"""
+        try:
+            stat = os.stat(os.path.join(REPO_ROOT, rel_path))
+        except FileNotFoundError:
+            return None
+        known = self.data["files"].get(rel_path)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        checksum = raster_checksum(os.path.join(REPO_ROOT, rel_path))
+        self.data["files"][rel_path] = [stat.st_size, stat.st_mtime_ns, checksum]
+        return checksum
+
+    def fingerprint(self, stage: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = [stage["script"]] + expand_inputs(stage["inputs"]) + module_inputs(stage["script"])
+        return {
+            "inputs": {path: self.file_hash(path) for path in inputs},
+            "params": {"args": stage["args"]},
+        }
+
+    def outputs(self, stage: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        return {path: self.file_hash(path) for path in stage["outputs"]}
+
+    def is_current(self, stage: Dict[str, Any], fingerprint: Dict[str, Any]) -> bool:
+        record = self.data["stages"].get(stage["name"])
+        if record is None:
+            return False
+        return (record["inputs"] == fingerprint["inputs"]
+                and record["params"] == fingerprint["params"]
+                and record["outputs"] == self.outputs(stage))
+
+    def record(self, stage: Dict[str, Any], fingerprint: Dict[str, Any], seconds: float):
+        self.data["stages"][stage["name"]] = {
+            **fingerprint,
+            "outputs": self.outputs(stage),
+            "seconds": round(seconds, 3),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def run_stage(stage: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one stage's script in its own process from the repository root"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, stage["script"]] + stage["args"], cwd=REPO_ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    missing = [p for p in stage["outputs"] if not os.path.exists(os.path.join(REPO_ROOT, p))]
+    return {
+        "ok": proc.returncode == 0 and not missing,
+        "returncode": proc.returncode,
+        "missing_outputs": missing,
+        "log": proc.stdout,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_pipeline(stages: List[Dict[str, Any]] = STAGES, manifest_path: str = DEFAULT_MANIFEST,
+                 force: Optional[List[str]] = None, only: Optional[List[str]] = None,
+                 jobs: int = 3, dry_run: bool = False, verbose: bool = False) -> Dict[str, str]:
+    """
+    Run stale stages in dependency order, independent ones in parallel.
+    Returns each stage's status: skipped, built, failed, blocked or stale
+    (dry run).
+    """
+    manifest = Manifest(manifest_path)
+    force = set(force or [])
+    selected = [s for s in stages if only is None or s["name"] in only]
+    names = {s["name"] for s in selected}
+    pending = {s["name"]: s for s in selected}
+    status: Dict[str, str] = {}
+
+    def ready(stage):
+        return all(dep in status or dep not in names for dep in stage["after"])
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if not ready(stage):
+                    continue
+                del pending[name]
+
+                failed_deps = [d for d in stage["after"] if status.get(d) in ("failed", "blocked")]
+                fingerprint = manifest.fingerprint(stage)
+                missing = [p for p, h in fingerprint["inputs"].items() if h is None]
+                if dry_run and any(status.get(d) == "stale" for d in stage["after"]):
+                    status[name] = "stale"
+                    print(f"[{name}] would run {stage['script']} (after a stale stage)")
+                elif failed_deps or missing:
+                    status[name] = "blocked"
+                    print(f"[{name}] blocked: " + (f"failed {failed_deps}" if failed_deps else f"missing {missing}"))
+                elif name not in force and manifest.is_current(stage, fingerprint):
+                    status[name] = "skipped"
+                    print(f"[{name}] up to date")
+                elif dry_run:
+                    status[name] = "stale"
+                    print(f"[{name}] would run {stage['script']}")
+                else:
+                    print(f"[{name}] running {stage['script']}")
+                    running[pool.submit(run_stage, stage)] = (stage, fingerprint)
+
+            if not running:
+                if pending and not any(ready(s) for s in pending.values()):
+                    raise RuntimeError(f"Unsatisfiable stage order: {sorted(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fingerprint = running.pop(future)
+                result = future.result()
+                if verbose or not result["ok"]:
+                    print(result["log"].rstrip())
+                if result["ok"]:
+                    status[stage["name"]] = "built"
+                    # Outputs are hashed now, so downstream stages compare against them
+                    manifest.record(stage, fingerprint, result["seconds"])
+                    manifest.save()
+                    print(f"[{stage['name']}] built in {result['seconds']:.1f}s")
+                else:
+                    status[stage["name"]] = "failed"
+                    print(f"[{stage['name']}] failed (exit {result['returncode']}, "
+                          f"missing outputs: {result['missing_outputs']})")
+
+    if not dry_run:
+        manifest.save()
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental runner for the data-processing scripts")
+    parser.add_argument("stages", nargs="*", help="Only run these stages (default: all)")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="Rebuild these stages even if unchanged (no names: all selected stages)")
+    parser.add_argument("--jobs", type=int, default=3, help="Stages run in parallel at most")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Manifest file")
+    parser.add_argument("--dry-run", action="store_true", help="Report stale stages without running them")
+    parser.add_argument("--verbose", action="store_true", help="Print every stage's output")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            after = f" (after {', '.join(stage['after'])})" if stage["after"] else ""
+            print(f"{stage['name']}: {stage['script']}{after}")
+        return 0
+
+    known = {s["name"] for s in STAGES}
+    unknown = [n for n in args.stages + (args.force or []) if n not in known]
+    if unknown:
+        print(f"Unknown stages: {unknown}")
+        return 2
+
+    only = args.stages or None
+    force = args.force if args.force else (list(known) if args.force is not None else None)
+
+    start = time.perf_counter()
+    status = run_pipeline(STAGES, args.manifest, force, only, args.jobs, args.dry_run, args.verbose)
+    counts = {s: list(status.values()).count(s) for s in sorted(set(status.values()))}
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s: {counts}")
+    return 1 if any(s in ("failed", "blocked") for s in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,49 +1,65 @@
 import json
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.colors import ListedColormap
 import geopandas as gpd
 import rasterio
-from rasterio.merge import merge
-from rasterio.mask import mask
+from rasterio.features import geometry_mask
 from rasterio.transform import from_bounds
+from rasterio.windows import Window
+from shapely.geometry import shape
+from shapely.ops import unary_union
 import os
-import struct
+import sys
+import glob
+
+from cog_writer import write_cog
+from overlay_render import colormap_lut
+from raster_store import window_for_bounds
+
+def hgt_tile_size(filename):
+    """Samples per side of a square HGT tile (1201 for SRTM3, 3601 for SRTM1)"""
+    file_size = os.path.getsize(filename)
+    size = int(round(np.sqrt(file_size / 2)))
+    if size * size * 2 != file_size:
+        raise ValueError(f"{filename} is not a square big-endian int16 HGT tile ({file_size} bytes)")
+    return size
+
+def hgt_tile_origin(filename):
+    """(lat, lon) of the south-west corner encoded in an HGT name like N23E090.hgt"""
+    name = os.path.basename(filename)
+    lat = int(name[1:3])
+    lon = int(name[4:7])
+    if name[0].upper() == 'S':
+        lat = -lat
+    if name[3].upper() == 'W':
+        lon = -lon
+    return lat, lon
+
+def read_hgt_raw(filename):
+    """Memory-map an HGT tile as big-endian int16 without reading or copying it"""
+    size = hgt_tile_size(filename)
+    return np.memmap(filename, dtype='>i2', mode='r', shape=(size, size))
 
 def read_hgt_file(filename):
     """Read SRTM HGT file and return elevation data and metadata"""
-    file_size = os.path.getsize(filename)
-    size = int(np.sqrt(file_size / 2))
-    
-    with open(filename, 'rb') as hgt_data:
-        data = hgt_data.read()
-        elevations = []
-        for i in range(0, len(data), 2):
-            value = struct.unpack('>h', data[i:i+2])[0]
-            elevations.append(value)
-    
-    elevation_array = np.array(elevations).reshape((size, size)).astype(np.float32)
-    elevation_array[elevation_array < 0] = np.nan
-    
-    return elevation_array, size
-
-def create_flood_risk_colormap():
-    """Create a colormap for flood risk visualization"""
-    colors = [
-        '#8B0000',  # Dark red - Very high flood risk
-        '#DC143C',  # Crimson - High flood risk
-        '#FF4500',  # Orange red - Moderate-high flood risk
-        '#FF6347',  # Tomato - Moderate flood risk
-        '#FFA500',  # Orange - Moderate flood risk
-        '#FFD700',  # Gold - Lower moderate flood risk
-        '#FFFF00',  # Yellow - Transitional
-        '#ADFF2F',  # Green yellow - Lower flood risk
-        '#32CD32',  # Lime green - Low flood risk
-        '#228B22',  # Forest green - Very low flood risk
-        '#006400'   # Dark green - Minimal flood risk
-    ]
-    
-    return LinearSegmentedColormap.from_list('flood_risk', colors, N=256)
+    raw = read_hgt_raw(filename)
+    # Single vectorized cast; voids and negative values become NaN
+    elevation_array = raw.astype(np.float32)
+    elevation_array[raw < 0] = np.nan
+    return elevation_array, raw.shape[0]
+
+def expand_hgt_paths(paths):
+    """HGT files from a list of files, directories and glob patterns, sorted and de-duplicated"""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(glob.glob(os.path.join(path, '*.hgt')))
+        elif any(c in path for c in '*?['):
+            found.update(glob.glob(path))
+        else:
+            found.add(path)
+    return sorted(found)
 
 def enhance_elevation_contrast(elevation_data):
     """Enhance the contrast of elevation data"""
@@ -64,79 +80,75 @@ def enhance_elevation_contrast(elevation_data):
     
     return enhanced_data
 
-def create_merged_tiff(hgt_files, output_dir):
-    """Create a merged TIFF from multiple HGT files"""
-    temp_files = []
-    src_files = []
-    
-    for hgt_file in hgt_files:
-        # Read HGT file
-        elevation_data, size = read_hgt_file(hgt_file)
-        
-        # Determine bounds based on filename
-        filename = os.path.basename(hgt_file)
-        lat = int(filename[1:3])
-        lon = int(filename[4:7])
-        
-        if filename[0] == 'S':
-            lat = -lat
-        if filename[3] == 'W':
-            lon = -lon
-        
-        # Create transform
-        transform = from_bounds(lon, lat, lon+1, lat+1, size, size)
-        
-        # Create a temporary GeoTIFF
-        temp_tiff = os.path.join(output_dir, f"temp_{filename.replace('.hgt', '.tif')}")
-        meta = {
-            'driver': 'GTiff',
-            'dtype': 'float32',
-            'nodata': np.nan,
-            'width': size,
-            'height': size,
-            'count': 1,
-            'crs': 'EPSG:4326',
-            'transform': transform
-        }
-        
-        with rasterio.open(temp_tiff, 'w', **meta) as dst:
-            dst.write(elevation_data.astype('float32'), 1)
-        
-        temp_files.append(temp_tiff)
-    
-    # Merge all temporary TIFF files
-    src_files = [rasterio.open(f) for f in temp_files]
-    merged, out_transform = merge(src_files)
-    
-    # Save merged TIFF
-    merged_tiff = os.path.join(output_dir, "merged_elevation.tif")
-    out_meta = src_files[0].meta.copy()
-    out_meta.update({
-        "height": merged.shape[1],
-        "width": merged.shape[2],
-        "transform": out_transform
-    })
-    
-    with rasterio.open(merged_tiff, 'w', **out_meta) as dest:
-        dest.write(merged)
-    
-    # Close all source files
-    for src in src_files:
-        src.close()
-    
-    # Clean up temporary files
-    for temp_file in temp_files:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-    
-    return merged_tiff, out_meta, out_transform
+def build_hgt_mosaic(hgt_files, bounds=None):
+    """
+    Mosaic HGT tiles in memory: every tile is copied straight into one
+    preallocated float32 array at the offset given by its lat/lon origin.
+    With bounds (west, south, east, north), only the window covering them
+    is allocated and each tile contributes just its overlap with it.
+    Cells without a tile stay NaN. Returns (mosaic, transform).
+    """
+    size = hgt_tile_size(hgt_files[0])
+    origins = [hgt_tile_origin(f) for f in hgt_files]
+    min_lat = min(lat for lat, _ in origins)
+    max_lat = max(lat for lat, _ in origins)
+    min_lon = min(lon for _, lon in origins)
+    max_lon = max(lon for _, lon in origins)
 
-def process_dhaka_elevation():
-    # Paths to files
-    hgt_files = [
+    height = (max_lat - min_lat + 1) * size
+    width = (max_lon - min_lon + 1) * size
+    # Each tile spans one degree at 1/size degree pixels
+    transform = from_bounds(min_lon, min_lat, max_lon + 1, max_lat + 1, width, height)
+
+    window = Window(0, 0, width, height)
+    if bounds is not None:
+        window = window_for_bounds(transform, width, height, bounds)
+        if window is None:
+            raise ValueError('Input shapes do not overlap raster.')
+    row_off, col_off = window.row_off, window.col_off
+    mosaic = np.full((window.height, window.width), np.nan, dtype=np.float32)
+
+    for hgt_file, (lat, lon) in zip(hgt_files, origins):
+        raw = read_hgt_raw(hgt_file)
+        if raw.shape[0] != size:
+            raise ValueError(f"{hgt_file} has {raw.shape[0]} samples per side, expected {size}")
+        row = (max_lat - lat) * size
+        col = (lon - min_lon) * size
+        # Overlap of the tile with the window, in mosaic pixels
+        top, bottom = max(row, row_off), min(row + size, row_off + window.height)
+        left, right = max(col, col_off), min(col + size, col_off + window.width)
+        if top >= bottom or left >= right:
+            continue
+        part = raw[top - row:bottom - row, left - col:right - col]
+        tile = mosaic[top - row_off:bottom - row_off, left - col_off:right - col_off]
+        tile[...] = part
+        tile[part < 0] = np.nan
+
+    return mosaic, rasterio.windows.transform(window, transform)
+
+def geoms_bounds(geoms):
+    """(west, south, east, north) of GeoJSON geometries"""
+    return unary_union([shape(g) for g in geoms]).bounds
+
+def clip_mosaic(mosaic, transform, geoms, all_touched=True):
+    """Crop the mosaic to the bounds of geoms and set pixels outside them to NaN"""
+    window = window_for_bounds(transform, mosaic.shape[1], mosaic.shape[0], geoms_bounds(geoms))
+    if window is None:
+        raise ValueError('Input shapes do not overlap raster.')
+
+    out_transform = rasterio.windows.transform(window, transform)
+    block = mosaic[window.row_off:window.row_off + window.height,
+                   window.col_off:window.col_off + window.width]
+    inside = geometry_mask(geoms, out_shape=block.shape, transform=out_transform,
+                           invert=True, all_touched=all_touched)
+    return np.where(inside, block, np.float32(np.nan)), out_transform
+
+def process_dhaka_elevation(hgt_files=None):
+    # Paths to files (any list of tiles, directories or globs may be given)
+    hgt_files = expand_hgt_paths(hgt_files or [
         "data-processing/raw/N23E090.hgt",
         "data-processing/raw/N24E090.hgt"
-    ]
+    ])
     geojson_file = "data-processing/raw/geoBoundaries-BGD-ADM2.geojson"
     output_dir = "data-processing/processed"
     
@@ -160,63 +172,58 @@ def process_dhaka_elevation():
         print("Dhaka boundary not found in GeoJSON")
         return
     
-    # Create merged TIFF from all HGT files
-    print("Merging HGT files...")
-    merged_tiff, merged_meta, merged_transform = create_merged_tiff(hgt_files, output_dir)
-    
-    # Clip the merged elevation data to Dhaka boundary
-    with rasterio.open(merged_tiff) as src:
-        geoms = [json.loads(dhaka_boundary.to_json())['features'][0]['geometry']]
-        
-        try:
-            out_image, out_transform = mask(src, geoms, crop=True, all_touched=True)
-            out_meta = src.meta.copy()
-            
-            out_meta.update({
-                "height": out_image.shape[1],
-                "width": out_image.shape[2],
-                "transform": out_transform
-            })
-            
-            elevation_data_clipped = out_image[0]
-            
-            # Get elevation statistics
-            valid_data = elevation_data_clipped[~np.isnan(elevation_data_clipped)]
-            if len(valid_data) > 0:
-                min_val = np.min(valid_data)
-                max_val = np.max(valid_data)
-                
-                # Apply contrast enhancement
-                enhanced_elevation = enhance_elevation_contrast(elevation_data_clipped)
-                
-                # Create colormap
-                cmap = create_flood_risk_colormap()
-                
-                # Save enhanced clipped raster
-                with rasterio.open(output_tif, "w", **out_meta) as dest:
-                    dest.write(enhanced_elevation.astype('float32')[np.newaxis, :, :])
-                
-                # Create visualization
-                plt.figure(figsize=(10, 8))
-                im = plt.imshow(enhanced_elevation, cmap=cmap,
-                               extent=[out_transform[2], out_transform[2] + out_transform[0] * out_image.shape[2],
-                                      out_transform[5] + out_transform[4] * out_image.shape[1], out_transform[5]])
-                plt.colorbar(im, label='Elevation (meters)', shrink=0.8)
-                plt.title('Dhaka Elevation Map - Flood Risk Visualization\n(Red = High Risk, Green = Low Risk)', 
-                         fontsize=12)
-                plt.axis('off')
-                plt.savefig(output_png, dpi=150, bbox_inches='tight', facecolor='white')
-                plt.close()
-                
-                print(f"Created {output_tif}")
-                print(f"Created {output_png}")
-                
-        except Exception as e:
-            print(f"Error during clipping: {e}")
-    
-    # Clean up temporary files
-    if os.path.exists(merged_tiff):
-        os.remove(merged_tiff)
+    geoms = [json.loads(dhaka_boundary.to_json())['features'][0]['geometry']]
+
+    try:
+        # Mosaic only the boundary's window of the HGT tiles in memory
+        print("Merging HGT files...")
+        mosaic, mosaic_transform = build_hgt_mosaic(hgt_files, geoms_bounds(geoms))
+        elevation_data_clipped, out_transform = clip_mosaic(mosaic, mosaic_transform, geoms)
+        del mosaic
+
+        out_meta = {
+            'driver': 'GTiff',
+            'dtype': 'float32',
+            'nodata': np.nan,
+            'width': elevation_data_clipped.shape[1],
+            'height': elevation_data_clipped.shape[0],
+            'count': 1,
+            'crs': 'EPSG:4326',
+            'transform': out_transform
+        }
+
+        # Get elevation statistics
+        valid_data = elevation_data_clipped[~np.isnan(elevation_data_clipped)]
+        if len(valid_data) > 0:
+            min_val = np.min(valid_data)
+            max_val = np.max(valid_data)
+
+            # Apply contrast enhancement
+            enhanced_elevation = enhance_elevation_contrast(elevation_data_clipped)
+
+            # The preview figure uses the overlays' flood risk LUT
+            cmap = ListedColormap(colormap_lut("flood_risk") / 255.0, name="flood_risk")
+
+            # Save enhanced clipped raster as a tiled, overviewed COG
+            write_cog(output_tif, enhanced_elevation.astype('float32'), out_meta)
+
+            # Create visualization
+            plt.figure(figsize=(10, 8))
+            im = plt.imshow(enhanced_elevation, cmap=cmap,
+                           extent=[out_transform[2], out_transform[2] + out_transform[0] * elevation_data_clipped.shape[1],
+                                  out_transform[5] + out_transform[4] * elevation_data_clipped.shape[0], out_transform[5]])
+            plt.colorbar(im, label='Elevation (meters)', shrink=0.8)
+            plt.title('Dhaka Elevation Map - Flood Risk Visualization\n(Red = High Risk, Green = Low Risk)', 
+                     fontsize=12)
+            plt.axis('off')
+            plt.savefig(output_png, dpi=150, bbox_inches='tight', facecolor='white')
+            plt.close()
+
+            print(f"Created {output_tif}")
+            print(f"Created {output_png}")
+
+    except Exception as e:
+        print(f"Error during clipping: {e}")
 
 if __name__ == "__main__":
-    process_dhaka_elevation()
\ No newline at end of file
+    process_dhaka_elevation(sys.argv[1:])
\ No newline at end of file
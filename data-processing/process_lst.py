@@ -6,14 +6,29 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import Normalize
 import geopandas as gpd
 import rasterio
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.features import geometry_mask
 from rasterio.merge import merge
 from rasterio.mask import mask
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
 from shapely.geometry import mapping
 
+from cog_writer import convert_to_cog, write_cog
+from lst_composite import DEFAULT_PERCENTILE, update_composite
+from raster_store import window_for_bounds
+
+# Output rows/columns handled per block in streaming mode
+DEFAULT_BLOCK_SIZE = 512
+
+# Longest side of the PNG preview read back from the streamed output's overviews
+PREVIEW_MAX_SIZE = 2048
 
-def merge_and_clip(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_map.tif', out_png_name='dhaka_LST_map.png'):
-    os.makedirs(output_dir, exist_ok=True)
 
+def load_boundary(geojson_path, raster_crs):
+    """Dhaka boundary (or the whole file if it has no Dhaka feature) as one geometry in raster_crs"""
     # Load GeoJSON boundary and prefer the Dhaka feature if present
     gdf = gpd.read_file(geojson_path)
 
@@ -28,29 +43,49 @@ def merge_and_clip(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_
     else:
         used_gdf = gdf
 
+    # Reproject the used GeoDataFrame (only Dhaka if selected) to raster CRS if needed
+    if used_gdf.crs != raster_crs:
+        try:
+            used_gdf = used_gdf.to_crs(raster_crs)
+        except Exception as e:
+            print(f"Warning: failed to reproject GeoJSON to raster CRS: {e}")
+
     # Combine geometries into a single geometry using union_all()
     try:
-        combined = used_gdf.geometry.union_all()
+        return used_gdf.geometry.union_all()
     except Exception:
         # fallback to unary_union for very old geopandas versions
-        combined = used_gdf.unary_union
-    geom = [mapping(combined)]
+        return used_gdf.unary_union
+
+
+def plot_lst(lst, nodata, out_png):
+    """Save the clipped LST band as an inferno PNG with a 2-98 percentile stretch"""
+    if nodata is not None:
+        lst_masked = np.ma.masked_equal(lst, nodata)
+    else:
+        # Some rasters use extreme negative values, mask nan or very small
+        lst_masked = np.ma.masked_invalid(lst)
+
+    plt.figure(figsize=(10, 8))
+    vmin = np.nanpercentile(lst_masked.compressed(), 2) if lst_masked.count() > 0 else None
+    vmax = np.nanpercentile(lst_masked.compressed(), 98) if lst_masked.count() > 0 else None
+    norm = Normalize(vmin=vmin, vmax=vmax)
+    im = plt.imshow(lst_masked, cmap='inferno', norm=norm)
+    plt.colorbar(im, label='LST')
+    plt.axis('off')
+    plt.title('Clipped Land Surface Temperature - Dhaka')
+    plt.savefig(out_png, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close()
+
+
+def merge_and_clip(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_map.tif', out_png_name='dhaka_LST_map.png'):
+    os.makedirs(output_dir, exist_ok=True)
 
     # Open first tif to get CRS
     with rasterio.open(tif_files[0]) as src0:
         raster_crs = src0.crs
 
-    # Reproject the used GeoDataFrame (only Dhaka if selected) to raster CRS if needed
-    if used_gdf.crs != raster_crs:
-        try:
-            used_gdf = used_gdf.to_crs(raster_crs)
-            try:
-                combined = used_gdf.geometry.union_all()
-            except Exception:
-                combined = used_gdf.unary_union
-            geom = [mapping(combined)]
-        except Exception as e:
-            print(f"Warning: failed to reproject GeoJSON to raster CRS: {e}")
+    geom = [mapping(load_boundary(geojson_path, raster_crs))]
 
     # Open all tifs
     src_files = [rasterio.open(p) for p in tif_files]
@@ -92,31 +127,13 @@ def merge_and_clip(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_
             'count': out_image.shape[0]
         })
 
-        # Write the clipped TIFF to disk
+        # Write the clipped TIFF to disk as a tiled, overviewed COG
         clipped_tif = os.path.join(output_dir, out_tif_name)
-        with rasterio.open(clipped_tif, 'w', **out_meta) as dest:
-            dest.write(out_image)
+        write_cog(clipped_tif, out_image, out_meta)
 
-        # Prepare for plotting: use first band
-        lst = out_image[0]
-        if nodata is not None:
-            lst_masked = np.ma.masked_equal(lst, nodata)
-        else:
-            # Some rasters use extreme negative values, mask nan or very small
-            lst_masked = np.ma.masked_invalid(lst)
-
-        # Plot
-        plt.figure(figsize=(10, 8))
-        vmin = np.nanpercentile(lst_masked.compressed(), 2) if lst_masked.count() > 0 else None
-        vmax = np.nanpercentile(lst_masked.compressed(), 98) if lst_masked.count() > 0 else None
-        norm = Normalize(vmin=vmin, vmax=vmax)
-        im = plt.imshow(lst_masked, cmap='inferno', norm=norm)
-        plt.colorbar(im, label='LST')
-        plt.axis('off')
-        plt.title('Clipped Land Surface Temperature - Dhaka')
+        # Plot the first band
         out_png = os.path.join(output_dir, out_png_name)
-        plt.savefig(out_png, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        plot_lst(out_image[0], nodata, out_png)
 
     # Remove temporary merged tif
     try:
@@ -128,7 +145,136 @@ def merge_and_clip(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_
     return clipped_tif, out_png
 
 
+def clip_grid(tif_files, boundary):
+    """
+    Grid of the boundary's crop window within the mosaic that merge() would
+    build: the first scene's CRS and resolution over the union of all scene
+    bounds. Only file headers are read. Returns (crs, transform, width, height).
+    """
+    with rasterio.open(tif_files[0]) as first:
+        crs = first.crs
+        res_x, res_y = first.res
+
+    lefts, bottoms, rights, tops = [], [], [], []
+    for path in tif_files:
+        with rasterio.open(path) as src:
+            left, bottom, right, top = src.bounds if src.crs == crs else \
+                transform_bounds(src.crs, crs, *src.bounds)
+        lefts.append(left)
+        bottoms.append(bottom)
+        rights.append(right)
+        tops.append(top)
+
+    west, north = min(lefts), max(tops)
+    mosaic_transform = Affine.translation(west, north) * Affine.scale(res_x, -res_y)
+    mosaic_width = int(round((max(rights) - west) / res_x))
+    mosaic_height = int(round((north - min(bottoms)) / res_y))
+
+    window = window_for_bounds(mosaic_transform, mosaic_width, mosaic_height, boundary.bounds)
+    if window is None:
+        raise ValueError('Input shapes do not overlap raster.')
+    return crs, rasterio.windows.transform(window, mosaic_transform), window.width, window.height
+
+
+def merge_and_clip_streaming(tif_files, geojson_path, output_dir, out_tif_name='dhaka_LST_map.tif',
+                             out_png_name='dhaka_LST_map.png', block_size=DEFAULT_BLOCK_SIZE):
+    """
+    merge_and_clip without building the mosaic: the boundary's window is
+    filled block by block, each block reading only the matching part of
+    every scene (first valid scene wins, as in merge()). Scenes in another
+    UTM zone are warped onto the output grid on the fly. Peak memory is a
+    few block_size x block_size arrays regardless of the mosaic extent.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with rasterio.open(tif_files[0]) as src0:
+        raster_crs = src0.crs
+        dtype = src0.dtypes[0]
+        nodata = src0.nodata
+
+    boundary = load_boundary(geojson_path, raster_crs)
+    crs, transform, width, height = clip_grid(tif_files, boundary)
+    fill = nodata if nodata is not None else (np.nan if np.issubdtype(np.dtype(dtype), np.floating) else 0)
+    print(f"Streaming {len(tif_files)} scenes into a {width}x{height} clip in {block_size}px blocks")
+
+    # Every scene viewed through a VRT on the output grid, so output windows apply directly.
+    # A scene without nodata gets an alpha band: the VRT fills pixels outside it with 0,
+    # which would otherwise pass for data and hide the scenes behind it
+    sources = [rasterio.open(p) for p in tif_files]
+    vrts = [WarpedVRT(src, crs=crs, transform=transform, width=width, height=height,
+                      resampling=Resampling.nearest, add_alpha=src.nodata is None) for src in sources]
+
+    clipped_tif = os.path.join(output_dir, out_tif_name)
+    blocks_tif = clipped_tif + '.blocks.tif'
+    profile = {
+        'driver': 'GTiff', 'dtype': dtype, 'nodata': nodata, 'count': 1,
+        'width': width, 'height': height, 'crs': crs, 'transform': transform,
+        'tiled': True, 'blockxsize': 256, 'blockysize': 256,
+        'compress': 'deflate', 'bigtiff': 'if_safer'
+    }
+    try:
+        with rasterio.open(blocks_tif, 'w', **profile) as dst:
+            for row_off in range(0, height, block_size):
+                for col_off in range(0, width, block_size):
+                    window = Window(col_off, row_off, min(block_size, width - col_off),
+                                    min(block_size, height - row_off))
+                    block = np.full((window.height, window.width), fill, dtype=dtype)
+                    empty = np.ones(block.shape, dtype=bool)
+
+                    for src, vrt in zip(sources, vrts):
+                        data = vrt.read(1, window=window)
+                        valid = ~np.isnan(data) if np.issubdtype(data.dtype, np.floating) else \
+                            np.ones(data.shape, dtype=bool)
+                        if src.nodata is None:
+                            valid &= vrt.read(vrt.count, window=window) > 0
+                        elif not np.isnan(vrt.nodata):
+                            valid &= data != vrt.nodata
+                        take = empty & valid
+                        block[take] = data[take]
+                        empty &= ~take
+                        if not empty.any():
+                            break
+
+                    outside = geometry_mask([boundary], out_shape=block.shape,
+                                            transform=rasterio.windows.transform(window, transform))
+                    block[outside] = fill
+                    dst.write(block, 1, window=window)
+
+        convert_to_cog(blocks_tif, clipped_tif)
+    finally:
+        for vrt in vrts:
+            vrt.close()
+        for src in sources:
+            src.close()
+        if os.path.exists(blocks_tif):
+            os.remove(blocks_tif)
+
+    # Preview from the COG overviews, so plotting is bounded too
+    with rasterio.open(clipped_tif) as src:
+        scale = max(src.width, src.height) / PREVIEW_MAX_SIZE
+        out_shape = None if scale <= 1 else (int(src.height / scale), int(src.width / scale))
+        preview = src.read(1, out_shape=out_shape, resampling=Resampling.nearest)
+
+    out_png = os.path.join(output_dir, out_png_name)
+    plot_lst(preview, nodata, out_png)
+    return clipped_tif, out_png
+
+
 def main(argv):
+    # --stream and --block-size=N select the block-wise mosaic, --composite[=P] the
+    # multi-temporal composite (lst_composite.py); positional arguments as before
+    stream = '--stream' in argv
+    composite = None
+    for arg in argv:
+        if arg == '--composite' or arg.startswith('--composite='):
+            composite = float(arg.split('=', 1)[1]) if '=' in arg else DEFAULT_PERCENTILE
+    block_size = DEFAULT_BLOCK_SIZE
+    for arg in argv:
+        if arg.startswith('--block-size='):
+            block_size = int(arg.split('=', 1)[1])
+            stream = True
+    argv = [a for a in argv if not a.startswith('--')]
+
     # Defaults based on workspace content
     raw_dir = 'data-processing/raw/LST'
     tif_basenames = [
@@ -172,7 +318,17 @@ def main(argv):
         print('Please run from workspace root or provide full paths. If TIFFs are in the raw folder, ensure they exist there.')
         return 2
 
-    clipped_tif, out_png = merge_and_clip(tif_files, geojson, output_dir)
+    if composite is not None:
+        out_tif = update_composite(tif_files, geojson, percentile=composite,
+                                   state_dir=os.path.join(output_dir, 'lst_composite'),
+                                   output_path=os.path.join(output_dir, 'dhaka_LST_composite.tif'))
+        print('Saved composite TIFF:', out_tif)
+        return 0
+
+    if stream:
+        clipped_tif, out_png = merge_and_clip_streaming(tif_files, geojson, output_dir, block_size=block_size)
+    else:
+        clipped_tif, out_png = merge_and_clip(tif_files, geojson, output_dir)
     if clipped_tif:
         print('Saved clipped TIFF:', clipped_tif)
     else:
@@ -0,0 +1,267 @@
+"""
+Raster Store
+Loads the analysis rasters once and clips polygons against them in memory,
+so repeated AOI requests never go back to the GeoTIFFs on disk.
+
+Four backends are available:
+  memory - band 1 is read into a resident NumPy array
+  memmap - band 1 is copied once into an .npy cache file and memory-mapped,
+           for rasters too large to keep resident
+  window - the dataset stays open and only the window under each AOI is
+           read; with Cloud-Optimized GeoTIFFs (see cog_writer.py) that is
+           just the intersecting tiles, and downsampled reads come from
+           the internal overviews
+  auto   - memory for rasters up to resident_max_bytes, window beyond that,
+           so country-wide mosaics are never read whole
+"""
+
+import os
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.features import geometry_mask
+from rasterio.windows import Window
+
+from instrumentation import count, timer
+
+# Fill value of rasters without a nodata value, by file name; pixels holding it
+# are not data. The land cover raster marks everything outside the classified
+# area with 63. Shared by the analysis (valid_mask) and the overlay renderers.
+BACKGROUND_VALUES: Dict[str, float] = {
+    "dhaka_green_space.tif": 63,
+}
+
+
+def background_value(path: str) -> Optional[float]:
+    """Background (fill) value of the raster at path, if it has one"""
+    return BACKGROUND_VALUES.get(os.path.basename(path))
+
+
+def window_for_bounds(transform, width: int, height: int, bounds) -> Optional[Window]:
+    """Pixel window of a width x height grid covering bounds, or None if they miss it"""
+    minx, miny, maxx, maxy = bounds
+    inverse = ~transform
+    cols, rows = zip(*(inverse * (x, y) for x in (minx, maxx) for y in (miny, maxy)))
+
+    col_off = max(int(math.floor(min(cols))), 0)
+    row_off = max(int(math.floor(min(rows))), 0)
+    col_end = min(int(math.ceil(max(cols))), width)
+    row_end = min(int(math.ceil(max(rows))), height)
+    if col_end <= col_off or row_end <= row_off:
+        return None
+    return Window(col_off, row_off, col_end - col_off, row_end - row_off)
+
+
+class RasterLayer:
+    """A single-band raster held as an array plus its georeferencing"""
+
+    def __init__(self, path: str, data: np.ndarray, transform, crs, nodata, backend: str,
+                 background: Optional[float] = None):
+        self.path = path
+        self.data = data
+        self.transform = transform
+        self.crs = crs
+        self.nodata = nodata
+        self.backend = backend
+        self.background = background
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(left, bottom, right, top) in the raster CRS"""
+        left, top = self.transform * (0, 0)
+        right, bottom = self.transform * (self.width, self.height)
+        return (min(left, right), min(bottom, top), max(left, right), max(bottom, top))
+
+    def window_for_bounds(self, bounds) -> Optional[Window]:
+        """Pixel window covering bounds (minx, miny, maxx, maxy), clamped to the raster"""
+        return window_for_bounds(self.transform, self.width, self.height, bounds)
+
+    def overview_shape(self, window: Window, max_pixels: int) -> Tuple[Tuple[int, int], int]:
+        """
+        Read shape of window at the smallest power-of-two decimation that
+        keeps it within max_pixels, and that decimation factor.
+        """
+        factor = 1
+        while math.ceil(window.height / factor) * math.ceil(window.width / factor) > max_pixels:
+            factor *= 2
+        return (math.ceil(window.height / factor), math.ceil(window.width / factor)), factor
+
+    def window_transform(self, window: Window, out_shape: Optional[Tuple[int, int]] = None):
+        """Transform of window, rescaled when it is read at out_shape"""
+        transform = rasterio.windows.transform(window, self.transform)
+        if out_shape is None:
+            return transform
+        return transform * Affine.scale(window.width / out_shape[1], window.height / out_shape[0])
+
+    def read(self, window: Window, out_shape: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Band 1 values inside window. With out_shape, the window is sampled
+        nearest-neighbour down to that shape (as GDAL does for overviews).
+        """
+        with timer("raster_read"):
+            if out_shape is None or out_shape == (window.height, window.width):
+                rows = slice(window.row_off, window.row_off + window.height)
+                cols = slice(window.col_off, window.col_off + window.width)
+                block = self.data[rows, cols]
+            else:
+                rows = window.row_off + ((np.arange(out_shape[0]) + 0.5) * window.height / out_shape[0]).astype(int)
+                cols = window.col_off + ((np.arange(out_shape[1]) + 0.5) * window.width / out_shape[1]).astype(int)
+                block = self.data[np.ix_(rows, cols)]
+        count("raster_bytes_read", block.nbytes)
+        return block
+
+    def valid_mask(self, block: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        True where a pixel holds data (not nodata, not the background value,
+        not NaN); narrows mask in place if given
+        """
+        valid = np.ones(block.shape, dtype=bool) if mask is None else mask
+        if self.nodata is not None and not (isinstance(self.nodata, float) and math.isnan(self.nodata)):
+            valid &= block != self.nodata
+        if self.background is not None:
+            valid &= block != self.background
+        if np.issubdtype(block.dtype, np.floating):
+            valid &= ~np.isnan(block)
+        return valid
+
+    def clip(self, geom) -> Optional[Tuple[np.ndarray, np.ndarray, Window]]:
+        """
+        Clip the layer to a geometry given in the raster CRS.
+
+        Returns (block, inside, window): the raster values inside the
+        geometry's bounding window, a boolean mask of pixels whose centres
+        fall inside the geometry and hold data, and the window itself.
+        Returns None when the geometry misses the raster.
+        """
+        window = self.window_for_bounds(geom.bounds)
+        if window is None:
+            return None
+
+        block = self.read(window)
+        inside = geometry_mask(
+            [geom],
+            out_shape=block.shape,
+            transform=self.window_transform(window),
+            invert=True
+        )
+        return block, self.valid_mask(block, inside), window
+
+
+class WindowedRasterLayer(RasterLayer):
+    """A layer read from its open dataset one window at a time"""
+
+    def __init__(self, path: str, dataset, background: Optional[float] = None):
+        super().__init__(path, None, dataset.transform, dataset.crs, dataset.nodata, "window", background)
+        self.dataset = dataset
+
+    @property
+    def height(self) -> int:
+        return self.dataset.height
+
+    @property
+    def width(self) -> int:
+        return self.dataset.width
+
+    def read(self, window: Window, out_shape: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        # GDAL serves a reduced out_shape from the closest internal overview
+        with timer("raster_read"):
+            block = self.dataset.read(1, window=window, out_shape=out_shape, resampling=Resampling.nearest)
+        count("raster_bytes_read", block.nbytes)
+        return block
+
+    def close(self):
+        self.dataset.close()
+
+
+class RasterStore:
+    """Cache of RasterLayer objects keyed by file path"""
+
+    BACKENDS = ("memory", "memmap", "window", "auto")
+
+    def __init__(self, backend: str = "memory", cache_dir: Optional[str] = None,
+                 resident_max_bytes: int = 512 * 1024 * 1024):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown raster backend: {backend}")
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.resident_max_bytes = resident_max_bytes
+        self._layers: Dict[str, RasterLayer] = {}
+
+    @property
+    def paths(self):
+        return sorted(self._layers)
+
+    @property
+    def layer_backends(self) -> Dict[str, str]:
+        """Backend actually used for each loaded path (resolves "auto")"""
+        return {path: layer.backend for path, layer in sorted(self._layers.items())}
+
+    def get(self, path: str) -> RasterLayer:
+        """Return the layer for path, loading it on first use"""
+        layer = self._layers.get(path)
+        if layer is None:
+            with timer("raster_open"):
+                layer = self.load(path)
+            count("rasters_opened")
+            self._layers[path] = layer
+        return layer
+
+    def load(self, path: str) -> RasterLayer:
+        src = rasterio.open(path)
+        backend = self.backend
+        if backend == "auto":
+            size = src.width * src.height * np.dtype(src.dtypes[0]).itemsize
+            backend = "memory" if size <= self.resident_max_bytes else "window"
+        if backend == "window":
+            return WindowedRasterLayer(path, src, background_value(path))
+
+        with src:
+            if backend == "memmap":
+                data = self._memmap_band(src, path)
+            else:
+                data = src.read(1)
+            return RasterLayer(path, data, src.transform, src.crs, src.nodata, backend, background_value(path))
+
+    def _memmap_band(self, src, path: str) -> np.ndarray:
+        """Copy band 1 into an .npy file block by block (once per source version) and map it"""
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), ".raster_cache")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        stat = os.stat(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cache_file = os.path.join(cache_dir, f"{name}.{stat.st_size}.{stat.st_mtime_ns}.npy")
+
+        if not os.path.exists(cache_file):
+            tmp_file = cache_file + ".tmp"
+            out = np.lib.format.open_memmap(tmp_file, mode="w+", dtype=src.dtypes[0],
+                                            shape=(src.height, src.width))
+            for _, window in src.block_windows(1):
+                out[window.row_off:window.row_off + window.height,
+                    window.col_off:window.col_off + window.width] = src.read(1, window=window)
+            out.flush()
+            del out
+            os.replace(tmp_file, cache_file)
+
+        return np.load(cache_file, mmap_mode="r")
+
+    def evict(self, path: str):
+        layer = self._layers.pop(path, None)
+        if isinstance(layer, WindowedRasterLayer):
+            layer.close()
+
+    def close(self):
+        """Drop every loaded layer (unmaps memmapped arrays once unreferenced, closes open datasets)"""
+        for path in list(self._layers):
+            self.evict(path)
@@ -0,0 +1,81 @@
+"""
+Reprojection
+Process-wide registry of pyproj transformers and vectorized geometry
+reprojection.
+
+Coordinates go through the transformer as whole arrays (shapely.transform
+hands over every vertex of every geometry in one call) instead of one
+Python callback per ring, and a Reprojector memoizes each geometry's
+projection so a polygon is reprojected at most once per target CRS.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pyproj
+import shapely
+
+from instrumentation import count, timer
+WGS84 = "EPSG:4326"
+
+
+@lru_cache(maxsize=None)
+def get_transformer(src_crs: str, dst_crs: str) -> pyproj.Transformer:
+    """Cached always_xy transformer for a (src, dst) CRS pair"""
+    return pyproj.Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+def transform_coords(transformer: pyproj.Transformer):
+    """shapely.transform callback pushing an (N, 2) coordinate array through transformer"""
+    def apply(coords: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack((x, y))
+    return apply
+
+
+def reproject_geometries(geoms, dst_crs: str, src_crs: str = WGS84) -> np.ndarray:
+    """Reproject a sequence of geometries with a single transformer call"""
+    geoms = np.asarray(geoms, dtype=object)
+    if str(dst_crs) == str(src_crs):
+        return geoms
+    with timer("reproject"):
+        projected = shapely.transform(geoms, transform_coords(get_transformer(src_crs, str(dst_crs))))
+    count("vertices_reprojected", int(shapely.get_num_coordinates(geoms).sum()))
+    return projected
+
+
+def reproject_geometry(geom, dst_crs: str, src_crs: str = WGS84):
+    """Reproject one geometry"""
+    return reproject_geometries([geom], dst_crs, src_crs)[0]
+
+
+class Reprojector:
+    """
+    Reprojects geometries out of src_crs, remembering each result.
+
+    Create one per request: projections are keyed on the geometry object,
+    so a polygon is transformed once per target CRS however many layers,
+    grids or geometry metrics ask for it.
+    """
+
+    def __init__(self, src_crs: str = WGS84):
+        self.src_crs = src_crs
+        self._memo: Dict[Tuple[int, str], object] = {}
+        # Keeps memoized geometries alive so their ids cannot be reused
+        self._sources: Dict[int, object] = {}
+
+    def __call__(self, geom, dst_crs: str):
+        return self.project_many([geom], dst_crs)[0]
+
+    def project_many(self, geoms, dst_crs: str) -> List:
+        dst_crs = str(dst_crs)
+        if dst_crs == self.src_crs:
+            return list(geoms)
+
+        missing = [g for g in geoms if (id(g), dst_crs) not in self._memo]
+        if missing:
+            for geom, projected in zip(missing, reproject_geometries(missing, dst_crs, self.src_crs)):
+                self._memo[(id(geom), dst_crs)] = projected
+                self._sources[id(geom)] = geom
+        return [self._memo[(id(g), dst_crs)] for g in geoms]
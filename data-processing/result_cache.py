@@ -0,0 +1,169 @@
+"""
+Result Cache
+Content-addressed cache of per-polygon analyses.
+
+Keys combine a normalized geometry hash (so vertex order, ring orientation
+and coordinate noise do not matter) with the size and mtime of every
+source raster, so a raster update invalidates old entries by itself.
+
+Two tiers:
+  memory - in-process LRU bounded by entry count
+  disk   - optional SQLite file shared across processes, bounded by total
+           payload size and evicted least-recently-used first
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fingerprints import geometry_hash
+
+CACHE_FORMAT = 2
+
+
+def raster_signature(paths: Dict[str, str]) -> Dict[str, Optional[list]]:
+    """(size, mtime_ns) of every raster; None for missing files"""
+    signature = {}
+    for name, path in sorted(paths.items()):
+        try:
+            stat = os.stat(path)
+            signature[name] = [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            signature[name] = None
+    return signature
+
+
+def cache_key(geom, raster_paths: Dict[str, str], settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Cache key of one polygon analysis against the given rasters and
+    settings; None if the geometry cannot be hashed (skip the cache)
+    """
+    geom_hash = geometry_hash(geom)
+    if geom_hash is None:
+        return None
+    payload = json.dumps({
+        "format": CACHE_FORMAT,
+        "geometry": geom_hash,
+        "rasters": raster_signature(raster_paths),
+        "settings": settings or {}
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier LRU cache of JSON-serializable results"""
+
+    def __init__(self, max_entries: int = 256, db_path: Optional[str] = None,
+                 db_max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.db_max_bytes = db_max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=10)
+        # WAL lets several worker processes read while one writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key (a fresh copy), or None"""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return json.loads(value)
+
+        if self._db is not None:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+                self.counters["disk_hits"] += 1
+                self._remember(key, row[0])
+                return json.loads(row[0])
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, value: Any):
+        encoded = json.dumps(value)
+        self.counters["stores"] += 1
+        self._remember(key, encoded)
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, len(encoded), time.time())
+            )
+            self._db.commit()
+            self._evict_disk()
+
+    def _remember(self, key: str, encoded: str):
+        self._memory[key] = encoded
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.db_max_bytes:
+            return
+
+        excess = total - self.db_max_bytes
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed_at"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM results WHERE key = ?", doomed)
+        self._db.commit()
+        self.counters["disk_evictions"] += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        stats = dict(self.counters)
+        stats["memory_entries"] = len(self._memory)
+        stats["hit_rate"] = round((lookups - self.counters["misses"]) / lookups, 4) if lookups else None
+        if self._db is not None:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            stats["disk_entries"] = count
+            stats["disk_bytes"] = size
+        return stats
+
+    def clear(self):
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The data-processing scripts import each other as top-level modules
+DATA_PROCESSING = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATA_PROCESSING)
+sys.path.insert(0, os.path.join(DATA_PROCESSING, "benchmarks"))
+# The AQI scripts live with the client they generate data for
+sys.path.insert(0, os.path.join(DATA_PROCESSING, "..", "client", "src", "DataProcessing"))
@@ -0,0 +1,25 @@
+"""Vectorized PM2.5 AQI against the scalar US EPA formula"""
+
+import numpy as np
+
+from CSVDATA_to_JSON import (calculate_aqi_from_pm25, calculate_aqi_from_pm25_array,
+                             get_air_quality_level, get_air_quality_levels)
+
+
+def test_pm25_array_matches_scalar():
+    # Every 0.01 µg/m³ up to past the top band, so the gaps between bands
+    # (12.0-12.1, 35.4-35.5, ...) and the 500 cap are covered
+    values = np.round(np.arange(0.0, 600.0, 0.01), 2)
+    expected = [calculate_aqi_from_pm25(v) for v in values]
+    assert calculate_aqi_from_pm25_array(values).tolist() == expected
+
+
+def test_pm25_array_keeps_nan():
+    aqi = calculate_aqi_from_pm25_array([np.nan, 12.0])
+    assert np.isnan(aqi[0])
+    assert aqi[1] == 50
+
+
+def test_levels_match_scalar():
+    aqi = np.arange(0, 501)
+    assert get_air_quality_levels(aqi).tolist() == [get_air_quality_level(a) for a in aqi]
@@ -0,0 +1,46 @@
+"""Breakpoint edges of the multi-pollutant AQI engine"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aqi_engine import POLLUTANTS, compute_aqi, sub_index
+
+
+@pytest.mark.parametrize("name", list(POLLUTANTS))
+def test_band_edges(name):
+    segments = POLLUTANTS[name]["segments"]
+    # Both ends of every band map to its AQI range
+    assert sub_index(segments[:, 0], segments).tolist() == segments[:, 2].tolist()
+    assert sub_index(segments[:, 1], segments).tolist() == segments[:, 3].tolist()
+    # Gap values between two bands fall on the upper band's line, below its
+    # floor, as calculate_aqi_from_pm25 treats 12.0-12.1
+    gap = sub_index(segments[:-1, 1] + 1e-9, segments)
+    assert (gap < segments[1:, 2]).all() and (gap >= segments[:-1, 2]).all()
+    # Beyond the table, capped at 500
+    assert sub_index([segments[-1, 1] * 3], segments).tolist() == [500]
+
+
+def test_sub_index_keeps_nan():
+    assert np.isnan(sub_index([np.nan], POLLUTANTS["pm10"]["segments"])).all()
+
+
+def test_overall_aqi_and_dominant_pollutant():
+    df = pd.DataFrame({
+        # µg/m³ as in the district files; o3 95 µg/m³ is 48.4 ppb (AQI 44)
+        "pm2_5": [35.4, 5.0, np.nan],
+        "pm10": [160.0, np.nan, np.nan],
+        "o3": [95.0, 95.0, np.nan],
+    })
+    result = compute_aqi(df)
+    assert result["aqi_pm2_5"].tolist()[:2] == [100, 20]
+    assert result["aqi_pm10"][0] == 102
+    assert result["aqi_o3"][1] == 44
+    assert np.isnan(result["aqi_no2"]).all()
+
+    assert result["aqi_us"].tolist()[:2] == [102, 44]
+    assert np.isnan(result["aqi_us"][2])
+    assert result["dominant_pollutant"].tolist()[:2] == ["pm10", "o3"]
+    assert pd.isna(result["dominant_pollutant"][2])
+    assert result["aqi_level"].tolist()[:2] == ["Unhealthy for Sensitive Groups", "Good"]
+    assert pd.isna(result["aqi_level"][2])
@@ -0,0 +1,59 @@
+"""Invalid (self-intersecting) AOIs are analyzed with the result cache enabled"""
+
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+import current_situation as cs
+from fingerprints import geometry_hash
+from synthetic import write_raster
+
+# Bow-tie: the ring crosses itself, so set_precision raises TopologyException
+BOW_TIE = {"type": "Polygon", "coordinates": [[[90.40, 23.75], [90.42, 23.77], [90.42, 23.75],
+                                               [90.40, 23.77], [90.40, 23.75]]]}
+
+
+@pytest.fixture
+def analysis_env(tmp_path, monkeypatch):
+    layers = {
+        "elevation": write_raster(str(tmp_path / "elevation.tif"), 200, 240, "elevation", seed=1),
+        "vegetation": write_raster(str(tmp_path / "green.tif"), 200, 240, "ndvi", seed=2),
+        "temperature": write_raster(str(tmp_path / "lst.tif"), 200, 240, "lst", seed=3),
+    }
+    monkeypatch.setattr(cs, "RASTER_LAYERS", layers)
+    monkeypatch.setattr(cs, "THANA_INDEX_FILE", None)
+    cs.configure_result_cache()
+    yield
+    cs.configure_result_cache()
+
+
+def test_geometry_hash_never_raises():
+    bow_tie = shapely.geometry.shape(BOW_TIE)
+    assert not bow_tie.is_valid
+    assert geometry_hash(bow_tie) is not None
+    assert geometry_hash(Polygon([(1, 1), (0, 1), (0, 0), (1, 0)])) == geometry_hash(box(0, 0, 1, 1))
+
+
+def test_analyze_invalid_polygon_with_cache(analysis_env):
+    first = cs.analyze_polygon({"geometry": BOW_TIE})
+    assert "error" not in first
+    assert first["temperature"].get("error") is None
+    # The second submission is answered from the cache
+    assert cs.analyze_polygon({"geometry": BOW_TIE}) == first
+
+
+def test_unhashable_geometry_skips_cache(analysis_env, monkeypatch):
+    key = cs.analysis_cache_key(shapely.geometry.shape(BOW_TIE))
+    monkeypatch.setattr(cs, "cache_key", lambda *args, **kwargs: None)
+    analysis = cs.analyze_polygon({"geometry": BOW_TIE})
+    assert "error" not in analysis
+    assert cs.RESULT_CACHE.get(key) is None
+    assert cs.RESULT_CACHE.stats()["stores"] == 0
+
+
+def test_batch_with_invalid_polygon(analysis_env):
+    squares = [box(90.40 + i / 100, 23.80, 90.405 + i / 100, 23.805) for i in range(cs.BATCH_MIN_POLYGONS)]
+    polygons = [{"geometry": BOW_TIE}] + [{"geometry": shapely.geometry.mapping(g)} for g in squares]
+    results = cs.analyze_polygons(polygons, batch=True)["analysis_results"]
+    assert len(results) == len(polygons)
+    assert all("error" not in r for r in results)
@@ -0,0 +1,59 @@
+"""Format detection and incremental reading of polygon inputs"""
+
+import io
+import json
+
+import pytest
+
+import json_stream
+from json_stream import iter_polygons
+
+FEATURES = [{"type": "Feature", "properties": {"i": i},
+             "geometry": {"type": "Polygon", "coordinates": [[[i, 0], [i + 1, 0], [i, 1], [i, 0]]]}}
+            for i in range(2000)]
+
+
+class CountingReader(io.StringIO):
+    """StringIO that records how many characters have been read"""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+@pytest.mark.parametrize("text", [
+    "\n".join(json.dumps(f) for f in FEATURES[:3]) + "\n",
+    json.dumps(FEATURES[:3]),
+    json.dumps({"type": "FeatureCollection", "features": FEATURES[:3]}),
+    json.dumps({"type": "FeatureCollection", "features": FEATURES[:3]}, indent=2),
+    json.dumps({"type": "FeatureCollection", "features": FEATURES[:3]}) + "\n",
+])
+def test_formats(text):
+    assert list(iter_polygons(io.StringIO(text))) == FEATURES[:3]
+
+
+def test_ndjson_of_feature_collections():
+    line = json.dumps({"type": "FeatureCollection", "features": FEATURES[:2]})
+    assert list(iter_polygons(io.StringIO(line + "\n" + line + "\n"))) == FEATURES[:2] * 2
+
+
+def test_compact_feature_collection_is_streamed(monkeypatch):
+    monkeypatch.setattr(json_stream, "DETECT_SIZE", 4096)
+    text = json.dumps({"type": "FeatureCollection", "features": FEATURES})
+    infile = CountingReader(text)
+    polygons = iter_polygons(infile)
+    assert next(polygons) == FEATURES[0]
+    # Detection and the first feature needed only a bounded prefix
+    assert infile.consumed < len(text) // 4
+    assert list(polygons) == FEATURES[1:]
+
+
+def test_long_ndjson_line(monkeypatch):
+    monkeypatch.setattr(json_stream, "DETECT_SIZE", 64)
+    text = "\n".join(json.dumps(f) for f in FEATURES[:3])
+    assert list(iter_polygons(io.StringIO(text))) == FEATURES[:3]
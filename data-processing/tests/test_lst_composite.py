@@ -0,0 +1,62 @@
+"""Incremental LST composite: validity of nodata-less scenes and crash safety"""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from lst_composite import LSTComposite
+from synthetic import write_lst_scene
+
+RES = 0.001
+GRID = {"crs": "EPSG:4326", "transform": from_origin(90.30, 23.90, RES, RES), "width": 200, "height": 100}
+
+
+@pytest.fixture
+def scenes(tmp_path):
+    return [
+        write_lst_scene(str(tmp_path / "west.tif"), (90.30, 23.80, 90.42, 23.90), RES, seed=1),
+        write_lst_scene(str(tmp_path / "east.tif"), (90.38, 23.80, 90.50, 23.90), RES, seed=2),
+    ]
+
+
+def composite_bands(composite, tmp_path):
+    output = composite.write(str(tmp_path / "composite.tif"))
+    with rasterio.open(output) as src:
+        return {description: src.read(band) for band, description in enumerate(src.descriptions, start=1)}
+
+
+def test_scene_without_nodata_counts_only_its_footprint(tmp_path, scenes):
+    composite = LSTComposite.create(str(tmp_path / "state"), **GRID)
+    for path in scenes:
+        assert composite.add_scene(path, chunk_rows=32)
+
+    bands = composite_bands(composite, tmp_path)
+    # Columns 0-79 west only, 80-119 both scenes, 120-199 east only
+    assert np.all(bands["count"][:, :80] == 1)
+    assert np.all(bands["count"][:, 80:120] == 2)
+    assert np.all(bands["count"][:, 120:] == 1)
+    assert np.nanmin(bands["mean"]) > 250
+
+
+def test_interrupted_add_does_not_double_count(tmp_path, scenes, monkeypatch):
+    state_dir = str(tmp_path / "state")
+    LSTComposite.create(state_dir, **GRID).add_scene(scenes[0])
+
+    # Crash after the new aggregates are written but before the state records the scene
+    def crash(self):
+        raise RuntimeError("interrupted")
+
+    with monkeypatch.context() as m:
+        m.setattr(LSTComposite, "_save_state", crash)
+        with pytest.raises(RuntimeError):
+            LSTComposite(state_dir).add_scene(scenes[1])
+
+    composite = LSTComposite(state_dir)
+    assert len(composite.scenes) == 1
+    assert composite.add_scene(scenes[1])
+    assert not composite.add_scene(scenes[1])
+
+    bands = composite_bands(composite, tmp_path)
+    assert bands["count"].max() == 2
+    assert np.all(bands["count"][:, 80:120] == 2)
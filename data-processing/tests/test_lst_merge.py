@@ -0,0 +1,43 @@
+"""Streaming LST mosaic against the in-memory merge_and_clip"""
+
+import json
+
+import numpy as np
+import rasterio
+from rasterio.features import geometry_mask
+
+from process_lst import merge_and_clip, merge_and_clip_streaming
+from synthetic import write_lst_scene
+
+
+def write_boundary(path, ring):
+    feature = {"type": "Feature", "properties": {"shapeName": "Dhaka"},
+               "geometry": {"type": "Polygon", "coordinates": [ring]}}
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": [feature]}, f)
+    return str(path)
+
+
+def test_streaming_matches_merge_without_nodata(tmp_path):
+    # Two overlapping scenes without nodata; the first does not cover the east part
+    scenes = [
+        write_lst_scene(str(tmp_path / "west.tif"), (90.30, 23.80, 90.42, 23.90), 0.001, seed=1),
+        write_lst_scene(str(tmp_path / "east.tif"), (90.38, 23.80, 90.50, 23.90), 0.001, seed=2),
+    ]
+    ring = [[90.31, 23.81], [90.49, 23.82], [90.48, 23.89], [90.33, 23.88], [90.31, 23.81]]
+    boundary = write_boundary(tmp_path / "boundary.geojson", ring)
+
+    reference_tif, _ = merge_and_clip(scenes, boundary, str(tmp_path / "merge"))
+    streamed_tif, _ = merge_and_clip_streaming(scenes, boundary, str(tmp_path / "stream"), block_size=64)
+
+    with rasterio.open(reference_tif) as ref, rasterio.open(streamed_tif) as out:
+        assert (out.width, out.height) == (ref.width, ref.height)
+        assert out.transform.almost_equals(ref.transform)
+        inside = ~geometry_mask([{"type": "Polygon", "coordinates": [ring]}],
+                                out_shape=(ref.height, ref.width), transform=ref.transform)
+        expected = ref.read(1)[inside]
+        streamed = out.read(1)[inside]
+
+    # Every pixel inside the boundary holds a scene value, none the VRT's 0 fill
+    assert np.all(expected > 250)
+    np.testing.assert_array_equal(streamed, expected)
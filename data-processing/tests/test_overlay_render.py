@@ -0,0 +1,67 @@
+"""LUT colours and the PNG encoder of overlay_render"""
+
+import io
+
+import matplotlib
+import numpy as np
+import pytest
+from matplotlib.colors import LinearSegmentedColormap
+from PIL import Image
+
+from overlay_render import (FLOOD_RISK_COLORS, LAND_COVER_COLORS, YLGN_COLORS, class_lut, colorize,
+                            colorize_classes, colormap_lut, encode_png, write_png_bands)
+
+
+def random_rgba(height, width, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("name, cmap", [
+    ("flood_risk", LinearSegmentedColormap.from_list("flood_risk", FLOOD_RISK_COLORS, N=256)),
+    ("YlGn", LinearSegmentedColormap.from_list("YlGn", YLGN_COLORS, N=256)),
+    ("inferno", matplotlib.colormaps["inferno"]),
+])
+def test_luts_match_matplotlib(name, cmap):
+    assert np.array_equal(colormap_lut(name), cmap(np.arange(256), bytes=True))
+
+
+def test_colorize_indexes_like_matplotlib():
+    lut = colormap_lut("flood_risk")
+    cmap = LinearSegmentedColormap.from_list("flood_risk", FLOOD_RISK_COLORS, N=256)
+    values = np.linspace(-5.0, 15.0, 2001)
+    valid = np.ones(values.shape, dtype=bool)
+    valid[::7] = False
+
+    rgba = colorize(values, valid, lut, 0.0, 10.0)
+    expected = cmap(np.clip(values, 0.0, 10.0) / 10.0, bytes=True)
+    assert np.array_equal(rgba[valid, :3], expected[valid, :3])
+    assert (rgba[valid, 3] == 191).all()
+    assert not rgba[~valid].any()
+
+
+def test_colorize_classes():
+    values = np.array([[0, 1, 2, 63]], dtype=np.uint8)
+    valid = np.array([[True, True, False, True]])
+    rgba = colorize_classes(values, valid, class_lut(LAND_COVER_COLORS), alpha=200)
+    assert rgba[0, 0].tolist() == [0x87, 0xCE, 0xEB, 200]
+    assert rgba[0, 1].tolist() == [0xDC, 0x14, 0x3C, 200]
+    # Invalid pixels and values without a class are transparent
+    assert not rgba[0, 2:].any()
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (37, 53), (256, 17)])
+def test_png_round_trip(shape):
+    rgba = random_rgba(*shape)
+    image = Image.open(io.BytesIO(encode_png(rgba)))
+    assert image.mode == "RGBA"
+    assert np.array_equal(np.asarray(image), rgba)
+
+
+def test_png_bands_round_trip(tmp_path):
+    rgba = random_rgba(100, 31, seed=1)
+    path = str(tmp_path / "bands.png")
+    write_png_bands(path, 31, 100, (rgba[i:i + 16] for i in range(0, 100, 16)))
+    assert np.array_equal(np.asarray(Image.open(path)), rgba)
+
+    with pytest.raises(ValueError):
+        write_png_bands(path, 31, 100, iter([rgba[:50]]))
@@ -0,0 +1,47 @@
+"""Validity of raster pixels as the analysis sees them"""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from raster_store import RasterStore, background_value
+from reprojection import Reprojector
+from zonal_stats import batch_polygon_stats, polygon_stats
+
+
+def write_land_cover(path):
+    """uint8 classes 0/1/2 without nodata; the right half is background fill (63)"""
+    data = np.tile(np.array([0, 1, 2, 1], dtype=np.uint8), (20, 5))
+    data[:, 10:] = 63
+    profile = {"driver": "GTiff", "dtype": "uint8", "nodata": None, "width": 20, "height": 20,
+               "count": 1, "crs": "EPSG:4326", "transform": from_origin(90.0, 24.0, 0.01, 0.01)}
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return str(path)
+
+
+def test_background_value_is_not_data(tmp_path):
+    path = write_land_cover(tmp_path / "dhaka_green_space.tif")
+    assert background_value(path) == 63
+    layer = RasterStore().get(path)
+    block = layer.read(layer.window_for_bounds(layer.bounds))
+    assert layer.valid_mask(block).sum() == 200
+
+    # The AOI spans both halves; only the classified half counts
+    aoi = box(90.0, 23.8, 90.2, 24.0)
+    stats = polygon_stats(aoi, {"vegetation": layer}, Reprojector())["vegetation"]
+    assert stats["valid_pixels"] == 200
+    assert stats["max"] == 2
+    assert stats["mean"] == pytest.approx(0.9)
+    assert batch_polygon_stats([aoi], {"vegetation": layer}, Reprojector())[0]["vegetation"] == stats
+
+
+def test_other_rasters_keep_every_value(tmp_path):
+    path = write_land_cover(tmp_path / "classes.tif")
+    assert background_value(path) is None
+    layer = RasterStore().get(path)
+    stats = polygon_stats(box(90.0, 23.8, 90.2, 24.0), {"raster": layer}, Reprojector())["raster"]
+    assert stats["valid_pixels"] == 400
+    assert stats["max"] == 63
@@ -0,0 +1,78 @@
+"""Answering AOIs from precomputed thana records"""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from raster_store import RasterStore
+from reprojection import Reprojector
+from thana_index import INDEX_FORMAT, ThanaIndex
+from zonal_stats import batch_polygon_records, polygon_stats
+
+THRESHOLDS = {"raster": 25}
+
+
+def write_values(path):
+    data = np.random.default_rng(1).integers(0, 50, size=(30, 30), dtype=np.uint8)
+    profile = {"driver": "GTiff", "dtype": "uint8", "nodata": None, "width": 30, "height": 30,
+               "count": 1, "crs": "EPSG:4326", "transform": from_origin(90.0, 24.0, 0.01, 0.01)}
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return str(path)
+
+
+def make_index(layers, zones):
+    """ThanaIndex data as build_index lays it out, without the stored analyses"""
+    layer = layers["raster"]
+    records = batch_polygon_records(zones, layers, Reprojector(), THRESHOLDS)
+    return ThanaIndex({
+        "format": INDEX_FORMAT,
+        "thresholds": THRESHOLDS,
+        "grids": {"raster": {"crs": str(layer.crs), "transform": list(layer.transform)[:6],
+                             "width": layer.width, "height": layer.height}},
+        "zones": [{"geometry_hash": None, "geometry_wkb": geom.wkb_hex, "records": r}
+                  for geom, r in zip(zones, records)]
+    })
+
+
+@pytest.fixture
+def layers(tmp_path):
+    return {"raster": RasterStore().get(write_values(tmp_path / "values.tif"))}
+
+
+def test_covered_zones_and_remainder(layers):
+    west, east = box(90.0, 23.8, 90.1, 24.0), box(90.1, 23.8, 90.2, 24.0)
+    index = make_index(layers, [west, east])
+
+    # Covers the west zone and only part of the east one
+    aoi = box(90.0, 23.75, 90.15, 24.0)
+    assert index.covered_zones(aoi) == [0]
+    assert index.remainder(aoi, [0]).equals(aoi.difference(west))
+
+    assert index.covered_zones(west) == [0]
+    assert index.remainder(west, [0]) is None
+    assert index.covered_zones(box(90.05, 23.85, 90.15, 23.95)) == []
+
+
+def test_combine_matches_a_raster_pass(layers):
+    west, east = box(90.0, 23.8, 90.1, 24.0), box(90.1, 23.8, 90.2, 24.0)
+    index = make_index(layers, [west, east])
+    to_crs = Reprojector()
+
+    aoi = box(90.0, 23.75, 90.25, 24.0)
+    zones = index.covered_zones(aoi)
+    assert zones == [0, 1]
+    remainder = index.remainder(aoi, zones)
+    remainder_records = batch_polygon_records([remainder], layers, to_crs, THRESHOLDS)[0]
+
+    combined = index.combine(aoi, zones, to_crs, remainder_records)["raster"]
+    direct = polygon_stats(aoi, layers, to_crs, THRESHOLDS)["raster"]
+    assert combined == pytest.approx(direct)
+
+    # Whole thanas alone need no raster pass
+    union = box(90.0, 23.8, 90.2, 24.0)
+    assert index.remainder(union, zones) is None
+    assert index.combine(union, zones, to_crs)["raster"] == pytest.approx(
+        polygon_stats(union, layers, to_crs, THRESHOLDS)["raster"])
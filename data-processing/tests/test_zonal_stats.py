@@ -0,0 +1,69 @@
+"""Polygon statistics from zonal_stats"""
+
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from rasterio.transform import from_origin
+from shapely.geometry import Polygon, box
+
+from raster_store import RasterStore
+from reprojection import Reprojector
+from zonal_stats import batch_polygon_stats, polygon_stats
+
+ORIGIN = (90.0, 24.0)
+RES = 0.01
+
+
+def write_classes(path, data):
+    """uint8 raster without nodata on a 0.01° EPSG:4326 grid"""
+    profile = {"driver": "GTiff", "dtype": "uint8", "nodata": None,
+               "width": data.shape[1], "height": data.shape[0], "count": 1,
+               "crs": "EPSG:4326", "transform": from_origin(*ORIGIN, RES, RES)}
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return str(path)
+
+
+def pixel_centres_inside(geom, shape):
+    rows, cols = np.indices(shape)
+    x = ORIGIN[0] + (cols + 0.5) * RES
+    y = ORIGIN[1] - (rows + 0.5) * RES
+    return shapely.contains_xy(geom, x, y)
+
+
+def test_pixels_outside_the_polygon_are_not_data(tmp_path):
+    # Classes 1/2 everywhere, so any 0 in the stats would be clip fill
+    data = np.where(np.indices((20, 20)).sum(axis=0) % 2, 2, 1).astype(np.uint8)
+    layer = RasterStore().get(write_classes(tmp_path / "classes.tif", data))
+
+    # No pixel centre lies on the edges, so containment is unambiguous
+    triangle = Polygon([(90.0, 24.0), (90.2, 24.0), (90.0, 23.83)])
+    stats = polygon_stats(triangle, {"raster": layer}, Reprojector())["raster"]
+
+    inside = pixel_centres_inside(triangle, data.shape)
+    # total_pixels is the 17 x 20 bounding window; valid_pixels only its inside
+    assert stats["total_pixels"] == 340
+    assert stats["valid_pixels"] == inside.sum() < 340
+    assert stats["min"] == 1
+    assert stats["mean"] == pytest.approx(data[inside].mean())
+
+
+def test_batch_matches_serial(tmp_path):
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 50, size=(40, 40), dtype=np.uint8)
+    layers = {"raster": RasterStore().get(write_classes(tmp_path / "values.tif", data))}
+    thresholds = {"raster": 25}
+
+    # Overlapping, touching, nested and partly outside polygons
+    geoms = [box(90.02, 23.72, 90.17, 23.91), box(90.1, 23.8, 90.3, 23.95),
+             box(90.17, 23.72, 90.25, 23.78), box(90.05, 23.75, 90.08, 23.78),
+             Polygon([(90.3, 23.9), (90.45, 23.65), (90.39, 23.5)]),
+             box(90.5, 23.0, 90.6, 23.1)]
+    for max_pixels in (None, 40):
+        batch = batch_polygon_stats(geoms, layers, Reprojector(), thresholds, max_pixels)
+        serial = [polygon_stats(g, layers, Reprojector(), thresholds, max_pixels) for g in geoms]
+        assert batch == serial
+    # The large polygons were read at an overview, and still agree
+    assert "overview_factor" in batch[0]["raster"]
+    assert batch[-1]["raster"] == {"error": "Polygon does not overlap with raster data"}
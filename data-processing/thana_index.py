@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Thana Statistics Index
+Precomputes the full analyze_polygon result and per-layer zone records for
+every thana, so whole-thana requests are answered without touching the
+rasters.
+
+An AOI that is exactly a thana is answered from its stored analysis. An
+AOI that contains whole thanas is answered by merging their stored zone
+records, plus a raster pass over the remainder only. The index records
+the SHA-256 of every source raster and is ignored as soon as one changes.
+
+Build (from the repository root):
+  python data-processing/thana_index.py --boundaries data-processing/raw/geoBoundaries-BGD-ADM3.geojson
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from affine import Affine
+from shapely import wkb
+from shapely.geometry import shape
+from shapely.ops import unary_union
+from shapely.strtree import STRtree
+
+from fingerprints import geometry_hash, raster_checksums
+from raster_store import window_for_bounds
+from reprojection import Reprojector
+from zonal_stats import NO_OVERLAP_ERROR, batch_polygon_records, merge_records, record_stats
+
+INDEX_FORMAT = 2
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_FILE = os.path.join(SCRIPT_DIR, "processed", "thana_index.json")
+DEFAULT_BOUNDARIES = os.path.join(SCRIPT_DIR, "raw", "geoBoundaries-BGD-ADM3.geojson")
+THANA_OVERLAY_DIR = os.path.join(SCRIPT_DIR, "..", "client", "public", "data", "thana_pngs")
+
+# Slack (degrees) when testing whether an AOI contains a whole thana
+CONTAINMENT_TOLERANCE = 1e-7
+
+
+def overlay_thana_names(overlay_dir: str = THANA_OVERLAY_DIR) -> List[str]:
+    """Thana names that have a <name>_bounds.json overlay in the frontend"""
+    if not os.path.isdir(overlay_dir):
+        return []
+    suffix = "_bounds.json"
+    return sorted(f[:-len(suffix)] for f in os.listdir(overlay_dir) if f.endswith(suffix))
+
+
+def read_zones(boundaries_path: str, name_field: str, names: Optional[List[str]] = None):
+    """(name, geometry) pairs from a GeoJSON FeatureCollection in EPSG:4326"""
+    with open(boundaries_path, "r") as f:
+        collection = json.load(f)
+
+    wanted = set(names) if names else None
+    zones = []
+    for feature in collection.get("features", []):
+        name = (feature.get("properties") or {}).get(name_field)
+        if name is None or (wanted is not None and name not in wanted):
+            continue
+        zones.append((name, shape(feature["geometry"])))
+    return zones
+
+
+class ThanaIndex:
+    """Loaded index with exact-match and whole-zone lookups"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.zones = data["zones"]
+        self.geoms = [wkb.loads(zone["geometry_wkb"], hex=True) for zone in self.zones]
+        self.by_hash = {zone["geometry_hash"]: i for i, zone in enumerate(self.zones)}
+        self.tree = STRtree(self.geoms)
+
+    @classmethod
+    def load(cls, path: str) -> "ThanaIndex":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def is_current(self, raster_paths: Dict[str, str], thresholds: Dict[str, float]) -> bool:
+        """True if the index was built from exactly these rasters and thresholds"""
+        return (self.data.get("format") == INDEX_FORMAT
+                and self.data.get("thresholds") == thresholds
+                and self.data.get("raster_checksums") == raster_checksums(raster_paths))
+
+    def exact(self, geom) -> Optional[Dict[str, Any]]:
+        """Stored analysis if geom is one of the indexed thanas"""
+        geom_hash = geometry_hash(geom)
+        # An unhashable geometry matches no thana
+        i = self.by_hash.get(geom_hash) if geom_hash is not None else None
+        if i is None:
+            return None
+        return json.loads(json.dumps(self.zones[i]["analysis"]))
+
+    def covered_zones(self, geom) -> List[int]:
+        """Indices of thanas lying entirely inside geom"""
+        container = geom.buffer(CONTAINMENT_TOLERANCE)
+        return sorted(int(i) for i in self.tree.query(container, predicate="contains"))
+
+    def remainder(self, geom, zones: List[int]):
+        """Part of geom not covered by the given thanas, or None if nothing is left"""
+        rest = geom.difference(unary_union([self.geoms[i] for i in zones]))
+        if rest.is_empty or rest.area <= geom.area * 1e-9:
+            return None
+        return rest
+
+    def combine(self, geom, zones: List[int], to_crs: Reprojector,
+                remainder_records: Optional[Dict[str, Dict]] = None) -> Optional[Dict[str, Dict]]:
+        """
+        Layer stats of geom from the records of the thanas it contains plus,
+        if given, the records of the uncovered remainder. Returns None when
+        the stored records cannot reproduce the result (e.g. a layer that
+        failed for only some of the thanas).
+        """
+        thresholds = self.data.get("thresholds", {})
+        stats: Dict[str, Dict] = {}
+
+        for name, grid in self.data["grids"].items():
+            records = [self.zones[i]["records"][name] for i in zones]
+            if remainder_records is not None:
+                records.append(remainder_records[name])
+
+            errors = {r["error"] for r in records if "error" in r and r["error"] != NO_OVERLAP_ERROR}
+            if errors:
+                if len(errors) == 1 and all("error" in r for r in records):
+                    stats[name] = {"error": errors.pop()}
+                    continue
+                return None
+
+            if grid is None:
+                return None
+            crs = grid["crs"]
+            window = window_for_bounds(Affine(*grid["transform"]), grid["width"], grid["height"],
+                                       to_crs(geom, crs).bounds)
+            if window is None:
+                stats[name] = {"error": NO_OVERLAP_ERROR}
+                continue
+
+            present = [r for r in records if "error" not in r]
+            if not present:
+                present = [{"count": 0, "sum": 0.0, "min": None, "max": None, "above": 0.0,
+                            "total_pixels": 0, "raster_crs": crs}]
+            merged = merge_records(present, window.width * window.height)
+            stats[name] = record_stats(merged, thresholds.get(name))
+
+        return stats
+
+
+def build_index(boundaries_path: str, output_path: str = DEFAULT_INDEX_FILE,
+                name_field: str = "shapeName", names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Analyze every thana once and write the index to output_path"""
+    # Imported here: current_situation itself uses this module for lookups
+    import current_situation as cs
+
+    zones = read_zones(boundaries_path, name_field, names)
+    if not zones:
+        raise ValueError(f"No matching features with '{name_field}' in {boundaries_path}")
+    print(f"Indexing {len(zones)} thanas from {boundaries_path}")
+
+    thresholds = {"vegetation": cs.GREEN_NDVI_THRESHOLD}
+    layers, errors = cs.load_layers()
+    geoms = [geom for _, geom in zones]
+    to_crs = Reprojector()
+    all_records = batch_polygon_records(geoms, layers, to_crs, thresholds)
+
+    grids = {}
+    for name in cs.RASTER_LAYERS:
+        layer = layers.get(name)
+        grids[name] = None if layer is None else {
+            "crs": str(layer.crs),
+            "transform": list(layer.transform)[:6],
+            "width": layer.width,
+            "height": layer.height
+        }
+
+    entries = []
+    for (zone_name, geom), records in zip(zones, all_records):
+        records = {**errors, **records}
+        stats = {name: record_stats(record, thresholds.get(name)) for name, record in records.items()}
+        entries.append({
+            "name": zone_name,
+            "geometry_hash": geometry_hash(geom),
+            "geometry_wkb": geom.wkb_hex,
+            "records": records,
+            "analysis": cs.build_analysis(cs.compute_geometry_info(geom, to_crs), stats)
+        })
+
+    index = {
+        "format": INDEX_FORMAT,
+        "raster_checksums": raster_checksums(cs.RASTER_LAYERS),
+        "thresholds": thresholds,
+        "grids": grids,
+        "zones": entries
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, output_path)
+    print(f"Saved thana index: {output_path} ({os.path.getsize(output_path) / 1024:.0f} KB)")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute thana-level statistics for current_situation.py")
+    parser.add_argument("--boundaries", default=DEFAULT_BOUNDARIES,
+                        help="GeoJSON FeatureCollection of thana polygons (EPSG:4326)")
+    parser.add_argument("--name-field", default="shapeName", help="Feature property holding the thana name")
+    parser.add_argument("--output", default=DEFAULT_INDEX_FILE, help="Index file to write")
+    parser.add_argument("--all", action="store_true",
+                        help="Index every feature instead of only thanas with a frontend overlay")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.boundaries):
+        print(f"Boundary file not found: {args.boundaries}")
+        return 2
+
+    names = None if args.all else (overlay_thana_names() or None)
+    build_index(args.boundaries, args.output, args.name_field, names)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
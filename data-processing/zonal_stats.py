@@ -0,0 +1,351 @@
+"""
+Zonal Statistics
+Computes per-layer polygon statistics from RasterStore layers.
+
+The polygon mask is built once per distinct raster grid (CRS, transform
+and shape) and shared by every layer on that grid, so a request costs one
+mask build per grid instead of one clip per layer. Large polygon lists go
+through batch_polygon_stats, which burns all zones into a label image per
+grid and aggregates them in one vectorized pass.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rasterio.features import geometry_mask, rasterize
+from rasterio.windows import Window
+from shapely.strtree import STRtree
+
+from instrumentation import count, timer
+from raster_store import RasterLayer
+from reprojection import Reprojector
+
+NO_OVERLAP_ERROR = "Polygon does not overlap with raster data"
+
+
+def grid_key(layer: RasterLayer) -> Tuple:
+    """Hashable identity of a layer's pixel grid"""
+    return (str(layer.crs), tuple(layer.transform)[:6], layer.height, layer.width)
+
+
+def group_by_grid(layers: Dict[str, RasterLayer]) -> Dict[Tuple, Dict[str, RasterLayer]]:
+    groups: Dict[Tuple, Dict[str, RasterLayer]] = {}
+    for name, layer in layers.items():
+        groups.setdefault(grid_key(layer), {})[name] = layer
+    return groups
+
+
+def bounds_overlap(a, b) -> bool:
+    return not (a[2] < b[0] or a[0] > b[2] or a[3] < b[1] or a[1] > b[3])
+
+
+def accumulator_dtype(dtype) -> np.dtype:
+    """Exact int64 sums for integer rasters, float64 accumulation for float ones"""
+    return np.dtype(np.int64) if np.issubdtype(dtype, np.integer) else np.dtype(np.float64)
+
+
+def summary_stats(values: np.ndarray, total_pixels: int, crs,
+                  threshold: Optional[float] = None) -> Dict:
+    """
+    mean/min/max/valid_pixels of a 1-D array of valid pixel values.
+
+    values stay in the raster's native dtype; only the running sum is
+    widened (no float64 copy of the pixels is made).
+    """
+    if values.size == 0:
+        stats = {"mean": None, "min": None, "max": None, "valid_pixels": 0}
+        if threshold is not None:
+            stats["percent_above"] = None
+        return stats
+
+    stats = {
+        "mean": float(values.sum(dtype=accumulator_dtype(values.dtype)) / values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "valid_pixels": int(values.size),
+        "total_pixels": int(total_pixels),
+        "raster_crs": str(crs)
+    }
+    if threshold is not None:
+        stats["percent_above"] = float(np.count_nonzero(values > threshold) / values.size * 100)
+    return stats
+
+
+def polygon_stats(geom, layers: Dict[str, RasterLayer], to_crs: Reprojector,
+                  thresholds: Optional[Dict[str, float]] = None,
+                  max_pixels: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Statistics of geom (EPSG:4326) for every named layer.
+
+    to_crs reprojects the polygon and memoizes each CRS, so every grid in
+    the same CRS reuses one projection. thresholds maps a layer name to a
+    value; that layer's stats then also carry "percent_above", the share
+    of valid pixels greater than the threshold.
+
+    With max_pixels, an AOI window larger than that is read at a coarser
+    power-of-two decimation (an internal overview for COG layers) and its
+    stats are approximate, marked with "overview_factor".
+    """
+    thresholds = thresholds or {}
+    results: Dict[str, Dict] = {}
+
+    for group in group_by_grid(layers).values():
+        grid_layer = next(iter(group.values()))
+        crs = str(grid_layer.crs)
+        try:
+            grid_geom = to_crs(geom, crs)
+
+            window = None
+            if bounds_overlap(grid_geom.bounds, grid_layer.bounds):
+                window = grid_layer.window_for_bounds(grid_geom.bounds)
+            if window is None:
+                for name in group:
+                    results[name] = {"error": NO_OVERLAP_ERROR}
+                continue
+
+            out_shape, factor = None, 1
+            if max_pixels is not None:
+                out_shape, factor = grid_layer.overview_shape(window, max_pixels)
+                if factor == 1:
+                    out_shape = None
+
+            # One mask for every layer sharing this grid
+            with timer("mask"):
+                inside = geometry_mask(
+                    [grid_geom],
+                    out_shape=out_shape or (window.height, window.width),
+                    transform=grid_layer.window_transform(window, out_shape),
+                    invert=True
+                )
+            count("pixels_masked", inside.size)
+
+            for name, layer in group.items():
+                block = layer.read(window, out_shape)
+                with timer("stats"):
+                    values = block[layer.valid_mask(block, inside.copy())]
+                    results[name] = summary_stats(values, block.size, layer.crs, thresholds.get(name))
+                count("pixels_valid", values.size)
+                if factor > 1:
+                    results[name]["overview_factor"] = factor
+
+        except Exception as e:
+            for name in group:
+                results[name] = {"error": str(e)}
+
+    return results
+
+
+def non_overlapping_groups(geoms) -> List[List[int]]:
+    """
+    Split geometries into groups whose members do not overlap each other.
+
+    Every group can be burned into a single label image without one zone
+    overwriting another. Polygons that merely touch share a group.
+    """
+    tree = STRtree(geoms)
+    colors = [-1] * len(geoms)
+    groups: List[List[int]] = []
+    for i, geom in enumerate(geoms):
+        taken = {
+            colors[j] for j in tree.query(geom, predicate="intersects")
+            if j < i and colors[j] >= 0 and not geom.touches(geoms[j])
+        }
+        color = 0
+        while color in taken:
+            color += 1
+        colors[i] = color
+        if color == len(groups):
+            groups.append([])
+        groups[color].append(i)
+    return groups
+
+
+def zone_aggregates(labels: np.ndarray, block: np.ndarray, valid: np.ndarray, n_zones: int,
+                    threshold: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-zone count/sum/min/max of block over a label image (0 = no zone).
+
+    Arrays are indexed by label, so entry 0 is unused.
+    """
+    selected = (labels > 0) & valid
+    zones = labels[selected]
+    values = block[selected]
+
+    count = np.bincount(zones, minlength=n_zones + 1)
+    total = np.bincount(zones, weights=values, minlength=n_zones + 1)
+    minimum = np.full(n_zones + 1, np.nan)
+    maximum = np.full(n_zones + 1, np.nan)
+    if zones.size:
+        order = np.argsort(zones, kind="stable")
+        zones, values = zones[order], values[order]
+        starts = np.flatnonzero(np.r_[True, zones[1:] != zones[:-1]])
+        minimum[zones[starts]] = np.minimum.reduceat(values, starts)
+        maximum[zones[starts]] = np.maximum.reduceat(values, starts)
+
+    aggregates = {"count": count, "sum": total, "min": minimum, "max": maximum}
+    if threshold is not None:
+        aggregates["above"] = np.bincount(zones, weights=values > threshold, minlength=n_zones + 1)
+    return aggregates
+
+
+def zone_record(aggregates: Dict[str, np.ndarray], zone: int, total_pixels: int, crs) -> Dict:
+    """
+    The aggregates of one zone as a mergeable record.
+
+    Records keep sums and counts rather than means, so the records of
+    disjoint zones can be combined with merge_records.
+    """
+    count = int(aggregates["count"][zone])
+    return {
+        "count": count,
+        "sum": float(aggregates["sum"][zone]),
+        "min": float(aggregates["min"][zone]) if count else None,
+        "max": float(aggregates["max"][zone]) if count else None,
+        "above": float(aggregates["above"][zone]) if "above" in aggregates else None,
+        "total_pixels": int(total_pixels),
+        "raster_crs": str(crs)
+    }
+
+
+def merge_records(records: List[Dict], total_pixels: int) -> Dict:
+    """Combine the records of disjoint zones into the record of their union"""
+    present = [r for r in records if r["count"]]
+    return {
+        "count": sum(r["count"] for r in records),
+        "sum": sum(r["sum"] for r in records),
+        "min": min(r["min"] for r in present) if present else None,
+        "max": max(r["max"] for r in present) if present else None,
+        "above": None if any(r["above"] is None for r in records) else sum(r["above"] for r in records),
+        "total_pixels": int(total_pixels),
+        "raster_crs": records[0]["raster_crs"]
+    }
+
+
+def record_stats(record: Dict, threshold: Optional[float] = None) -> Dict:
+    """The summary_stats dict of a zone record (error records pass through)"""
+    if "error" in record:
+        return record
+    count = record["count"]
+    if count == 0:
+        return summary_stats(np.empty(0), record["total_pixels"], record["raster_crs"], threshold)
+
+    stats = {
+        "mean": record["sum"] / count,
+        "min": record["min"],
+        "max": record["max"],
+        "valid_pixels": count,
+        "total_pixels": record["total_pixels"],
+        "raster_crs": record["raster_crs"]
+    }
+    if threshold is not None:
+        stats["percent_above"] = float(record["above"] / count * 100)
+    if "overview_factor" in record:
+        stats["overview_factor"] = record["overview_factor"]
+    return stats
+
+
+def union_windows(windows: List[Window]) -> Window:
+    row_off = min(w.row_off for w in windows)
+    col_off = min(w.col_off for w in windows)
+    row_end = max(w.row_off + w.height for w in windows)
+    col_end = max(w.col_off + w.width for w in windows)
+    return Window(col_off, row_off, col_end - col_off, row_end - row_off)
+
+
+def batch_polygon_records(geoms: List, layers: Dict[str, RasterLayer], to_crs: Reprojector,
+                          thresholds: Optional[Dict[str, float]] = None,
+                          max_pixels: Optional[int] = None) -> List[Dict[str, Dict]]:
+    """
+    Mergeable zone records for many polygons at once.
+
+    Per raster grid, all polygons are burned into one label image (one per
+    group of mutually overlapping polygons) and every layer is aggregated
+    per label with bincount/reduceat, so the cost follows the raster area
+    covered instead of polygon count x raster size. Returns one
+    {layer: record} dict per input geometry, in input order; a record is
+    replaced by {"error": ...} where the layer could not be evaluated.
+
+    max_pixels applies per polygon as in polygon_stats: a polygon whose
+    window exceeds it gets a label image of its own at the decimated
+    shape, and its records carry "overview_factor".
+    """
+    thresholds = thresholds or {}
+    results: List[Dict[str, Dict]] = [{} for _ in geoms]
+
+    for group in group_by_grid(layers).values():
+        grid_layer = next(iter(group.values()))
+        crs = str(grid_layer.crs)
+        try:
+            grid_geoms = to_crs.project_many(geoms, crs)
+
+            windows: List[Optional[Window]] = []
+            for grid_geom in grid_geoms:
+                window = None
+                if bounds_overlap(grid_geom.bounds, grid_layer.bounds):
+                    window = grid_layer.window_for_bounds(grid_geom.bounds)
+                windows.append(window)
+
+            for i, window in enumerate(windows):
+                if window is None:
+                    for name in group:
+                        results[i][name] = {"error": NO_OVERLAP_ERROR}
+
+            inside = [i for i, window in enumerate(windows) if window is not None]
+            if not inside:
+                continue
+
+            # (indices, out_shape, overview factor) of every label image to burn
+            decimated = []
+            if max_pixels is not None:
+                for i in inside:
+                    out_shape, factor = grid_layer.overview_shape(windows[i], max_pixels)
+                    if factor > 1:
+                        decimated.append(([i], out_shape, factor))
+            full = sorted(set(inside) - {batch[0][0] for batch in decimated})
+            batches = [([full[m] for m in members], None, 1)
+                       for members in non_overlapping_groups([grid_geoms[i] for i in full])]
+
+            for indices, out_shape, factor in batches + decimated:
+                window = union_windows([windows[i] for i in indices])
+                with timer("mask"):
+                    labels = rasterize(
+                        ((grid_geoms[i], zone) for zone, i in enumerate(indices, start=1)),
+                        out_shape=out_shape or (window.height, window.width),
+                        transform=grid_layer.window_transform(window, out_shape),
+                        fill=0,
+                        dtype="int32"
+                    )
+                count("pixels_masked", labels.size)
+
+                for name, layer in group.items():
+                    block = layer.read(window, out_shape)
+                    with timer("stats"):
+                        aggregates = zone_aggregates(labels, block, layer.valid_mask(block),
+                                                     len(indices), thresholds.get(name))
+                        for zone, i in enumerate(indices, start=1):
+                            if out_shape is None:
+                                total_pixels = windows[i].height * windows[i].width
+                            else:
+                                total_pixels = block.size
+                            results[i][name] = zone_record(aggregates, zone, total_pixels, layer.crs)
+                            if factor > 1:
+                                results[i][name]["overview_factor"] = factor
+                    count("pixels_valid", int(aggregates["count"].sum()))
+
+        except Exception as e:
+            for i in range(len(geoms)):
+                for name in group:
+                    results[i].setdefault(name, {"error": str(e)})
+
+    return results
+
+
+def batch_polygon_stats(geoms: List, layers: Dict[str, RasterLayer], to_crs: Reprojector,
+                        thresholds: Optional[Dict[str, float]] = None,
+                        max_pixels: Optional[int] = None) -> List[Dict[str, Dict]]:
+    """polygon_stats for many polygons at once, via batch_polygon_records"""
+    thresholds = thresholds or {}
+    return [
+        {name: record_stats(record, thresholds.get(name)) for name, record in records.items()}
+        for records in batch_polygon_records(geoms, layers, to_crs, thresholds, max_pixels)
+    ]
@@ -2,6 +2,7 @@ const express = require("express");
 const router = express.Router();
 const { spawn } = require("child_process");
 const path = require("path");
+const { analysisWorkerPool } = require("../services/analysisWorkerPool");
 
 // POST /api/analysis/current-situation - Receive polygon data from frontend
 router.post("/current-situation", async (req, res) => {
@@ -105,11 +106,42 @@ router.post("/current-situation", async (req, res) => {
 });
 
 /**
- * Run the Python analysis script with polygon data
+ * Run the Python analysis with polygon data, preferring a warm worker
  * @param {Array} polygonData - Array of GeoJSON polygon objects
  * @returns {Promise} Promise that resolves with analysis results
  */
-function runPythonAnalysis(polygonData) {
+async function runPythonAnalysis(polygonData) {
+  if (analysisWorkerPool) {
+    const startTime = Date.now();
+    try {
+      const message = await analysisWorkerPool.analyze(polygonData);
+      const result = message.result;
+      console.log(`Analysis worker time: ${Date.now() - startTime}ms`, message.timings_ms);
+      if (message.metrics) {
+        console.log("Analysis metrics:", JSON.stringify(message.metrics));
+      }
+
+      if (result.analysis_metadata) {
+        result.analysis_metadata.processing_time_ms = Date.now() - startTime;
+      }
+      return result;
+    } catch (workerError) {
+      // A failed analysis would fail the same way in a fresh process
+      if (workerError.workerReported) {
+        throw workerError;
+      }
+      console.error("Analysis worker failed, spawning a one-off process:", workerError.message);
+    }
+  }
+  return spawnPythonAnalysis(polygonData);
+}
+
+/**
+ * Run the Python analysis script in a fresh process
+ * @param {Array} polygonData - Array of GeoJSON polygon objects
+ * @returns {Promise} Promise that resolves with analysis results
+ */
+function spawnPythonAnalysis(polygonData) {
   return new Promise((resolve, reject) => {
     const startTime = Date.now();
 
@@ -124,8 +156,8 @@ function runPythonAnalysis(polygonData) {
 
     console.log("Spawning Python process:", scriptPath);
 
-    // Spawn Python process
-    const pythonProcess = spawn("python", [scriptPath], {
+    // Spawn Python process; --timings adds a structured "timings" block to the result
+    const pythonProcess = spawn("python", [scriptPath, "--timings"], {
       stdio: ["pipe", "pipe", "pipe"],
     });
 
@@ -157,6 +189,10 @@ function runPythonAnalysis(polygonData) {
           // Parse the JSON output from Python
           const result = JSON.parse(outputData);
 
+          if (result.timings) {
+            console.log("Analysis metrics:", JSON.stringify(result.timings));
+          }
+
           // Add processing metadata
           if (result.analysis_metadata) {
             result.analysis_metadata.processing_time_ms = processingTime;
@@ -198,6 +234,23 @@ function runPythonAnalysis(polygonData) {
   });
 }
 
+// GET /api/analysis/worker-stats - Request counts and stage timings of the warm analysis workers
+router.get("/worker-stats", async (req, res) => {
+  if (!analysisWorkerPool) {
+    return res.json({ success: true, data: { enabled: false } });
+  }
+  try {
+    const stats = await analysisWorkerPool.stats();
+    res.json({ success: true, data: { enabled: true, ...stats } });
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      message: "Failed to get analysis worker stats",
+      error: error.message,
+    });
+  }
+});
+
 // GET /api/analysis/risk-assessment - Get risk assessment for a city
 router.get("/risk-assessment", async (req, res) => {
   try {
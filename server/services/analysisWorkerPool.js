@@ -0,0 +1,191 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const logger = require('../utils/logger');
+
+/**
+ * Pool of long-lived `current_situation.py --worker` processes.
+ * Each worker keeps the rasters open and answers line-delimited JSON
+ * requests, so an AOI analysis no longer pays for interpreter startup,
+ * imports and GeoTIFF opens on every click.
+ */
+
+const DEFAULT_SCRIPT_PATH = path.join(
+  __dirname,
+  '..',
+  '..',
+  'data-processing',
+  'current_situation.py'
+);
+
+class AnalysisWorker {
+  constructor(scriptPath, pythonCmd) {
+    this.scriptPath = scriptPath;
+    this.pythonCmd = pythonCmd;
+    this.pending = new Map();
+    this.nextId = 1;
+    this.alive = false;
+    this.process = null;
+  }
+
+  start() {
+    this.process = spawn(this.pythonCmd, [this.scriptPath, '--worker', '--timings'], {
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+    this.alive = true;
+
+    readline.createInterface({ input: this.process.stdout }).on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (parseError) {
+        logger.warn(`Unparseable analysis worker output: ${line.slice(0, 200)}`);
+        return;
+      }
+      const request = this.pending.get(message.id);
+      if (!request) return;
+      this.pending.delete(message.id);
+      clearTimeout(request.timer);
+      if (message.success) {
+        request.resolve(message);
+      } else {
+        // The worker is healthy; the analysis itself failed
+        const error = new Error(message.error || 'Analysis worker request failed');
+        error.workerReported = true;
+        request.reject(error);
+      }
+    });
+
+    // Debug output from the worker; kept out of the request path
+    this.process.stderr.on('data', (data) => {
+      logger.debug(`Analysis worker ${this.process.pid}: ${data.toString().trim()}`);
+    });
+
+    // Writes to a worker that just died surface here as EPIPE
+    this.process.stdin.on('error', (error) => this._fail(error));
+
+    this.process.on('error', (error) => {
+      logger.error(`Analysis worker error: ${error.message}`);
+      this._fail(error);
+    });
+
+    this.process.on('close', (code) => {
+      logger.warn(`Analysis worker ${this.process.pid} exited with code ${code}`);
+      this._fail(new Error(`Analysis worker exited with code ${code}`));
+    });
+  }
+
+  _fail(error) {
+    this.alive = false;
+    this.pending.forEach((request) => {
+      clearTimeout(request.timer);
+      request.reject(error);
+    });
+    this.pending.clear();
+  }
+
+  // Reject everything in flight and kill the process; the pool replaces it
+  kill(error) {
+    if (!this.alive) return;
+    logger.warn(`Killing analysis worker ${this.process.pid}: ${error.message}`);
+    this._fail(error);
+    this.process.kill('SIGKILL');
+  }
+
+  // A timed-out request means the worker is hung, so by default it is killed
+  // rather than left to attract new requests through an emptied pending map
+  send(payload, timeoutMs, killOnTimeout = true) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        const error = new Error(`Analysis worker timed out after ${timeoutMs}ms`);
+        reject(error);
+        if (killOnTimeout) this.kill(error);
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+
+  stop() {
+    if (this.alive) {
+      this.process.stdin.end(JSON.stringify({ command: 'shutdown' }) + '\n');
+    }
+  }
+}
+
+class AnalysisWorkerPool {
+  constructor(options = {}) {
+    this.size = options.size || 1;
+    this.scriptPath = options.scriptPath || DEFAULT_SCRIPT_PATH;
+    this.pythonCmd = options.pythonCmd || 'python';
+    this.timeoutMs = options.timeoutMs || 120000;
+    this.workers = [];
+    this.requests = 0;
+    this.failures = 0;
+  }
+
+  _pickWorker() {
+    // Replace dead workers lazily, then route to the least busy one
+    this.workers = this.workers.filter((worker) => worker.alive);
+    while (this.workers.length < this.size) {
+      const worker = new AnalysisWorker(this.scriptPath, this.pythonCmd);
+      worker.start();
+      this.workers.push(worker);
+    }
+    return this.workers.reduce((best, worker) =>
+      worker.pending.size < best.pending.size ? worker : best
+    );
+  }
+
+  async analyze(polygonData) {
+    this.requests++;
+    try {
+      return await this._pickWorker().send({ polygons: polygonData }, this.timeoutMs);
+    } catch (error) {
+      this.failures++;
+      throw error;
+    }
+  }
+
+  async stats() {
+    const workers = await Promise.all(
+      this.workers
+        .filter((worker) => worker.alive)
+        .map((worker) =>
+          worker
+            .send({ command: 'stats' }, 5000, false)
+            .then((message) => message.stats)
+            .catch((error) => ({ error: error.message }))
+        )
+    );
+    return {
+      size: this.size,
+      requests: this.requests,
+      failures: this.failures,
+      workers
+    };
+  }
+
+  shutdown() {
+    this.workers.forEach((worker) => worker.stop());
+    this.workers = [];
+  }
+}
+
+// Shared pool; ANALYSIS_WORKERS=0 disables it and falls back to one process per request.
+// Workers exit on their own when stdin closes, i.e. when the server goes away.
+const workerCount = parseInt(process.env.ANALYSIS_WORKERS || '1', 10);
+const analysisWorkerPool = workerCount > 0
+  ? new AnalysisWorkerPool({
+      size: workerCount,
+      pythonCmd: process.env.PYTHON_CMD || 'python'
+    })
+  : null;
+
+module.exports = {
+  AnalysisWorkerPool,
+  analysisWorkerPool
+};